@@ -0,0 +1,139 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from backend.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class LazyService:
+    """
+    A service constructed on first use instead of at import time.
+    Instances are FastAPI dependency providers (Depends(get_query_engine)); the
+    warm-up calls them ahead of the first request.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name = name
+        self.factory = factory
+        self.load_seconds: Optional[float] = None
+        self._instance = None
+        self._lock = threading.Lock()
+
+    def __call__(self) -> Any:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    start = time.perf_counter()
+                    self._instance = self.factory()
+                    self.load_seconds = time.perf_counter() - start
+        return self._instance
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def peek(self) -> Optional[Any]:
+        """The instance if it has been built, without building it"""
+        return self._instance
+
+
+def _query_engine():
+    from backend.services.query_engine import QueryEngine
+    return QueryEngine()
+
+
+def _query_history():
+    from backend.services.history_store import QueryHistoryStore
+    return QueryHistoryStore()
+
+
+def _document_processor():
+    from backend.services.document_processor import DocumentProcessor
+    return DocumentProcessor()
+
+
+def _embedding_pipeline():
+    from backend.services.embeddings import EmbeddingPipeline
+    return EmbeddingPipeline(get_document_processor())
+
+
+get_query_engine = LazyService("query_engine", _query_engine)
+get_query_history = LazyService("query_history", _query_history)
+get_document_processor = LazyService("document_processor", _document_processor)
+get_embedding_pipeline = LazyService("embedding_pipeline", _embedding_pipeline)
+
+SERVICES: List[LazyService] = [get_query_engine, get_query_history, get_document_processor, get_embedding_pipeline]
+
+
+class Readiness:
+    """
+    Warm-up progress for /ready. Without a warm-up the app is ready as soon as it
+    starts; services then load on the first request that needs them.
+    """
+
+    def __init__(self):
+        self.status = "starting"
+        self.steps: Dict[str, float] = {}
+        self.error: Optional[str] = None
+        self.started_at = time.monotonic()
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "ready": self.ready,
+            "warm_up_steps": dict(self.steps),
+            "services": {service.name: service.loaded for service in SERVICES},
+            "error": self.error,
+            "uptime_seconds": round(time.monotonic() - self.started_at, 3)
+        }
+
+
+readiness = Readiness()
+
+
+def warm_up() -> None:
+    """
+    Preload what the first queries would otherwise pay for: service construction,
+    the embedding model, the LLM SDK, the document and lexical indexes and the schema snapshot
+    (with its compiled templates) of DATABASE_URL when one is configured.
+    """
+    from backend.services.query_engine import schema_version
+    from backend.services.schema_store import get_schema_store
+
+    def step(name: str, fn: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        value = fn()
+        readiness.steps[name] = round(time.perf_counter() - start, 4)
+        return value
+
+    readiness.status = "warming"
+    try:
+        engine = step("query_engine", get_query_engine)
+        step("query_history", get_query_history)
+        step("embedding_pipeline", get_embedding_pipeline)
+        encoder = engine.semantic_cache.encoder if engine.semantic_cache is not None else get_embedding_pipeline().encoder
+        step("embedding_model", lambda: encoder.encode(["warm up"]))
+        if engine.llm is not None and hasattr(engine.llm.backend, "load"):
+            step("llm_sdk", engine.llm.backend.load)
+        step("document_index", lambda: engine.retriever.version())
+        if engine.retriever.lexical_enabled:
+            step("lexical_index", engine.retriever.sync_lexical)
+
+        store = get_schema_store()
+        if Config.DATABASE_URL:
+            snapshot = step("schema_snapshot", lambda: store.discover(Config.DATABASE_URL))
+            store.activate(Config.DATABASE_URL)
+        else:
+            snapshot = store.get(None)
+        step("intent_templates", lambda: engine.templates.compile(snapshot.schema, schema_version(snapshot.schema)))
+        readiness.status = "ready"
+    except Exception as e:
+        logger.exception("Warm-up failed")
+        readiness.status = "failed"
+        readiness.error = str(e)
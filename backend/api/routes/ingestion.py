@@ -1,37 +1,88 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from typing import List
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from fastapi.routing import APIRoute
+from typing import List, Optional
 import uuid
-from datetime import datetime
+import hashlib
+import json
+import shutil
 import os
+import time
+from backend.api.dependencies import get_document_processor, get_embedding_pipeline
+from backend.config import Config
+from backend.services.database import resolve_connection, shareable_connection
+from backend.services.job_registry import FINISHED_STATUSES, JobRegistry, job_delta
+from backend.services.schema_store import get_schema_store, public_schema
+from backend.services.state import get_state
+from backend.services.table_loader import CSVTableLoader, TableLoadError, table_name_for
 
-router = APIRouter(prefix="/api/ingest")
+# Request body limits of the upload routes: the total upload limit plus room for the
+# multipart framing around each file
+_UPLOAD_BODY_LIMITS = {
+    "/api/ingest/documents": Config.UPLOAD_MAX_TOTAL_SIZE + 1024 * 1024,
+    "/api/ingest/tables": Config.TABLE_UPLOAD_MAX_TOTAL_SIZE + 1024 * 1024
+}
 
-# In-memory storage for demo purposes (would use database in production)
-ingestion_jobs = {}
+
+class UploadLimitRoute(APIRoute):
+    """
+    Refuses an upload body over its route's limit as it arrives. The multipart form is
+    parsed in full before the route function runs, so the checks in _spool_upload alone
+    would only see an oversized upload after it had been buffered to disk.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        limit = _UPLOAD_BODY_LIMITS.get(self.path)
+        if limit is None:
+            return handler
+
+        async def limited_handler(request: Request):
+            length = request.headers.get("content-length", "")
+            if length.isdigit() and int(length) > limit:
+                raise HTTPException(status_code=413, detail="Upload exceeds the total size limit")
+            # Chunked bodies have no length up front: count what is received instead
+            receive = request.receive
+            received = 0
+
+            async def limited_receive():
+                nonlocal received
+                message = await receive()
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail="Upload exceeds the total size limit")
+                return message
+
+            return await handler(Request(request.scope, limited_receive))
+
+        return limited_handler
+
+
+router = APIRouter(prefix="/api/ingest", route_class=UploadLimitRoute)
+
+# Bounded job registry, shared between workers when STATE_BACKEND=sqlite;
+# finished jobs are evicted by count and age
+ingestion_jobs = JobRegistry(store=get_state().jobs)
+
+schema_store = get_schema_store()
 
 @router.post("/database")
 async def connect_database(connection_string: str = Form(...)):
     """
     Connect to database and discover schema
     """
-    job_id = str(uuid.uuid4())
-    # Simulate schema discovery
-    schema = {
-        "tables": [
-            {"name": "employees", "columns": ["id", "name", "department", "salary"]},
-            {"name": "departments", "columns": ["id", "name", "manager_id"]}
-        ],
-        "relationships": [
-            {"from": "employees.department", "to": "departments.id"}
-        ]
-    }
+    try:
+        # Reflection does blocking I/O, keep it off the event loop
+        snapshot = await run_in_threadpool(schema_store.discover, connection_string)
+        await run_in_threadpool(schema_store.activate, connection_string)
+    except Exception as e:
+        ingestion_jobs.create("database", status="failed", error=str(e))
+        raise HTTPException(status_code=400, detail=f"Schema discovery failed: {e}")
     
-    ingestion_jobs[job_id] = {
-        "type": "database",
-        "status": "completed",
-        "schema": schema,
-        "timestamp": datetime.now()
-    }
+    schema = public_schema(snapshot.schema)
+    job_id = ingestion_jobs.create("database", status="completed", schema=schema)
     
     return {
         "job_id": job_id,
@@ -40,43 +91,311 @@ async def connect_database(connection_string: str = Form(...)):
     }
 
 @router.post("/documents")
-async def upload_documents(files: List[UploadFile] = File(...)):
+async def upload_documents(background_tasks: BackgroundTasks, files: List[UploadFile] = File(...),
+                           sync: bool = Form(False), document_ids: Optional[List[str]] = Form(None)):
     """
-    Upload documents (bulk upload supported)
+    Upload documents (bulk upload supported).
+    Each document is identified by its entry in document_ids, one per file, or else by
+    its file name; uploading a document again under the same id replaces its indexed
+    version, and ids must be unique within an upload. Files already indexed with the
+    same content are skipped; with sync=true the upload is the complete collection and
+    indexed documents missing from it are removed.
     """
-    job_id = str(uuid.uuid4())
+    if document_ids is None:
+        document_ids = [file.filename or f"upload_{index}" for index, file in enumerate(files)]
+    elif len(document_ids) != len(files):
+        raise HTTPException(status_code=400, detail="document_ids needs one id per file")
+    duplicates = sorted({document_id for document_id in document_ids if document_ids.count(document_id) > 1})
+    if duplicates:
+        # Same-named documents would replace each other; tell them apart with document_ids
+        raise HTTPException(status_code=400, detail=f"Duplicate document ids in one upload: {', '.join(duplicates)}")
+
+    job_dir = os.path.join(Config.UPLOAD_SPOOL_DIR, str(uuid.uuid4()))
+    await run_in_threadpool(os.makedirs, job_dir, exist_ok=True)
     
     file_details = []
-    for file in files:
-        # Read file content
-        content = await file.read()
-        file_details.append({
-            "filename": file.filename,
-            "content_type": file.content_type,
-            "size": len(content)
-        })
+    total_size = 0
+    try:
+        for index, file in enumerate(files):
+            # Stream each upload to disk in fixed-size chunks instead of reading it whole
+            filename = os.path.basename(file.filename or f"upload_{index}")
+            path = os.path.join(job_dir, f"{index:05d}_{filename}")
+            size, sha256 = await _spool_upload(file, path, Config.UPLOAD_MAX_TOTAL_SIZE - total_size)
+            total_size += size
+            file_details.append({
+                "filename": file.filename,
+                "document_id": document_ids[index],
+                "content_type": file.content_type,
+                "size": size,
+                "sha256": sha256,
+                "path": path
+            })
+    except Exception:
+        await run_in_threadpool(shutil.rmtree, job_dir, True)
+        raise
     
-    ingestion_jobs[job_id] = {
-        "type": "documents",
-        "status": "processing",
-        "files": file_details,
-        "progress": 0,
-        "timestamp": datetime.now()
-    }
+    job_id = ingestion_jobs.create("documents", files=file_details, progress=0, sync=sync)
     
-    # Simulate processing
-    ingestion_jobs[job_id]["status"] = "completed"
-    ingestion_jobs[job_id]["progress"] = 100
+    # Parsing runs after the response has been sent
+    background_tasks.add_task(_process_documents_job, job_id, job_dir)
     
     return {
         "job_id": job_id,
-        "status": "completed",
-        "files": file_details
+        "status": "queued",
+        "files": [
+            {key: detail[key] for key in ("filename", "document_id", "content_type", "size", "sha256")}
+            for detail in file_details
+        ]
+    }
+
+async def _spool_upload(file: UploadFile, path: str, remaining_total: int,
+                        max_file_size: int = Config.UPLOAD_MAX_FILE_SIZE):
+    """
+    Copy an upload to path chunk by chunk, hashing as it goes.
+    Returns (size, sha256 hex digest); raises 413 when a size limit is exceeded.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    out = await run_in_threadpool(open, path, "wb")
+    try:
+        while True:
+            chunk = await file.read(Config.UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_file_size:
+                raise HTTPException(status_code=413, detail=f"{file.filename} exceeds the {max_file_size} byte file limit")
+            if size > remaining_total:
+                raise HTTPException(status_code=413, detail="Upload exceeds the total size limit")
+            digest.update(chunk)
+            await run_in_threadpool(out.write, chunk)
+    finally:
+        await run_in_threadpool(out.close)
+        await file.close()
+    return size, digest.hexdigest()
+
+def _process_documents_job(job_id: str, job_dir: str):
+    """Background job: parse changed spooled files, index them and report progress on the job record"""
+    job = ingestion_jobs.get(job_id)
+    ingestion_jobs.update(job_id, status="processing")
+    files = job["files"]
+    index_by_path = {detail["path"]: index for index, detail in enumerate(files)}
+    pipeline = get_embedding_pipeline()
+
+    def tracked_results():
+        # Files whose indexed version has the same content hash are not parsed again
+        indexed = pipeline.store.document_hashes(detail["document_id"] for detail in files)
+        known_hashes = {
+            detail["path"]: indexed[detail["document_id"]] for detail in files if detail["document_id"] in indexed
+        }
+        # Results arrive in completion order from the worker processes
+        results = get_document_processor().iter_process_documents(list(index_by_path), known_hashes)
+        for done, result in enumerate(results, start=1):
+            index = index_by_path[result["file_path"]]
+            fields = {"status": result["status"]}
+            if result["status"] == "error":
+                fields["error"] = result.get("error")
+            ingestion_jobs.update_file(job_id, index, **fields)
+            # Index chunks under the document id; the spool path is deleted afterwards
+            yield dict(result, file_path=files[index]["document_id"], file_name=files[index]["filename"])
+            ingestion_jobs.update(job_id, progress=int(done * 100 / len(files)))
+
+    try:
+        stats = pipeline.ingest_documents(tracked_results(), sync=job.get("sync", False))
+        ingestion_jobs.update(
+            job_id, status="completed",
+            chunks_indexed=stats["chunks_indexed"],
+            documents={key: stats[key] for key in ("new", "changed", "skipped", "removed", "failed")},
+            chunks={key[len("chunks_"):]: value for key, value in stats.items() if key.startswith("chunks_")}
+        )
+    except Exception as e:
+        ingestion_jobs.update(job_id, status="failed", error=str(e))
+    finally:
+        shutil.rmtree(job_dir, ignore_errors=True)
+
+@router.post("/tables")
+async def upload_tables(background_tasks: BackgroundTasks, files: List[UploadFile] = File(...),
+                        table_name: Optional[str] = Form(None), if_exists: str = Form("fail"),
+                        use_connected_database: bool = Form(False)):
+    """
+    Load CSV files as SQL tables, one table per file, named after the file unless
+    table_name is given (single file only). Tables are created in the local tables
+    database (TABLES_DATABASE_URL), which becomes the connected one, or with
+    use_connected_database=true in the database already connected; either way they
+    are queryable as soon as the job completes.
+    With if_exists=replace an existing table is replaced, but in a connected database
+    only if an earlier table upload created it.
+    """
+    if if_exists not in ("replace", "fail"):
+        raise HTTPException(status_code=400, detail="if_exists must be 'replace' or 'fail'")
+    if table_name is not None and len(files) != 1:
+        raise HTTPException(status_code=400, detail="table_name can only be given for a single file")
+    if use_connected_database and not schema_store.state.get("active_connection"):
+        raise HTTPException(status_code=400, detail="No database connected")
+
+    job_dir = os.path.join(Config.UPLOAD_SPOOL_DIR, str(uuid.uuid4()))
+    await run_in_threadpool(os.makedirs, job_dir, exist_ok=True)
+
+    file_details = []
+    total_size = 0
+    try:
+        for index, file in enumerate(files):
+            filename = os.path.basename(file.filename or f"upload_{index}.csv")
+            path = os.path.join(job_dir, f"{index:05d}_{filename}")
+            size, sha256 = await _spool_upload(file, path, Config.TABLE_UPLOAD_MAX_TOTAL_SIZE - total_size,
+                                               Config.TABLE_UPLOAD_MAX_FILE_SIZE)
+            total_size += size
+            file_details.append({
+                "filename": file.filename,
+                "table": table_name_for(table_name or filename),
+                "size": size,
+                "sha256": sha256,
+                "path": path,
+                "status": "queued"
+            })
+    except Exception:
+        await run_in_threadpool(shutil.rmtree, job_dir, True)
+        raise
+
+    job_id = ingestion_jobs.create("tables", files=file_details, progress=0, rows=0, if_exists=if_exists,
+                                   use_connected_database=use_connected_database)
+    background_tasks.add_task(_load_tables_job, job_id, job_dir)
+
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "files": [{key: detail[key] for key in ("filename", "table", "size", "sha256")} for detail in file_details]
     }
 
+def _load_tables_job(job_id: str, job_dir: str):
+    """Background job: stream spooled CSVs into tables, then publish the schema that includes them"""
+    job = ingestion_jobs.get(job_id)
+    ingestion_jobs.update(job_id, status="processing")
+    files = job["files"]
+    # The database connected in any worker when asked for, otherwise the local tables database
+    connection_string = Config.TABLES_DATABASE_URL
+    if job.get("use_connected_database"):
+        shared = schema_store.state.get("active_connection")
+        connection_string = resolve_connection(shared) if shared else connection_string
+    # Every table in the local tables database comes from an upload; elsewhere only recorded ones do
+    owned = connection_string == Config.TABLES_DATABASE_URL
+    uploaded = set() if owned else _uploaded_tables(connection_string)
+    loader = CSVTableLoader()
+    total_bytes = sum(detail["size"] for detail in files) or 1
+    loaded_rows, loaded_bytes = 0, 0
+    start = time.perf_counter()
+
+    def report(index: int, stats: dict):
+        ingestion_jobs.update_file(job_id, index, status="loading", rows=stats["rows"],
+                                   rows_per_second=stats["rows_per_second"])
+        ingestion_jobs.update(
+            job_id, rows=loaded_rows + stats["rows"], rows_per_second=stats["rows_per_second"],
+            progress=int((loaded_bytes + stats["bytes_read"]) * 100 / total_bytes)
+        )
+
+    try:
+        failed = 0
+        for index, detail in enumerate(files):
+            # A table the upload did not create is never replaced
+            if_exists = job["if_exists"] if owned or detail["table"] in uploaded else "fail"
+            try:
+                stats = loader.load(detail["path"], connection_string, detail["table"], if_exists,
+                                    progress=lambda stats, index=index: report(index, stats))
+            except Exception as e:
+                # One bad file (unparseable, or refused by the database) does not stop the others
+                failed += 1
+                ingestion_jobs.update_file(job_id, index, status="error", error=str(e))
+                continue
+            finally:
+                loaded_bytes += detail["size"]
+                os.remove(detail["path"])
+            loaded_rows += stats["rows"]
+            if not owned:
+                uploaded.add(detail["table"])
+                schema_store.state.set(_uploaded_tables_key(connection_string), sorted(uploaded))
+            ingestion_jobs.update_file(
+                job_id, index, status="loaded",
+                **{key: stats[key] for key in ("rows", "rows_per_second", "seconds", "columns",
+                                               "rejected_values", "malformed_rows")}
+            )
+        if failed == len(files):
+            raise TableLoadError("No file could be loaded")
+        # Register the new tables and make every worker re-discover before its next query
+        snapshot = schema_store.discover(connection_string)
+        schema_store.activate(connection_string)
+        ingestion_jobs.update(job_id, status="completed", progress=100, rows=loaded_rows,
+                              rows_per_second=round(loaded_rows / (time.perf_counter() - start), 1),
+                              schema_version=snapshot.version)
+    except Exception as e:
+        ingestion_jobs.update(job_id, status="failed", error=str(e))
+    finally:
+        shutil.rmtree(job_dir, ignore_errors=True)
+
+def _uploaded_tables_key(connection_string: str) -> str:
+    return f"uploaded_tables:{shareable_connection(connection_string)}"
+
+def _uploaded_tables(connection_string: str) -> set:
+    """Tables that table uploads created in a database, as recorded in the shared state"""
+    return set(schema_store.state.get(_uploaded_tables_key(connection_string)) or ())
+
 @router.get("/status")
-async def get_ingestion_status():
+async def get_ingestion_status(status: Optional[str] = None,
+                               limit: int = Query(Config.INGESTION_STATUS_PAGE_SIZE, ge=1, le=1000)):
     """
-    Check ingestion progress
+    Check ingestion progress (newest jobs first, summaries only)
     """
-    return {"jobs": ingestion_jobs}
\ No newline at end of file
+    return {"jobs": ingestion_jobs.list(status=status, limit=limit)}
+
+@router.get("/status/{job_id}")
+async def get_job_status(job_id: str):
+    """
+    Full status of one ingestion job, including per-file results
+    """
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _public_job(job)
+
+@router.get("/status/{job_id}/events")
+async def stream_job_status(job_id: str):
+    """
+    Server-sent events with the fields that changed since the previous event.
+    The first event carries the full job; the stream ends once the job finishes.
+    """
+    if ingestion_jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        previous, version = None, None
+        while True:
+            job, current_version = ingestion_jobs.snapshot(job_id)
+            if job is None:
+                yield _sse("error", {"job_id": job_id, "detail": "Job not found"})
+                return
+            if current_version != version:
+                job = _public_job(job)
+                yield _sse("progress", dict(job_delta(previous, job), version=current_version))
+                previous, version = job, current_version
+            if job["status"] in FINISHED_STATUSES:
+                yield _sse("end", {"job_id": job_id, "status": job["status"]})
+                return
+            if not await ingestion_jobs.wait_for_change(job_id, version, Config.INGESTION_EVENTS_KEEPALIVE_SECONDS):
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _public_job(job: dict) -> dict:
+    """Job record without server-side spool paths"""
+    if "files" in job:
+        job = dict(job, files=[
+            {key: value for key, value in detail.items() if key != "path"} for detail in job["files"]
+        ])
+    return job
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
@@ -1,53 +1,63 @@
-from fastapi import APIRouter, Form
-from typing import List, Dict
+from fastapi import APIRouter, Depends, Form, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
+from typing import List, Dict, Optional
+import json
+import time
 import uuid
 from datetime import datetime
-from backend.services.query_engine import QueryEngine
-from backend.services.schema_discovery import SchemaDiscovery
+from backend.api import dependencies
+from backend.config import Config
+from backend.services.database import get_active_engine
+from backend.services.metrics import QUERY_STAGE_SECONDS
+from backend.services.schema_store import get_schema_store
+from backend.services.sql_executor import SQLExecutor, UnsafeSQL, validate_select
 
 router = APIRouter(prefix="/api/query")
 
-# In-memory storage for demo purposes (would use database in production)
-query_history = []
+# The query engine and the persistent history store are built on first use
+# (see backend.api.dependencies), so importing the app stays cheap
+schema_store = get_schema_store()
 
-# Initialize services
-query_engine = QueryEngine()
-schema_discovery = SchemaDiscovery()
+async def _current_schema() -> dict:
+    """Schema of the connected database, or the demo schema when nothing is connected"""
+    return (await schema_store.current()).schema
 
 @router.post("/")
 @router.post("")  # Also accept POST requests without trailing slash
-async def process_query(query: str = Form(...)):
+async def process_query(
+    query: str = Form(...),
+    page_size: int = Form(Config.QUERY_PAGE_SIZE),
+    cursor: Optional[str] = Form(None),
+    query_engine=Depends(dependencies.get_query_engine),
+    query_history=Depends(dependencies.get_query_history)
+):
     """
     Process natural language query
     """
+    from backend.services.query_engine import normalize_query
     query_id = str(uuid.uuid4())
+    schema = await _current_schema()
     
-    # For demo purposes, we'll use a simple schema
-    schema = {
-        "tables": [
-            {
-                "name": "employees",
-                "columns": [
-                    {"name": "id", "type": "integer"},
-                    {"name": "name", "type": "string"},
-                    {"name": "department", "type": "string"},
-                    {"name": "salary", "type": "decimal"}
-                ]
-            }
-        ]
-    }
-    
-    # Process the query using our query engine
-    result = query_engine.process_query(query, schema)
+    # Process the query using our query engine without blocking the event loop
+    result = await query_engine.aprocess_query(query, schema, page_size=page_size, cursor=cursor)
     
-    # Add to history
-    query_history.append({
+    # Add to history (doubles as a workload log)
+    metrics = result.get("performance_metrics", {})
+    query_history.record({
         "query_id": query_id,
         "query": query,
-        "timestamp": datetime.now()
+        "normalized_query": normalize_query(query),
+        "query_type": result.get("query_type"),
+        "sql": result.get("sql"),
+        "timestamp": datetime.now(),
+        "response_time": metrics.get("response_time"),
+        "cache_hit": metrics.get("cache_hit"),
+        "error": result.get("error") or result.get("execution_error")
     })
     
-    return {
+    response = {
         "query_id": query_id,
         "original_query": query,
         "sql_query": result.get("sql", ""),
@@ -55,11 +65,84 @@ async def process_query(query: str = Form(...)):
         "performance_metrics": result.get("performance_metrics", {}),
         "sources": result.get("sources", [])
     }
+    if "rows" in result:
+        response.update({
+            "columns": result["columns"],
+            "results": result["rows"],
+            "next_cursor": result["next_cursor"],
+            "truncated": result["truncated"]
+        })
+    if "execution_error" in result:
+        response["execution_error"] = result["execution_error"]
+    if "warnings" in result:
+        response["warnings"] = result["warnings"]
+    return _json_response(response)
+
+def _json_response(response: dict) -> Response:
+    """
+    Encode the response ourselves so serialization is timed like the other stages.
+    The full breakdown, serialization included, is also sent as a Server-Timing header.
+    """
+    start = time.perf_counter()
+    body = json.dumps(jsonable_encoder(response)).encode("utf-8")
+    elapsed = time.perf_counter() - start
+    QUERY_STAGE_SECONDS.observe(elapsed, "serialization")
+
+    timings = dict(response["performance_metrics"].get("stage_timings", {}), serialization=elapsed)
+    server_timing = ", ".join(f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in timings.items())
+    return Response(content=body, media_type="application/json", headers={"Server-Timing": server_timing})
+
+@router.post("/export")
+async def export_query(query: str = Form(...), query_engine=Depends(dependencies.get_query_engine)):
+    """
+    Run a query to completion and stream every row as newline-delimited JSON
+    """
+    # Resolving the schema first also adopts a database activated in another worker
+    schema = await _current_schema()
+    engine = get_active_engine()
+    if engine is None:
+        raise HTTPException(status_code=400, detail="No database connected")
+
+    sql = await run_in_threadpool(query_engine.translate, query, schema)
+    # Checked before streaming starts, so a rejected statement is a 400 rather than a broken stream
+    try:
+        validate_select(sql, engine.dialect.name)
+    except UnsafeSQL as e:
+        raise HTTPException(status_code=400, detail=f"Generated SQL was rejected: {e}")
+    # The generator is consumed on the thread pool, one fetchmany batch at a time
+    return StreamingResponse(
+        SQLExecutor(engine).iter_ndjson(sql),
+        media_type="application/x-ndjson",
+        headers={"X-SQL-Query": " ".join(sql.split())}
+    )
 
 @router.get("/history")
 @router.get("/history/")  # Also accept GET requests with trailing slash
-async def get_query_history():
+async def get_query_history(
+    limit: int = Query(50, ge=1, le=Config.HISTORY_MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    q: Optional[str] = None,
+    normalized_query: Optional[str] = None,
+    query_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    query_history=Depends(dependencies.get_query_history)
+):
+    """
+    Get previous queries (for caching demo), newest first and paginated
+    """
+    return await run_in_threadpool(
+        query_history.list,
+        limit=limit,
+        offset=offset,
+        search=q,
+        normalized_query=normalized_query,
+        query_type=query_type,
+        since=since
+    )
+
+@router.get("/cache/stats")
+async def get_cache_stats(query_engine=Depends(dependencies.get_query_engine)):
     """
-    Get previous queries (for caching demo)
+    Query result cache hit/miss/eviction counters
     """
-    return {"history": query_history}
\ No newline at end of file
+    return query_engine.get_cache_stats()
@@ -1,41 +1,26 @@
-from fastapi import APIRouter
-from typing import Dict
+from fastapi import APIRouter, Request, Response
+from backend.services.schema_store import get_schema_store
 
 router = APIRouter(prefix="/api")
 
+schema_store = get_schema_store()
+
 @router.get("/schema")
-async def get_schema():
+async def get_schema(request: Request):
     """
-    Return current discovered schema for visualization
+    Return current discovered schema for visualization.
+    The body is serialized once per schema version; clients revalidate with If-None-Match.
     """
-    schema = {
-        "tables": [
-            {
-                "name": "employees",
-                "columns": [
-                    {"name": "id", "type": "integer", "primary_key": True},
-                    {"name": "name", "type": "string"},
-                    {"name": "department_id", "type": "integer", "foreign_key": "departments.id"},
-                    {"name": "salary", "type": "decimal"}
-                ]
-            },
-            {
-                "name": "departments",
-                "columns": [
-                    {"name": "id", "type": "integer", "primary_key": True},
-                    {"name": "name", "type": "string"},
-                    {"name": "manager_id", "type": "integer"}
-                ]
-            }
-        ],
-        "relationships": [
-            {
-                "name": "employee_department",
-                "from": "employees.department_id",
-                "to": "departments.id",
-                "type": "many_to_one"
-            }
-        ]
-    }
+    snapshot = await schema_store.current()
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    
+    if _etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+        return Response(status_code=304, headers=headers)
     
-    return schema
\ No newline at end of file
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+def _etag_matches(if_none_match, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {candidate.strip() for candidate in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -11,10 +12,135 @@ class Config:
     # Embeddings configuration
     EMBEDDINGS_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
     EMBEDDINGS_BATCH_SIZE = 32
+    # "sentence-transformers" loads EMBEDDINGS_MODEL; "hashing" is a deterministic offline stand-in
+    EMBEDDINGS_ENCODER = os.getenv("EMBEDDINGS_ENCODER", "sentence-transformers")
+    HASHING_EMBEDDINGS_DIMENSION = 384
+    VECTOR_STORE_DIR = os.getenv(
+        "VECTOR_STORE_DIR",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "vector_store")
+    )
+    
+    # Document retrieval configuration ("exact" or "ivf")
+    RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "exact")
+    RETRIEVAL_TOP_K = 5
+    IVF_MIN_VECTORS = 50000
+    IVF_N_LISTS = None  # defaults to sqrt(number of vectors)
+    IVF_N_PROBE = 8
+    # BM25 lexical retrieval, fused with the vector results by reciprocal rank
+    LEXICAL_SEARCH_ENABLED = os.getenv("LEXICAL_SEARCH_ENABLED", "true").lower() in ("1", "true", "yes")
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+    LEXICAL_MERGE_FACTOR = 8
+    # Rows missing from the lexical index are indexed inline up to this many, otherwise in the background
+    LEXICAL_SYNC_ROWS = 10000
+    RRF_K = 60
+    
+    # Query pipeline configuration
+    SQL_BRANCH_TIMEOUT_SECONDS = 10.0
+    DOCUMENT_BRANCH_TIMEOUT_SECONDS = 5.0
+    # Added to the cosine score of document hits that mention an entity returned by the SQL branch
+    HYBRID_ENTITY_BOOST = 0.1
+    HYBRID_MAX_ENTITIES = 200
+    QUERY_PAGE_SIZE = 100
+    QUERY_MAX_PAGE_SIZE = 1000
+    QUERY_STREAM_BATCH_SIZE = 1000
     
     # Cache configuration
     CACHE_TTL_SECONDS = 300
     CACHE_MAX_SIZE = 1000
+    SEMANTIC_CACHE_ENABLED = True
+    SEMANTIC_CACHE_MAX_SIZE = 1000
+    SEMANTIC_CACHE_THRESHOLD = 0.92
+    # Literals are lifted into bind parameters; statements are cached per fingerprint
+    SQL_FINGERPRINT_CACHE_SIZE = 4096
+    PREPARED_STATEMENT_CACHE_SIZE = 256
+    
+    # Query history configuration
+    HISTORY_DB_PATH = os.getenv(
+        "HISTORY_DB_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "query_history.sqlite3")
+    )
+    HISTORY_RETENTION_DAYS = 30
+    HISTORY_MAX_ROWS = 100000
+    HISTORY_WRITE_BATCH_SIZE = 100
+    HISTORY_FLUSH_INTERVAL_SECONDS = 0.5
+    HISTORY_MAX_PAGE_SIZE = 500
+    
+    # Document processing configuration
+    DOCUMENT_PROCESSOR_WORKERS = int(os.getenv("DOCUMENT_PROCESSOR_WORKERS", os.cpu_count() or 1))
+    
+    # Document upload configuration
+    UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "nlp_query_engine_uploads"))
+    UPLOAD_CHUNK_SIZE = 1024 * 1024
+    UPLOAD_MAX_FILE_SIZE = 200 * 1024 * 1024
+    UPLOAD_MAX_TOTAL_SIZE = 2 * 1024 * 1024 * 1024
+
+    # CSV table loading: uploaded CSVs become tables in this local SQLite database, or
+    # in the connected database when the upload asks for it
+    TABLES_DATABASE_URL = os.getenv(
+        "TABLES_DATABASE_URL",
+        "sqlite:///" + os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "tables.sqlite3")
+    )
+    TABLE_UPLOAD_MAX_FILE_SIZE = 4 * 1024 * 1024 * 1024
+    TABLE_UPLOAD_MAX_TOTAL_SIZE = 8 * 1024 * 1024 * 1024
+    TABLE_LOAD_SAMPLE_ROWS = 1000
+    TABLE_LOAD_BATCH_ROWS = 5000
+    TABLE_LOAD_TRANSACTION_ROWS = 50000
+
+    # Ingestion job registry configuration
+    INGESTION_MAX_FINISHED_JOBS = 200
+    INGESTION_FINISHED_JOB_TTL_SECONDS = 3600
+    INGESTION_STATUS_PAGE_SIZE = 100
+    INGESTION_EVENTS_KEEPALIVE_SECONDS = 15.0
+
+    # Worker state: "memory" keeps caches and jobs per process; "sqlite" shares them
+    # between the uvicorn workers of one host through STATE_DB_PATH
+    STATE_BACKEND = os.getenv("STATE_BACKEND", "memory")
+    STATE_DB_PATH = os.getenv(
+        "STATE_DB_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "state.sqlite3")
+    )
+    STATE_BUSY_TIMEOUT_SECONDS = 5.0
+    # How often a worker polls the shared store for progress of jobs running in another worker
+    STATE_POLL_INTERVAL_SECONDS = 0.25
+
+    # Column statistics collected during schema discovery
+    SCHEMA_PROFILING_ENABLED = os.getenv("SCHEMA_PROFILING_ENABLED", "true").lower() in ("1", "true", "yes")
+    PROFILE_SAMPLE_ROWS = 10000
+    PROFILE_TIME_BUDGET_SECONDS = 5.0
+    PROFILE_TOP_VALUES = 10
+    PROFILE_MAX_COLUMNS = 64
+    # Older statistics are profiled again by the next discovery, and their top-value
+    # lists are no longer trusted to cover every value of a column
+    PROFILE_MAX_AGE_SECONDS = 600
+    # Unfiltered scans of tables at least this large are flagged in query results
+    LARGE_TABLE_ROWS = 1000000
+
+    # LLM translation configuration ("gemini", "fake" or "none")
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini" if os.getenv("GEMINI_API_KEY") else "none")
+    GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-pro")
+    LLM_MAX_CONCURRENCY = 4
+    LLM_RATE_PER_SECOND = 1.0
+    LLM_BURST = 5
+    LLM_MAX_RETRIES = 3
+    LLM_BACKOFF_BASE_SECONDS = 0.5
+    LLM_BACKOFF_MAX_SECONDS = 4.0
+    # Below SQL_BRANCH_TIMEOUT_SECONDS so the rule-based fallback still has time to answer
+    LLM_TIMEOUT_SECONDS = 8.0
+    LLM_FAKE_LATENCY_SECONDS = float(os.getenv("LLM_FAKE_LATENCY_SECONDS", "0.2"))
+    LLM_MAX_SCHEMA_TABLES = 8
+    LLM_MAX_COLUMNS_PER_TABLE = 24
+
+    # Observability configuration
+    # Exposes /debug/profiler endpoints; keep off in production
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+    PROFILER_INTERVAL_SECONDS = 0.005
+    
+    # Startup configuration
+    # Preload models, services and the schema snapshot in the background; /ready reports progress
+    WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+    # Database connected (and discovered) by the warm-up, as if posted to /api/ingest/database
+    DATABASE_URL = os.getenv("DATABASE_URL")
     
     # API Keys
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -2,12 +2,42 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 import uvicorn
+from backend.api import dependencies
 from backend.api.routes import ingestion, query, schema
+from backend.config import Config
+from backend.services.database import dispose_engines
+from backend.services.metrics import registry
+from backend.services.profiler import SamplingProfiler
 
-app = FastAPI(title="NLP Query Engine for Employee Data")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup returns immediately: services load on first use, or in a background
+    warm-up (WARMUP_ON_STARTUP) that /ready reports on
+    """
+    warm_up = None
+    if Config.WARMUP_ON_STARTUP:
+        warm_up = asyncio.get_running_loop().run_in_executor(None, dependencies.warm_up)
+    else:
+        dependencies.readiness.status = "ready"
+    yield
+    if warm_up is not None:
+        await warm_up
+    history = dependencies.get_query_history.peek()
+    if history is not None:
+        history.close()
+    processor = dependencies.get_document_processor.peek()
+    if processor is not None:
+        processor.shutdown()
+    dispose_engines()
+
+app = FastAPI(title="NLP Query Engine for Employee Data", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -27,5 +57,76 @@ app.include_router(schema.router)
 async def root():
     return {"message": "NLP Query Engine for Employee Data API"}
 
+@app.get("/health")
+async def health():
+    """
+    Liveness: the process is up and serving requests
+    """
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def ready():
+    """
+    Readiness: 503 until the startup warm-up (when enabled) has finished
+    """
+    report = dependencies.readiness.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+def _cache_gauges():
+    engine = dependencies.get_query_engine.peek()
+    if engine is None:
+        return {}
+    stats = engine.get_cache_stats()
+    samples = {("result", key): stats[key] for key in ("size", "hits", "misses", "evictions")}
+    if "semantic" in stats:
+        for key in ("size", "hits", "misses"):
+            samples[("semantic", key)] = stats["semantic"][key]
+    for key in ("size", "hits", "misses"):
+        samples[("fingerprint", key)] = stats["results"][key]
+    for key in ("size", "hits", "misses"):
+        samples[("statement", key)] = stats["statements"][key]
+    return samples
+
+def _fast_path_gauges():
+    engine = dependencies.get_query_engine.peek()
+    if engine is None:
+        return {}
+    stats = engine.templates.stats()
+    return {(key,): stats[key] for key in ("hits", "misses")}
+
+registry.gauge("nlq_cache", "Query cache counters", _cache_gauges, ("cache", "stat"))
+registry.gauge(
+    "nlq_fast_path_translations", "Questions answered (hit) or passed on (miss) by the intent templates",
+    _fast_path_gauges, ("result",)
+)
+registry.gauge("nlq_ingestion_jobs", "Jobs held in the ingestion registry", lambda: {(): len(ingestion.ingestion_jobs)})
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus metrics: per-stage latency histograms and cache counters
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+if Config.PROFILING_ENABLED:
+    profiler = SamplingProfiler(Config.PROFILER_INTERVAL_SECONDS)
+
+    @app.post("/debug/profiler/start")
+    async def start_profiler():
+        profiler.start()
+        return profiler.stats()
+
+    @app.post("/debug/profiler/stop")
+    async def stop_profiler():
+        profiler.stop()
+        return profiler.stats()
+
+    @app.get("/debug/profiler", response_class=PlainTextResponse)
+    async def profiler_stacks(limit: int = 200):
+        """
+        Collapsed stacks collected so far (feed to flamegraph.pl or speedscope)
+        """
+        return PlainTextResponse(profiler.collapsed(limit))
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,172 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+import numpy as np
+
+
+class TTLCache:
+    """
+    Bounded in-process cache with TTL expiry and LRU eviction
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss or expired entry"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store value under key, evicting the least recently used entries if full"""
+        if self.max_size <= 0:
+            return
+
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self._entries[key] = (expires_at, value)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry (used when the schema changes)"""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+class SemanticCache:
+    """
+    Similarity cache keyed by query embeddings.
+    Embeddings live in a preallocated float32 matrix that is reused as a ring buffer,
+    so a lookup is one matrix-vector product plus an argmax. Entries can carry an exact
+    key (e.g. the literals of a query) that a lookup must match as well as the embedding.
+    """
+
+    def __init__(self, encoder, capacity: int, threshold: float):
+        self.encoder = encoder
+        self.capacity = capacity
+        self.threshold = threshold
+        self._matrix = None
+        self._values = [None] * capacity
+        self._keys = np.zeros(capacity, dtype=np.int64)
+        self._size = 0
+        self._next = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed a single query as a unit float32 vector"""
+        return self.encoder.encode([text])[0]
+
+    def lookup(self, embedding: np.ndarray, key: Hashable = None) -> Optional[Tuple[Any, float]]:
+        """Return (value, similarity) of the most similar stored query with the same key above the threshold"""
+        with self._lock:
+            if self._size == 0:
+                self.misses += 1
+                return None
+
+            scores = self._matrix[:self._size] @ embedding
+            scores[self._keys[:self._size] != _key_hash(key)] = -np.inf
+            best = int(np.argmax(scores))
+            similarity = float(scores[best])
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return self._values[best], similarity
+
+    def add(self, embedding: np.ndarray, value: Any, key: Hashable = None) -> None:
+        """Store value for embedding (and key), overwriting the oldest slot once full"""
+        if self.capacity <= 0:
+            return
+
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.capacity, embedding.shape[0]), dtype=np.float32)
+
+            slot = self._next
+            self._matrix[slot] = embedding
+            self._values[slot] = value
+            self._keys[slot] = _key_hash(key)
+            self._next = (slot + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+    def clear(self) -> None:
+        """Forget every stored embedding"""
+        with self._lock:
+            self._values = [None] * self.capacity
+            self._size = 0
+            self._next = 0
+            self.invalidations += 1
+
+    def __len__(self) -> int:
+        return self._size
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": self._size,
+                "capacity": self.capacity,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+def _key_hash(key: Hashable) -> int:
+    # Entries live in one process, so the built-in hash is stable for their lifetime
+    return hash(key)
@@ -0,0 +1,208 @@
+import math
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+from sqlalchemy import text
+from backend.config import Config
+from backend.services.sql_executor import to_json_value
+
+
+def estimate_distinct(counts: Counter, sample_size: int, total_rows: int) -> int:
+    """
+    Guaranteed-error estimator (Charikar et al.): values seen once in the sample are
+    scaled up by sqrt(N / n), values seen more often are assumed fully observed.
+    """
+    if sample_size >= total_rows or sample_size == 0:
+        return len(counts)
+    singletons = sum(1 for count in counts.values() if count == 1)
+    if singletons == sample_size:
+        # No value repeated even once: treat the column as unique
+        return total_rows
+    estimate = math.sqrt(total_rows / sample_size) * singletons + (len(counts) - singletons)
+    return int(min(total_rows, round(estimate)))
+
+
+def is_fresh(statistics: Optional[Dict[str, Any]], max_age: float = Config.PROFILE_MAX_AGE_SECONDS) -> bool:
+    """Whether a table's statistics were profiled less than max_age seconds ago"""
+    profiled_at = (statistics or {}).get("profiled_at")
+    return profiled_at is not None and time.time() - profiled_at < max_age
+
+
+class ColumnProfiler:
+    """
+    Per-column statistics for query planning, gathered from a bounded sample.
+    Tables are profiled in parallel, one pooled connection per worker, and every query
+    runs under a shared deadline so profiling never holds up discovery for long.
+    """
+
+    def __init__(self, max_workers: int = Config.DATABASE_POOL_SIZE,
+                 sample_rows: int = Config.PROFILE_SAMPLE_ROWS,
+                 time_budget: float = Config.PROFILE_TIME_BUDGET_SECONDS,
+                 top_values: int = Config.PROFILE_TOP_VALUES,
+                 max_columns: int = Config.PROFILE_MAX_COLUMNS):
+        self.max_workers = max_workers
+        self.sample_rows = sample_rows
+        self.time_budget = time_budget
+        self.top_values = top_values
+        self.max_columns = max_columns
+
+    def profile(self, engine, tables: List[dict]) -> Dict[str, dict]:
+        """{table name: statistics}; tables that could not be profiled in time carry an "error" entry"""
+        if not tables:
+            return {}
+
+        deadline = time.monotonic() + self.time_budget
+        workers = max(1, min(self.max_workers, len(tables)))
+        executor = ThreadPoolExecutor(max_workers=workers)
+        futures = {table["name"]: executor.submit(self._profile_table, engine, table, deadline) for table in tables}
+        wait(futures.values(), timeout=max(0.0, deadline - time.monotonic()) + 1.0)
+        executor.shutdown(wait=False)
+
+        statistics = {}
+        for name, future in futures.items():
+            if not future.done():
+                future.cancel()
+                statistics[name] = {"error": "profiling time budget exceeded"}
+            elif future.exception() is not None:
+                statistics[name] = {"error": str(future.exception())}
+            else:
+                statistics[name] = future.result()
+        return statistics
+
+    def _profile_table(self, engine, table: dict, deadline: float) -> dict:
+        if time.monotonic() >= deadline:
+            return {"error": "profiling time budget exceeded"}
+
+        preparer = engine.dialect.identifier_preparer
+        table_name = preparer.quote(table["name"])
+        columns = [column["name"] for column in table["columns"]][:self.max_columns]
+        projection = ", ".join(preparer.quote(column) for column in columns)
+        started = time.perf_counter()
+
+        with engine.connect() as connection:
+            reset = self._limit_statement_time(connection, deadline)
+            try:
+                # A capped count tells small tables (counted exactly) from large ones (estimated)
+                capped = connection.execute(text(
+                    f"SELECT COUNT(*) FROM (SELECT 1 FROM {table_name} LIMIT {self.sample_rows + 1}) AS capped"
+                )).scalar()
+                if capped <= self.sample_rows:
+                    row_count, estimated = capped, False
+                    rows = connection.execute(text(f"SELECT {projection} FROM {table_name}")).fetchall()
+                else:
+                    row_count, estimated = self._estimate_rows(connection, engine.dialect.name, table["name"], table_name)
+                    rows = self._sample(connection, engine.dialect.name, table_name, projection, row_count)
+            finally:
+                reset()
+
+        column_stats = {}
+        for index, column in enumerate(columns):
+            values = [row[index] for row in rows]
+            present = [value for value in values if value is not None]
+            counts = Counter(_hashable(value) for value in present)
+            stats = {
+                "null_fraction": round(1 - len(present) / len(values), 4) if values else 0.0,
+                "distinct_count": estimate_distinct(counts, len(present), row_count) if present else 0
+            }
+            comparable = [value for value in present if not isinstance(value, (bytes, bytearray, memoryview))]
+            try:
+                if comparable:
+                    stats["min"] = to_json_value(min(comparable))
+                    stats["max"] = to_json_value(max(comparable))
+            except TypeError:
+                pass
+            # Values seen once in a sample say nothing about the table, unless the sample is the table
+            if counts and (len(rows) >= row_count or counts.most_common(1)[0][1] > 1):
+                top = [(value, count) for value, count in counts.most_common(self.top_values)
+                       if count > 1 or len(rows) >= row_count]
+                stats["top_values"] = [
+                    {"value": to_json_value(value), "fraction": round(count / len(values), 4)} for value, count in top
+                ]
+                # Every distinct value was seen repeatedly, so the list covers the whole column
+                stats["top_values_complete"] = len(counts) <= self.top_values and (
+                    len(rows) >= row_count or all(count > 1 for count in counts.values())
+                )
+            column_stats[column] = stats
+
+        return {
+            "row_count": row_count,
+            "row_count_estimated": estimated,
+            "profiled_at": time.time(),
+            "sample_rows": len(rows),
+            "profile_seconds": round(time.perf_counter() - started, 4),
+            "columns": column_stats
+        }
+
+    def _estimate_rows(self, connection, dialect: str, raw_name: str, table_name: str):
+        """(row count, estimated?) from catalog statistics when available, else an exact count"""
+        try:
+            if dialect == "postgresql":
+                value = connection.execute(
+                    text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:name AS regclass)"),
+                    {"name": table_name}
+                ).scalar()
+                if value and value > 0:
+                    return int(value), True
+            elif dialect == "mysql":
+                value = connection.execute(
+                    text("SELECT table_rows FROM information_schema.tables "
+                         "WHERE table_schema = DATABASE() AND table_name = :name"),
+                    {"name": raw_name}
+                ).scalar()
+                if value:
+                    return int(value), True
+            elif dialect == "sqlite":
+                # Rowids are dense unless rows were deleted, which makes MAX a cheap upper bound
+                value = connection.execute(text(f"SELECT MAX(_rowid_) FROM {table_name}")).scalar()
+                if value:
+                    return int(value), True
+        except Exception:
+            pass
+        return int(connection.execute(text(f"SELECT COUNT(*) FROM {table_name}")).scalar()), False
+
+    def _sample(self, connection, dialect: str, table_name: str, projection: str, row_count: int) -> list:
+        """Roughly sample_rows rows spread over the table rather than its first pages"""
+        fraction = min(100.0, self.sample_rows * 100.0 / max(row_count, 1))
+        try:
+            if dialect == "postgresql":
+                return connection.execute(text(
+                    f"SELECT {projection} FROM {table_name} TABLESAMPLE SYSTEM ({fraction:.6f}) LIMIT {self.sample_rows}"
+                )).fetchall()
+            if dialect == "sqlite":
+                # Random rowid lookups use the table b-tree instead of scanning it
+                rowids = random.Random(0).sample(range(1, row_count + 1), self.sample_rows)
+                rows = []
+                for start in range(0, len(rowids), 500):
+                    batch = ", ".join(str(rowid) for rowid in rowids[start:start + 500])
+                    rows.extend(connection.execute(text(
+                        f"SELECT {projection} FROM {table_name} WHERE _rowid_ IN ({batch})"
+                    )).fetchall())
+                return rows
+        except Exception:
+            pass
+        return connection.execute(text(f"SELECT {projection} FROM {table_name} LIMIT {self.sample_rows}")).fetchall()
+
+    @staticmethod
+    def _limit_statement_time(connection, deadline: float):
+        """Make the database abandon profiling queries that run past the deadline; returns the undo"""
+        remaining_ms = max(1, int((deadline - time.monotonic()) * 1000))
+        dialect = connection.dialect.name
+        if dialect == "postgresql":
+            connection.execute(text(f"SET statement_timeout = {remaining_ms}"))
+            return lambda: connection.execute(text("SET statement_timeout = DEFAULT"))
+        if dialect == "mysql":
+            connection.execute(text(f"SET SESSION MAX_EXECUTION_TIME = {remaining_ms}"))
+            return lambda: connection.execute(text("SET SESSION MAX_EXECUTION_TIME = DEFAULT"))
+        if dialect == "sqlite":
+            raw = connection.connection
+            raw.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, 10000)
+            return lambda: raw.set_progress_handler(None, 0)
+        return lambda: None
+
+
+def _hashable(value: Any) -> Any:
+    if isinstance(value, (bytearray, memoryview)):
+        return bytes(value)
+    return value
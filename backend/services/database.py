@@ -0,0 +1,104 @@
+import threading
+from typing import Dict, Optional
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool, StaticPool
+from backend.config import Config
+
+# One pooled engine per connection string, shared by discovery and query execution
+_engines: Dict[str, Engine] = {}
+_engines_lock = threading.Lock()
+
+# The database most recently connected through the ingestion API; queries run against it
+_active_connection_string: Optional[str] = None
+
+# Connection strings with passwords that this process has seen, by their password-free form
+_credentials: Dict[str, str] = {}
+
+
+def get_engine(connection_string: str) -> Engine:
+    """
+    Return the pooled engine for a connection string, creating it on first use.
+    The pool is sized by Config.DATABASE_POOL_SIZE.
+    """
+    engine = _engines.get(connection_string)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(connection_string)
+            if engine is None:
+                engine = create_engine(connection_string, **_engine_options(connection_string))
+                _engines[connection_string] = engine
+    return engine
+
+
+def set_active_connection(connection_string: str) -> None:
+    """Make connection_string the database that generated SQL is executed against"""
+    global _active_connection_string
+    get_engine(connection_string)
+    _active_connection_string = connection_string
+
+
+def get_active_connection() -> Optional[str]:
+    return _active_connection_string
+
+
+def shareable_connection(connection_string: str) -> str:
+    """
+    connection_string without its password, for writing to state shared with other
+    workers; the full string is remembered so this process can resolve it again
+    """
+    url = make_url(connection_string)
+    if url.password is None:
+        return connection_string
+    shared = url.set(password=None).render_as_string(hide_password=False)
+    _credentials[shared] = connection_string
+    return shared
+
+
+def resolve_connection(shared: str) -> str:
+    """
+    Full connection string for a shareable one: as this process saw it, or as given
+    by Config.DATABASE_URL; otherwise it is used without a password, leaving the driver
+    to find one (e.g. PGPASSWORD or ~/.pgpass)
+    """
+    if shared not in _credentials and Config.DATABASE_URL:
+        shareable_connection(Config.DATABASE_URL)
+    return _credentials.get(shared, shared)
+
+
+def get_active_engine() -> Optional[Engine]:
+    """Pooled engine of the active database, or None if no database has been connected"""
+    if _active_connection_string is None:
+        return None
+    return get_engine(_active_connection_string)
+
+
+def dispose_engines() -> None:
+    """Close every pooled connection (used on shutdown)"""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+
+def _engine_options(connection_string: str) -> dict:
+    url = make_url(connection_string)
+
+    if url.get_backend_name() == "sqlite":
+        # sqlite3 keeps this many prepared statements per connection, keyed by SQL text
+        connect_args = {"check_same_thread": False, "cached_statements": Config.PREPARED_STATEMENT_CACHE_SIZE}
+        if not url.database or url.database == ":memory:":
+            # An in-memory database only exists on its one connection
+            return {"poolclass": StaticPool, "connect_args": connect_args}
+        return {
+            "poolclass": QueuePool,
+            "pool_size": Config.DATABASE_POOL_SIZE,
+            "max_overflow": 0,
+            "connect_args": connect_args
+        }
+
+    return {
+        "pool_size": Config.DATABASE_POOL_SIZE,
+        "max_overflow": Config.DATABASE_POOL_SIZE,
+        "pool_pre_ping": True
+    }
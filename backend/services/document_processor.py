@@ -1,12 +1,222 @@
+import asyncio
+import csv
+import hashlib
+import multiprocessing
 import os
-from typing import List, Dict, Any
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Iterable, Iterator, AsyncIterator, Optional, Union
+from backend.config import Config
+
+
+# Chunk sizing per document type, in whitespace-delimited words.
+# A chunk closes early at one of the type's structural boundaries once it holds min_words.
+# The encoder (all-MiniLM-L6-v2) truncates its input at 256 word pieces and English prose runs
+# about 1.3-1.5 pieces per word, more with names and numbers, so chunks stay at or under 160
+# words; a longer chunk would lose its tail from the embedding without any error
+CHUNK_PROFILES = {
+    "resume": {"max_words": 140, "overlap": 15, "min_words": 30, "boundaries": {"heading"}},
+    "contract": {"max_words": 160, "overlap": 25, "min_words": 50, "boundaries": {"clause", "heading"}},
+    "review": {"max_words": 150, "overlap": 20, "min_words": 40, "boundaries": {"paragraph", "heading"}},
+    "default": {"max_words": 160, "overlap": 25, "min_words": 60, "boundaries": {"paragraph", "heading", "clause"}}
+}
+
+# Text without newlines is handed on in pieces of about this size, to bound buffering
+_MAX_LINE_CHARS = 64 * 1024
+
+_WORD_PATTERN = re.compile(r"\S+")
+_HEADING_PATTERN = re.compile(
+    r"^\s*(#{1,6}\s+\S|(summary|objective|experience|work experience|employment history|education|skills|"
+    r"technical skills|projects|certifications|achievements|references)\s*:?\s*$)",
+    re.IGNORECASE
+)
+_CLAUSE_PATTERN = re.compile(
+    r"^\s*(\d+(\.\d+)*[.)]\s+\S|\d+\.\d+(\.\d+)*\s+\S|(article|section|clause)\s+[\divxlc]+\b|\([a-z0-9]{1,3}\)\s+\S)",
+    re.IGNORECASE
+)
+
+_DOCUMENT_TYPE_KEYWORDS = {
+    "resume": ("resume", "curriculum vitae", "cv", "work experience", "skills"),
+    "contract": ("contract", "agreement", "hereinafter", "whereas", "clause", "party"),
+    "review": ("review", "performance", "appraisal", "feedback")
+}
+
+
+def detect_document_type(file_path: str, sample: str) -> str:
+    """Guess "resume", "contract" or "review" from the file name and the start of its text"""
+    name = os.path.basename(file_path).lower()
+    for doc_type, keywords in _DOCUMENT_TYPE_KEYWORDS.items():
+        if any(keyword in name for keyword in keywords[:2]):
+            return doc_type
+
+    words = set(re.findall(r"[a-z]+", sample[:4000].lower()))
+    text = " ".join(words)
+    best, best_hits = "default", 0
+    for doc_type, keywords in _DOCUMENT_TYPE_KEYWORDS.items():
+        hits = sum(1 for keyword in keywords if (keyword in words if " " not in keyword else keyword in text))
+        if hits > best_hits:
+            best, best_hits = doc_type, hits
+    return best if best_hits >= 2 else "default"
+
+
+def _iter_lines(content: Union[str, Iterable[str]]) -> Iterator[str]:
+    """Yield lines from a string or from arbitrary text pieces without joining the whole input"""
+    if isinstance(content, str):
+        start = 0
+        while start < len(content):
+            end = content.find("\n", start)
+            if end == -1:
+                yield content[start:]
+                return
+            yield content[start:end + 1]
+            start = end + 1
+        return
+
+    pending: List[str] = []
+    pending_size = 0
+    for piece in content:
+        if "\n" not in piece:
+            pending.append(piece)
+            pending_size += len(piece)
+            if pending_size > _MAX_LINE_CHARS:
+                # No line break in sight: pass on what is buffered, up to its last word break
+                text = "".join(pending)
+                cut = text.rfind(" ") + 1 or len(text)
+                yield text[:cut]
+                pending, pending_size = [text[cut:]], len(text) - cut
+            continue
+        lines = piece.split("\n")
+        pending.append(lines[0])
+        lines[0] = "".join(pending)
+        pending, pending_size = [lines[-1]], len(lines[-1])
+        yield from lines[:-1]
+    tail = "".join(pending)
+    if tail:
+        yield tail
+
+
+def _boundary_kind(line: str) -> Optional[str]:
+    if not line.strip():
+        return "paragraph"
+    if _HEADING_PATTERN.match(line):
+        return "heading"
+    stripped = line.strip()
+    if len(stripped) <= 60 and (stripped.isupper() or stripped.endswith(":")) and any(c.isalpha() for c in stripped):
+        return "heading"
+    if _CLAUSE_PATTERN.match(line):
+        return "clause"
+    return None
+
+
+def _extract_pdf(file_path: str) -> str:
+    import PyPDF2
+
+    with open(file_path, "rb") as file:
+        # PyPDF2 renamed its reader and text methods in 2.x
+        reader_class = getattr(PyPDF2, "PdfReader", None) or PyPDF2.PdfFileReader
+        reader = reader_class(file)
+        pages = []
+        for page in reader.pages:
+            extract = getattr(page, "extract_text", None) or page.extractText
+            pages.append(extract() or "")
+    return "\n\n".join(pages)
+
+
+def _extract_docx(file_path: str) -> str:
+    import docx
+
+    document = docx.Document(file_path)
+    parts = [paragraph.text for paragraph in document.paragraphs]
+    for table in document.tables:
+        for row in table.rows:
+            parts.append(" | ".join(cell.text for cell in row.cells))
+    return "\n".join(parts)
+
+
+def _extract_csv(file_path: str) -> str:
+    with open(file_path, "r", encoding="utf-8", errors="ignore", newline="") as file:
+        return "\n".join(", ".join(row) for row in csv.reader(file))
+
+
+def _extract_txt(file_path: str) -> str:
+    with open(file_path, "r", encoding="utf-8", errors="ignore") as file:
+        return file.read()
+
+
+_EXTRACTORS = {
+    ".pdf": _extract_pdf,
+    ".docx": _extract_docx,
+    ".csv": _extract_csv,
+    ".txt": _extract_txt
+}
+
+
+def file_hash(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """SHA-256 hex digest of a file's bytes, read in blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _process_file(file_path: str, known_hash: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Parse a single file; runs inside a worker process, so it must never raise.
+    A file whose content hash equals known_hash is not parsed and comes back "skipped".
+    """
+    file_extension = os.path.splitext(file_path)[1].lower()
+    try:
+        content_hash = file_hash(file_path)
+        if content_hash == known_hash:
+            return {
+                "file_path": file_path,
+                "content": "",
+                "type": file_extension,
+                "status": "skipped",
+                "content_hash": content_hash
+            }
+
+        extractor = _EXTRACTORS.get(file_extension)
+        if extractor is None:
+            content = f"Unsupported file type: {file_extension}"
+        else:
+            content = extractor(file_path)
+
+        return {
+            "file_path": file_path,
+            "content": content,
+            "type": file_extension,
+            "status": "processed",
+            "content_hash": content_hash
+        }
+    except Exception as e:
+        return _error_result(file_path, e)
+
+
+def _error_result(file_path: str, error: Exception) -> Dict[str, Any]:
+    return {
+        "file_path": file_path,
+        "content": "",
+        "type": os.path.splitext(file_path)[1].lower(),
+        "status": "error",
+        "error": str(error)
+    }
+
 
 class DocumentProcessor:
     """
     Class to handle processing of various document types
     """
-    
-    def process_documents(self, file_paths: List[str]) -> List[Dict[str, Any]]:
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or Config.DOCUMENT_PROCESSOR_WORKERS
+        self._executor = None
+
+    def process_documents(self, file_paths: List[str],
+                          known_hashes: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
         """
         Process multiple document types:
         - Auto-detect file type (PDF, DOCX, TXT, CSV)
@@ -14,68 +224,159 @@ class DocumentProcessor:
         - Generate embeddings in batches for efficiency
         - Store with proper indexing for fast retrieval
         """
-        processed_docs = []
-        
-        for file_path in file_paths:
+        return list(self.iter_process_documents(file_paths, known_hashes))
+
+    def iter_process_documents(self, file_paths: List[str],
+                               known_hashes: Optional[Dict[str, str]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Parse files on the process pool and yield results in completion order.
+        At most a few tasks per worker are in flight, so results never pile up
+        faster than the caller consumes them.
+        Files whose content hash matches known_hashes[file_path] (the hash of the
+        already indexed version) are skipped without being parsed.
+        A worker that dies (e.g. a parser crash or the OOM killer) breaks the whole pool
+        and fails every in-flight file with it. The pool is then replaced and those files
+        are retried one at a time, so only a file that kills a worker again is reported
+        as an error.
+        """
+        known_hashes = known_hashes or {}
+        if self.max_workers <= 1 or len(file_paths) <= 1:
+            for file_path in file_paths:
+                yield _process_file(file_path, known_hashes.get(file_path))
+            return
+
+        executor = self._get_executor()
+        pending_paths = iter(file_paths)
+        queued = deque()   # files to submit before the rest of file_paths
+        suspects = deque()  # files that were in flight when a worker died
+        in_flight = {}  # future -> (file_path, retried)
+        max_in_flight = self.max_workers * 4
+
+        def submit(file_path, retried):
             try:
-                file_extension = os.path.splitext(file_path)[1].lower()
-                
-                if file_extension in [".pdf", ".docx", ".txt", ".csv"]:
-                    content = self._process_generic(file_path)
-                else:
-                    content = f"Unsupported file type: {file_extension}"
-                
-                processed_docs.append({
-                    "file_path": file_path,
-                    "content": content,
-                    "type": file_extension,
-                    "status": "processed"
-                })
-            except Exception as e:
-                processed_docs.append({
-                    "file_path": file_path,
-                    "content": "",
-                    "type": os.path.splitext(file_path)[1].lower(),
-                    "status": "error",
-                    "error": str(e)
-                })
-        
-        return processed_docs
-    
-    def dynamic_chunking(self, content: str, doc_type: str) -> List[str]:
+                in_flight[executor.submit(_process_file, file_path, known_hashes.get(file_path))] = (file_path, retried)
+            except BrokenProcessPool as e:
+                (suspects if retried else queued).appendleft(file_path)
+                return e
+            return None
+
+        def fill():
+            """Submit more work; returns the error if the pool turns out to be broken"""
+            if suspects:
+                # A retried file runs alone, so a second crash can only be its own
+                return None if in_flight else submit(suspects.popleft(), True)
+            while len(in_flight) < max_in_flight:
+                file_path = queued.popleft() if queued else next(pending_paths, None)
+                if file_path is None:
+                    return None
+                error = submit(file_path, False)
+                if error is not None:
+                    return error
+            return None
+
+        while True:
+            broken = fill()
+            if broken is None:
+                if not in_flight:
+                    return
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path, retried = in_flight.pop(future)
+                    try:
+                        yield future.result()
+                    except BrokenProcessPool as e:
+                        broken = e
+                        if retried:
+                            yield _error_result(file_path, e)
+                        else:
+                            suspects.append(file_path)
+                    except Exception as e:
+                        yield _error_result(file_path, e)
+            if broken is not None:
+                # Every other in-flight future fails with the pool; collect them before replacing it
+                wait(in_flight)
+                for future, (file_path, retried) in in_flight.items():
+                    if future.exception() is None:
+                        yield future.result()
+                    elif retried or not isinstance(future.exception(), BrokenProcessPool):
+                        yield _error_result(file_path, future.exception())
+                    else:
+                        suspects.append(file_path)
+                in_flight.clear()
+                executor = self._replace_executor(executor)
+
+    async def aprocess_documents(self, file_paths: List[str],
+                                 known_hashes: Optional[Dict[str, str]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Async variant of iter_process_documents that never blocks the event loop:
+        the same iterator (and its crash recovery) is advanced on the default thread pool
+        """
+        loop = asyncio.get_running_loop()
+        results = self.iter_process_documents(file_paths, known_hashes)
+        done = object()
+        while True:
+            result = await loop.run_in_executor(None, next, results, done)
+            if result is done:
+                return
+            yield result
+
+    def shutdown(self) -> None:
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _replace_executor(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """Discard a broken pool and return a fresh one"""
+        broken.shutdown(wait=False)
+        if self._executor is broken:
+            self._executor = None
+        return self._get_executor()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn avoids forking a process that is already running server threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def dynamic_chunking(self, content: Union[str, Iterable[str]], doc_type: str) -> Iterator[str]:
         """
         Intelligent chunking based on document structure:
         - Resumes: Keep skills and experience sections together
         - Contracts: Preserve clause boundaries
         - Reviews: Maintain paragraph integrity
+
+        content may be a string or any iterable of text pieces (e.g. an open file);
+        chunks are yielded as soon as they are complete, so memory stays bounded
+        by the chunk size rather than the document size.
         """
-        # Simple chunking implementation
-        max_chunk_size = 1000
-        chunks = []
-        
-        # Split content into chunks
-        words = content.split()
-        current_chunk = []
-        current_size = 0
-        
-        for word in words:
-            if current_size + len(word) > max_chunk_size and current_chunk:
-                chunks.append(" ".join(current_chunk))
-                current_chunk = [word]
-                current_size = len(word)
-            else:
-                current_chunk.append(word)
-                current_size += len(word) + 1  # +1 for space
-        
-        if current_chunk:
-            chunks.append(" ".join(current_chunk))
-        
-        return chunks
-    
-    def _process_generic(self, file_path: str) -> str:
-        """Generic file processing"""
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
-                return file.read()[:1000]  # Limit to first 1000 characters
-        except Exception as e:
-            return f"Error processing file: {str(e)}"
\ No newline at end of file
+        profile = CHUNK_PROFILES.get(doc_type, CHUNK_PROFILES["default"])
+        max_words = profile["max_words"]
+        overlap = profile["overlap"]
+        min_words = profile["min_words"]
+        boundaries = profile["boundaries"]
+
+        current: List[str] = []
+        fresh = 0  # words added since the last emitted chunk (excludes carried-over overlap)
+
+        for line in _iter_lines(content):
+            boundary = _boundary_kind(line)
+            if boundary in boundaries and fresh and len(current) >= min_words:
+                # Structural break: close the chunk without carrying overlap across it
+                yield " ".join(current)
+                current, fresh = [], 0
+
+            for match in _WORD_PATTERN.finditer(line):
+                current.append(match.group())
+                fresh += 1
+                if len(current) >= max_words:
+                    # Size-based split inside a section: keep some context in the next chunk
+                    yield " ".join(current)
+                    current = current[-overlap:] if overlap else []
+                    fresh = 0
+
+        if fresh:
+            yield " ".join(current)
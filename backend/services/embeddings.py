@@ -0,0 +1,277 @@
+import hashlib
+import importlib.util
+import logging
+import re
+import threading
+import zlib
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+from backend.config import Config
+from backend.services.document_processor import detect_document_type
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize each row in place so dot products are cosine similarities"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors /= norms
+    return vectors
+
+
+class HashingEncoder:
+    """
+    Deterministic, dependency-free stand-in for a sentence embedding model.
+    Words and character trigrams are hashed into a fixed number of signed buckets.
+    """
+
+    def __init__(self, dimension: int = Config.HASHING_EMBEDDINGS_DIMENSION):
+        self.dimension = dimension
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts into an (n, dimension) float32 matrix of unit vectors"""
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if digest & 0x80000000 else -1.0
+                vectors[row, digest % self.dimension] += sign
+        return _normalize_rows(vectors)
+
+    def _features(self, text: str):
+        for word in _TOKEN_PATTERN.findall(text.lower()):
+            yield word
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                yield padded[i:i + 3]
+
+
+class SentenceTransformerEncoder:
+    """
+    Encoder backed by sentence-transformers; the model is loaded on first use
+    """
+
+    def __init__(self, model_name: str = Config.EMBEDDINGS_MODEL, batch_size: int = Config.EMBEDDINGS_BATCH_SIZE):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts into an (n, dimension) float32 matrix of unit vectors"""
+        vectors = self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True)
+        return _normalize_rows(np.asarray(vectors, dtype=np.float32))
+
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+def get_encoder():
+    """
+    Return the process-wide encoder selected by Config.EMBEDDINGS_ENCODER.
+    Falls back to the hashing encoder when sentence-transformers is not installed.
+    """
+    global _encoder
+    if _encoder is None:
+        with _encoder_lock:
+            if _encoder is None:
+                _encoder = _create_encoder(Config.EMBEDDINGS_ENCODER)
+    return _encoder
+
+
+def _create_encoder(name: Optional[str]):
+    if name == "hashing":
+        return HashingEncoder()
+    # Only check that it is installed: importing it (and torch) is left to the first encode
+    if importlib.util.find_spec("sentence_transformers") is None:
+        logger.warning("sentence-transformers is not installed; using the hashing encoder")
+        return HashingEncoder()
+    return SentenceTransformerEncoder()
+
+
+def chunk_hash(text: str) -> str:
+    """Identity of a chunk's text, used to keep unchanged chunks on re-ingestion"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingPipeline:
+    """
+    Chunk processed documents, embed the chunks in batches and append them to a vector store.
+    Batches are filled across document boundaries, so many small documents still
+    produce full EMBEDDINGS_BATCH_SIZE encoder calls.
+    Ingestion is incremental: documents are keyed by file_path and compared by content
+    hash, and only chunks that are not already stored are embedded.
+    """
+
+    def __init__(self, processor, encoder=None, store=None, batch_size: int = Config.EMBEDDINGS_BATCH_SIZE,
+                 lexical=None):
+        self.processor = processor
+        self._encoder = encoder
+        self._store = store
+        self.batch_size = batch_size
+        self._lexical = lexical
+        # The process-wide lexical index mirrors the process-wide store only
+        self._shared_lexical = lexical is None and store is None and Config.LEXICAL_SEARCH_ENABLED
+
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            self._encoder = get_encoder()
+        return self._encoder
+
+    @property
+    def store(self):
+        if self._store is None:
+            from backend.services.vector_store import get_vector_store
+            self._store = get_vector_store()
+        return self._store
+
+    @property
+    def lexical(self):
+        """BM25 index fed alongside the vector store, or None when lexical search is off"""
+        if self._lexical is None and self._shared_lexical:
+            from backend.services.lexical_index import get_lexical_index
+            self._lexical = get_lexical_index()
+        return self._lexical
+
+    def add_documents(self, documents: Iterable[Dict[str, Any]]) -> int:
+        """Embed and store the new chunks of the successfully processed documents; returns their count"""
+        return self.ingest_documents(documents)["chunks_indexed"]
+
+    def ingest_documents(self, documents: Iterable[Dict[str, Any]], sync: bool = False) -> Dict[str, int]:
+        """
+        Bring the index up to date with processed documents:
+        - Documents skipped by the processor, or whose content hash is already indexed, are left alone
+        - Chunks of a changed document whose text hash is unchanged keep their stored row
+        - New chunk texts are embedded, unless another document already holds the same
+          text, in which case its vector is copied
+        - Chunks of the previous version that are no longer present are tombstoned
+
+        With sync=True, documents is the complete collection: indexed documents missing
+        from it are removed. Returns document counts (new, changed, skipped, removed,
+        failed) and chunk counts.
+        """
+        stats = dict.fromkeys((
+            "new", "changed", "skipped", "removed", "failed",
+            "chunks_indexed", "chunks_embedded", "chunks_copied", "chunks_unchanged", "chunks_tombstoned"
+        ), 0)
+        seen = set()
+        batch: List[Dict[str, Any]] = []
+        # Documents whose chunks are not all stored yet, finished in order once they are
+        pending: List[Dict[str, Any]] = []
+
+        for document in documents:
+            file_path = document["file_path"]
+            seen.add(file_path)
+            if document.get("status") == "skipped":
+                stats["skipped"] += 1
+                continue
+            if document.get("status") != "processed":
+                stats["failed"] += 1
+                continue
+
+            content_hash = document.get("content_hash") or hashlib.sha256(document["content"].encode("utf-8")).hexdigest()
+            previous_hash = self.store.document_hashes([file_path]).get(file_path)
+            if previous_hash == content_hash:
+                stats["skipped"] += 1
+                continue
+            live = self.store.live_chunks(file_path)
+            stats["changed" if previous_hash is not None or live else "new"] += 1
+
+            stored: Dict[str, List[int]] = {}
+            for row_id, stored_hash, _ in live:
+                if stored_hash is not None:
+                    stored.setdefault(stored_hash, []).append(row_id)
+
+            record = {"file_path": file_path, "content_hash": content_hash, "chunks": [], "waiting": 0, "complete": False}
+            pending.append(record)
+            # The file name, when the document is keyed by something else, hints at its type
+            doc_type = detect_document_type(document.get("file_name") or file_path, document["content"][:4000])
+            for chunk_index, chunk in enumerate(self.processor.dynamic_chunking(document["content"], doc_type)):
+                text_hash = chunk_hash(chunk)
+                if stored.get(text_hash):
+                    record["chunks"].append((stored[text_hash].pop(), chunk_index))
+                    stats["chunks_unchanged"] += 1
+                    continue
+                record["waiting"] += 1
+                batch.append({
+                    "record": record,
+                    "metadata": {
+                        "file_path": file_path,
+                        "chunk_index": chunk_index,
+                        "doc_type": doc_type,
+                        "text": chunk,
+                        "chunk_hash": text_hash
+                    }
+                })
+                if len(batch) >= self.batch_size:
+                    self._flush(batch, stats)
+                    batch = []
+            record["complete"] = True
+            pending = self._finish_documents(pending, stats)
+
+        if batch:
+            self._flush(batch, stats)
+        self._finish_documents(pending, stats)
+
+        if sync:
+            missing = set(self.store.indexed_documents()) - seen
+            stats["removed"] = len(missing)
+            stats["chunks_tombstoned"] += self.store.remove_documents(missing)
+        return stats
+
+    def remove_documents(self, file_paths: Iterable[str]) -> int:
+        """Tombstone every chunk of the given documents; returns the number of chunks removed"""
+        return self.store.remove_documents(file_paths)
+
+    def _flush(self, batch: List[Dict[str, Any]], stats: Dict[str, int]) -> None:
+        metadata = [entry["metadata"] for entry in batch]
+        # A chunk text already embedded for another document reuses that vector
+        copies = self.store.find_chunks(meta["chunk_hash"] for meta in metadata)
+        to_encode = [meta["text"] for meta in metadata if meta["chunk_hash"] not in copies]
+        encoded = iter(self.encoder.encode(to_encode)) if to_encode else iter(())
+        stored = self.store.vectors() if copies else None
+        vectors = np.vstack([
+            stored[copies[meta["chunk_hash"]]] if meta["chunk_hash"] in copies else next(encoded)
+            for meta in metadata
+        ])
+
+        ids = self.store.append(vectors, metadata)
+        if self.lexical is not None:
+            # Ignored when the index is behind the store; the retriever catches it up
+            self.lexical.add(ids[0], [meta["text"] for meta in metadata])
+        for entry, row_id in zip(batch, ids):
+            entry["record"]["chunks"].append((row_id, entry["metadata"]["chunk_index"]))
+            entry["record"]["waiting"] -= 1
+        stats["chunks_indexed"] += len(ids)
+        stats["chunks_embedded"] += len(to_encode)
+        stats["chunks_copied"] += len(ids) - len(to_encode)
+
+    def _finish_documents(self, pending: List[Dict[str, Any]], stats: Dict[str, int]) -> List[Dict[str, Any]]:
+        """Switch documents whose chunks are all stored to their new version; returns the rest"""
+        remaining = []
+        for record in pending:
+            if record["complete"] and record["waiting"] == 0:
+                stats["chunks_tombstoned"] += self.store.replace_document(
+                    record["file_path"], record["content_hash"], record["chunks"]
+                )
+            else:
+                remaining.append(record)
+        return remaining
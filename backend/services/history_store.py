@@ -0,0 +1,181 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from backend.config import Config
+
+_COLUMNS = (
+    "query_id", "query", "normalized_query", "query_type", "sql", "timestamp",
+    "response_time", "cache_hit", "error"
+)
+
+
+class QueryHistoryStore:
+    """
+    Persistent query history backed by SQLite.
+    Request handlers only enqueue entries; a writer thread inserts them in batches,
+    so recording history never waits on disk I/O. Old rows are pruned by age and count.
+    """
+
+    def __init__(self, path: str = Config.HISTORY_DB_PATH,
+                 retention_days: int = Config.HISTORY_RETENTION_DAYS,
+                 max_rows: int = Config.HISTORY_MAX_ROWS,
+                 batch_size: int = Config.HISTORY_WRITE_BATCH_SIZE,
+                 flush_interval: float = Config.HISTORY_FLUSH_INTERVAL_SECONDS):
+        self.path = path
+        self.retention_days = retention_days
+        self.max_rows = max_rows
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._read_lock = threading.Lock()
+        self._reader = self._connect()
+        self._reader.executescript(
+            "CREATE TABLE IF NOT EXISTS query_history ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " query_id TEXT NOT NULL,"
+            " query TEXT NOT NULL,"
+            " normalized_query TEXT NOT NULL,"
+            " query_type TEXT,"
+            " sql TEXT,"
+            " timestamp TEXT NOT NULL,"
+            " response_time REAL,"
+            " cache_hit INTEGER,"
+            " error TEXT);"
+            "CREATE INDEX IF NOT EXISTS idx_history_timestamp ON query_history (timestamp);"
+            "CREATE INDEX IF NOT EXISTS idx_history_normalized ON query_history (normalized_query, timestamp);"
+        )
+        self._reader.commit()
+
+        self._stopped = threading.Event()
+        self._writer = threading.Thread(target=self._write_loop, name="query-history-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        """Queue a history entry for the background writer"""
+        self._queue.put(entry)
+
+    def list(self, limit: int = 50, offset: int = 0, search: Optional[str] = None,
+             normalized_query: Optional[str] = None, query_type: Optional[str] = None,
+             since: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Newest-first page of history. Filters: substring search, exact normalized query
+        (index-backed), query type and start time.
+        """
+        clauses = []
+        params: List[Any] = []
+        if normalized_query:
+            clauses.append("normalized_query = ?")
+            params.append(normalized_query)
+        if search:
+            clauses.append("normalized_query LIKE ?")
+            params.append(f"%{search.lower()}%")
+        if query_type:
+            clauses.append("query_type = ?")
+            params.append(query_type)
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since.isoformat())
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._read_lock:
+            total = self._reader.execute(f"SELECT COUNT(*) FROM query_history {where}", params).fetchone()[0]
+            rows = self._reader.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM query_history {where} "
+                "ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+
+        history = []
+        for row in rows:
+            item = dict(zip(_COLUMNS, row))
+            item["cache_hit"] = bool(item["cache_hit"])
+            history.append(item)
+        return {"total": total, "limit": limit, "offset": offset, "history": history}
+
+    def apply_retention(self, connection: Optional[sqlite3.Connection] = None) -> int:
+        """Delete rows older than the retention window or beyond max_rows; returns rows removed"""
+        if connection is None:
+            with self._read_lock:
+                return self.apply_retention(self._reader)
+
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+        removed = connection.execute("DELETE FROM query_history WHERE timestamp < ?", (cutoff,)).rowcount
+        removed += connection.execute(
+            "DELETE FROM query_history WHERE id <= ("
+            " SELECT id FROM query_history ORDER BY id DESC LIMIT 1 OFFSET ?)",
+            (self.max_rows,)
+        ).rowcount
+        connection.commit()
+        return removed
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Block until every queued entry has been written (used by tests and shutdown)"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def close(self) -> None:
+        self.flush()
+        self._stopped.set()
+        self._writer.join(timeout=5.0)
+
+    def _write_loop(self) -> None:
+        connection = self._connect()
+        written_since_prune = 0
+        while not self._stopped.is_set():
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                connection.executemany(
+                    f"INSERT INTO query_history ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                    [self._row(entry) for entry in batch]
+                )
+                connection.commit()
+                written_since_prune += len(batch)
+                if written_since_prune >= self.batch_size * 20:
+                    self.apply_retention(connection)
+                    written_since_prune = 0
+            except sqlite3.Error:
+                connection.rollback()
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        connection.close()
+
+    @staticmethod
+    def _row(entry: Dict[str, Any]) -> tuple:
+        timestamp = entry.get("timestamp") or datetime.now()
+        return (
+            entry["query_id"],
+            entry["query"],
+            entry.get("normalized_query") or entry["query"].lower(),
+            entry.get("query_type"),
+            entry.get("sql"),
+            timestamp.isoformat() if isinstance(timestamp, datetime) else str(timestamp),
+            entry.get("response_time"),
+            int(bool(entry.get("cache_hit"))),
+            entry.get("error")
+        )
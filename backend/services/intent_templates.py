@@ -0,0 +1,454 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from backend.services.column_profiler import is_fresh
+from backend.services.schema_discovery import TERM_MAPPING
+
+_MONTHS = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+
+# Optional lead-in words ("show me all ...", "what is the ...")
+_PREFIX = (
+    r"(?:(?:please\s+)?(?:show(?:\s+me)?|list|get|give\s+me|find|display|return|fetch|"
+    r"what\s+(?:is|are)|which|who\s+(?:is|are))\s+)?(?:the\s+|all\s+(?:the\s+)?)?"
+)
+_DATE = r"(?:\d{4}-\d{2}-\d{2}|\d{4}-\d{2}|(?:" + "|".join(_MONTHS) + r")[a-z]*\s+\d{4}|\d{4})"
+_NUMBER = r"\$?\d[\d,]*(?:\.\d+)?k?"
+
+_COMPARISONS = {
+    "is not": "<>", "!=": "<>", "is": "=", "=": "=", "equals": "=", "equal to": "=",
+    ">=": ">=", "at least": ">=", "<=": "<=", "at most": "<=",
+    ">": ">", "above": ">", "over": ">", "greater than": ">", "more than": ">", "higher than": ">",
+    "<": "<", "below": "<", "under": "<", "less than": "<", "lower than": "<"
+}
+# Words that make an "employees in ..." phrase a time span rather than a department
+_TIME_WORDS = {
+    "last", "past", "this", "next", "previous", "recent", "current", "today", "yesterday",
+    "day", "days", "week", "weeks", "month", "months", "quarter", "quarters", "year", "years",
+    "january", "february", "march", "april", "june", "july", "august", "september", "october", "november", "december"
+}
+
+_COMPARISON_PATTERN = "|".join(re.escape(op) for op in sorted(_COMPARISONS, key=len, reverse=True))
+
+
+def _ident(name: str) -> str:
+    """Quote an identifier only when it is not a plain word"""
+    return name if re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", name) else '"' + name.replace('"', '""') + '"'
+
+
+def _literal(value: str) -> str:
+    """SQL literal for a value taken from the question: numbers stay numeric, text is quoted"""
+    number = _parse_number(value)
+    if number is not None:
+        return repr(number)
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _parse_number(value: str) -> Optional[float]:
+    match = re.fullmatch(r"\$?(\d[\d,]*(?:\.\d+)?)(k?)", value.strip())
+    if not match:
+        return None
+    number = float(match.group(1).replace(",", "")) * (1000 if match.group(2) else 1)
+    return int(number) if number.is_integer() else number
+
+
+def _parse_date_range(text: str) -> Tuple[date, date]:
+    """[start, end) covered by a year, year-month, full date or "month year" phrase"""
+    text = text.strip()
+    if re.fullmatch(r"\d{4}", text):
+        year = int(text)
+        return date(year, 1, 1), date(year + 1, 1, 1)
+    month_name = re.fullmatch(r"([a-z]+)\s+(\d{4})", text)
+    if month_name or re.fullmatch(r"\d{4}-\d{2}", text):
+        if month_name:
+            year, month = int(month_name.group(2)), _MONTHS.index(month_name.group(1)[:3]) + 1
+        else:
+            year, month = int(text[:4]), int(text[5:7])
+        start = date(year, month, 1)
+        return start, date(year + month // 12, month % 12 + 1, 1)
+    start = date.fromisoformat(text)
+    return start, start + timedelta(days=1)
+
+
+class SchemaBindings:
+    """
+    Where the concepts the templates talk about (employees, salary, department, hire date,
+    name) live in one discovered schema. Resolved once per schema version.
+    """
+
+    def __init__(self, schema: Dict[str, Any]):
+        tables = schema.get("tables", [])
+        self.employee = self._find_table(tables, TERM_MAPPING["employee"])
+        self.department_table = self._find_table(tables, TERM_MAPPING["department"])
+        self.salary = self.hire_date = self.name = None
+        self.department = self.department_join = None
+        # (table, column) holding department names, for looking values up in the statistics
+        self.department_source: Optional[Tuple[str, str]] = None
+        self.columns: Dict[str, str] = {}
+        self.statistics: Dict[str, Any] = schema.get("statistics") or {}
+        if self.employee is None:
+            return
+
+        columns = self.employee["columns"]
+        self.columns = {column["name"].lower(): column["name"] for column in columns}
+        self.salary = self._find_column(columns, TERM_MAPPING["salary"], numeric=True)
+        self.name = self._find_column(columns, TERM_MAPPING["name"])
+        self.hire_date = next(
+            (column["name"] for column in columns
+             if any(word in column["name"].lower() for word in TERM_MAPPING["hire"])
+             and (column["type"] in ("date", "datetime") or "date" in column["name"].lower())),
+            None
+        )
+
+        # Prefer a department column on the employee table itself; otherwise join through its foreign key
+        text_column = self._find_column(columns, TERM_MAPPING["department"], text=True)
+        if text_column is not None:
+            self.department = _ident(text_column)
+            self.department_source = (self.employee["name"], text_column)
+        elif self.department_table is not None:
+            department_name = self._find_column(self.department_table["columns"], TERM_MAPPING["name"])
+            for column in columns:
+                target = column.get("foreign_key", "")
+                if department_name and target.split(".")[0] == self.department_table["name"]:
+                    self.department = f"d.{_ident(department_name)}"
+                    self.department_source = (self.department_table["name"], department_name)
+                    self.department_join = (
+                        f" JOIN {_ident(self.department_table['name'])} d"
+                        f" ON {self.table}.{_ident(column['name'])} = d.{_ident(target.split('.')[1])}"
+                    )
+                    break
+
+    @property
+    def table(self) -> str:
+        return _ident(self.employee["name"])
+
+    def column(self, phrase: str) -> Optional[str]:
+        """Employee column named by a phrase such as "job title", "salary" or "dept" """
+        name = self.column_name(phrase)
+        return _ident(name) if name is not None else None
+
+    def column_name(self, phrase: str) -> Optional[str]:
+        """Unquoted name of the employee column a phrase refers to"""
+        key = re.sub(r"\s+", "_", phrase.strip().lower())
+        if key in self.columns:
+            return self.columns[key]
+        for concept, variations in TERM_MAPPING.items():
+            if key in variations:
+                if concept == "salary" and self.salary:
+                    return self.salary
+                if concept == "name" and self.name:
+                    return self.name
+                if concept == "department" and self.department_source and not self.department_join:
+                    return self.department_source[1]
+        return None
+
+    def stored_value(self, table_name: str, column_name: str, value: str) -> Tuple[Optional[Any], bool]:
+        """
+        Look a typed value up (ignoring case) among a column's profiled top values.
+        Returns (the stored spelling or None, whether the top values cover the whole column).
+        Stale statistics never count as covering the column, as values may have been added since.
+        """
+        table = self.statistics.get(table_name, {})
+        stats = table.get("columns", {}).get(column_name, {})
+        for top in stats.get("top_values", []):
+            if str(top["value"]).lower() == value.lower():
+                return top["value"], True
+        return None, bool(stats.get("top_values_complete")) and is_fresh(table)
+
+    @staticmethod
+    def _find_table(tables: List[dict], variations: List[str]) -> Optional[dict]:
+        for table in tables:
+            name = table["name"].lower()
+            if name in variations or name.rstrip("s") in variations:
+                return table
+        return next((table for table in tables if any(v in table["name"].lower() for v in variations)), None)
+
+    @staticmethod
+    def _find_column(columns: List[dict], variations: List[str], numeric: bool = False,
+                     text: bool = False) -> Optional[str]:
+        for exact in (True, False):
+            for column in columns:
+                name = column["name"].lower()
+                if numeric and column["type"] not in ("integer", "decimal", "unknown"):
+                    continue
+                if text and (column["type"] not in ("string", "unknown") or column.get("foreign_key")):
+                    continue
+                if (name in variations) if exact else any(v in name for v in variations):
+                    return column["name"]
+        return None
+
+
+class CompiledTemplates:
+    """
+    Intent patterns bound to one schema. The employee vocabulary includes the schema's own
+    table name, so questions phrased in the database's terms still match.
+    """
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.bindings = bindings = SchemaBindings(schema)
+        employee_words = set(TERM_MAPPING["employee"]) | {"people", "persons", "workers", "everyone"}
+        if bindings.employee is not None:
+            employee_words.add(bindings.employee["name"].lower().replace("_", " "))
+        department_words = set(TERM_MAPPING["department"]) | {"team"}
+        emp = "(?:" + "|".join(re.escape(word) + "s?" for word in sorted(employee_words, key=len, reverse=True)) + ")"
+        dept = "(?:" + "|".join(re.escape(word) + "s?" for word in sorted(department_words, key=len, reverse=True)) + ")"
+        salary = r"(?:salar(?:y|ies)|compensation|pay|wages?|earnings)"
+        each = r"(?:in|per|by|for|across)\s+(?:each\s+|every\s+)?"
+
+        patterns: List[Tuple[str, str, Callable]] = [
+            ("count_by_department",
+             rf"(?:how\s+many|count(?:\s+of)?|number\s+of|headcount)\s+(?:{emp}\s+)?(?:are\s+|is\s+|there\s+|do\s+we\s+have\s+)*{each}{dept}",
+             self._count_by_department),
+            ("count_by_department", rf"{emp}\s+(?:count\s+)?{each}{dept}", self._count_by_department),
+            ("average_salary_by_department",
+             rf"(?:average|avg|mean)\s+{salary}(?:\s+of\s+{emp})?\s+{each}{dept}", self._average_salary_by_department),
+            ("average_salary", rf"(?:average|avg|mean)\s+{salary}(?:\s+of\s+(?:all\s+)?{emp})?", self._average_salary),
+            ("top_by_salary",
+             rf"(?:(?P<n>\d+)\s+)?(?P<dir>highest|best|lowest|least|top|bottom|most|worst)[\s-]+paid(?:\s+(?P<n2>\d+))?(?:\s+{emp})?",
+             self._top_by_salary),
+            ("top_by_salary",
+             rf"(?P<lead>top|bottom)\s+(?P<n>\d+)\s+(?:(?P<dir>highest|best|lowest|least|most|worst)[\s-]+)?"
+             rf"(?:paid|earning|earners?)(?:\s+{emp})?",
+             self._top_by_salary),
+            ("top_by_salary",
+             rf"(?P<lead>top|highest|bottom|lowest)\s+(?:(?P<n>\d+)\s+)?(?:{emp}\s+)?"
+             rf"(?:by|with(?:\s+the)?(?:\s+(?P<dir>highest|lowest))?)\s+{salary}",
+             self._top_by_salary),
+            ("top_by_salary",
+             rf"(?P<lead>top|highest|bottom|lowest)\s+(?:(?P<n>\d+)\s+)?(?:(?P<dir>highest|lowest)\s+)?{salary}",
+             self._top_by_salary),
+            ("top_by_salary",
+             rf"{emp}\s+(?:sorted|ordered|ranked)\s+by\s+(?:highest\s+|lowest\s+)?{salary}(?:\s+(?P<dir>desc|descending|asc|ascending))?",
+             self._top_by_salary),
+            ("hires_in_range",
+             rf"(?:{emp}\s+)?(?:who\s+)?(?:were\s+|was\s+)?(?:hired|joined|started|hires)\s+"
+             rf"(?P<op>in|during|after|since|before|between|from)\s+(?P<a>{_DATE})(?:\s+(?:and|to|until)\s+(?P<b>{_DATE}))?",
+             self._hires_in_range),
+            ("hires_in_range",
+             rf"(?:{emp}\s+)?(?:who\s+)?(?:were\s+|was\s+)?(?:hired|joined|started|hires)\s+in\s+the\s+(?:last|past)\s+"
+             rf"(?P<count>\d+)\s+(?P<unit>day|week|month|year)s?",
+             self._hires_recent),
+            ("salary_filter",
+             rf"{emp}\s+(?:who\s+)?(?:earning|earn|making|make|paid|with\s+{salary})\s+(?P<op>{_COMPARISON_PATTERN})\s+(?P<value>{_NUMBER})",
+             self._salary_filter),
+            ("column_filter",
+             rf"{emp}\s+(?:where|with|whose|having)\s+(?P<column>[a-z][a-z_ ]*?)\s+(?P<op>{_COMPARISON_PATTERN})\s+(?P<value>.+)",
+             self._column_filter),
+            ("count_all",
+             rf"(?:how\s+many|count(?:\s+of)?|(?:total\s+)?number\s+of)\s+{emp}(?:\s+(?:are\s+there|do\s+we\s+have|in\s+total|total))?",
+             self._count_all),
+            ("department_filter", rf"{emp}\s+(?:in|from|of)\s+(?:the\s+)?(?P<value>[a-z][a-z &-]*?)(?:\s+{dept})?",
+             self._department_filter),
+            ("list_departments", rf"{dept}", self._list_departments),
+            ("list_employees", rf"{emp}", self._list_employees),
+        ]
+        self.templates = [(intent, re.compile(_PREFIX + pattern), builder) for intent, pattern, builder in patterns]
+
+    def match(self, normalized_query: str) -> Optional[Tuple[str, str]]:
+        """(intent, sql) for the first template that matches and can be bound to this schema"""
+        for intent, pattern, builder in self.templates:
+            found = pattern.fullmatch(normalized_query)
+            if found:
+                try:
+                    sql = builder(found)
+                except ValueError:
+                    # A value the pattern accepts but that does not exist ("2019-02-30", "2019-13")
+                    continue
+                if sql is not None:
+                    return intent, sql
+        return None
+
+    def _count_by_department(self, found) -> Optional[str]:
+        b = self.bindings
+        if b.employee is None or b.department is None:
+            return None
+        return (
+            f"SELECT {self._department_column()}, COUNT(*) AS employee_count "
+            f"FROM {b.table}{b.department_join or ''} GROUP BY {b.department} ORDER BY employee_count DESC"
+        )
+
+    def _average_salary_by_department(self, found) -> Optional[str]:
+        b = self.bindings
+        if b.salary is None or b.department is None:
+            return None
+        return (
+            f"SELECT {self._department_column()}, AVG({b.table}.{_ident(b.salary)}) AS average_salary "
+            f"FROM {b.table}{b.department_join or ''} GROUP BY {b.department} ORDER BY average_salary DESC"
+        )
+
+    def _department_column(self) -> str:
+        department = self.bindings.department
+        return department if department == "department" else f"{department} AS department"
+
+    def _average_salary(self, found) -> Optional[str]:
+        b = self.bindings
+        if b.salary is None:
+            return None
+        return f"SELECT AVG({_ident(b.salary)}) AS average_salary FROM {b.table}"
+
+    def _top_by_salary(self, found) -> Optional[str]:
+        b = self.bindings
+        if b.salary is None:
+            return None
+        groups = found.groupdict()
+        limit = int(groups.get("n") or groups.get("n2") or 10)
+        # "top 5 lowest paid": the adjective decides the order, a bare "top"/"bottom" otherwise
+        direction = "ASC" if (groups.get("dir") or groups.get("lead") or "") in ("lowest", "least", "bottom", "worst", "asc", "ascending") else "DESC"
+        columns = ", ".join(_ident(c) for c in (b.name, b.salary) if c) if b.name else "*"
+        return f"SELECT {columns} FROM {b.table} ORDER BY {_ident(b.salary)} {direction} LIMIT {limit}"
+
+    def _hires_in_range(self, found) -> Optional[str]:
+        b = self.bindings
+        if b.hire_date is None:
+            return None
+        op, first = found.group("op"), _parse_date_range(found.group("a"))
+        if op in ("between", "from"):
+            if not found.group("b"):
+                return None
+            start, end = first[0], _parse_date_range(found.group("b"))[1]
+        elif op in ("after", "since"):
+            start, end = (first[1] if op == "after" else first[0]), None
+        elif op == "before":
+            start, end = None, first[0]
+        else:
+            start, end = first
+        return self._hire_date_query(start, end)
+
+    def _hires_recent(self, found) -> Optional[str]:
+        if self.bindings.hire_date is None:
+            return None
+        days = int(found.group("count")) * {"day": 1, "week": 7, "month": 30, "year": 365}[found.group("unit")]
+        return self._hire_date_query(date.today() - timedelta(days=days), None)
+
+    def _hire_date_query(self, start: Optional[date], end: Optional[date]) -> str:
+        b = self.bindings
+        column = _ident(b.hire_date)
+        clauses = []
+        if start is not None:
+            clauses.append(f"{column} >= '{start.isoformat()}'")
+        if end is not None:
+            clauses.append(f"{column} < '{end.isoformat()}'")
+        return f"SELECT * FROM {b.table} WHERE {' AND '.join(clauses)} ORDER BY {column}"
+
+    def _salary_filter(self, found) -> Optional[str]:
+        b = self.bindings
+        if b.salary is None:
+            return None
+        value = _parse_number(found.group("value"))
+        return f"SELECT * FROM {b.table} WHERE {_ident(b.salary)} {_COMPARISONS[found.group('op')]} {value!r}"
+
+    def _column_filter(self, found) -> Optional[str]:
+        b = self.bindings
+        column = b.column(found.group("column")) if b.employee is not None else None
+        if column is None:
+            return None
+        value = found.group("value").strip().strip("'\"")
+        operator = _COMPARISONS[found.group("op")]
+        if _parse_number(value) is None and operator in ("=", "<>"):
+            stored, _ = b.stored_value(b.employee["name"], b.column_name(found.group("column")), value)
+            if stored is not None:
+                # The stored spelling keeps the predicate index-friendly
+                return f"SELECT * FROM {b.table} WHERE {column} {operator} {_literal(str(stored))}"
+            # Text matches ignore case, as users rarely type stored values exactly
+            return f"SELECT * FROM {b.table} WHERE LOWER({column}) {operator} {_literal(value.lower())}"
+        return f"SELECT * FROM {b.table} WHERE {column} {operator} {_literal(value)}"
+
+    def _count_all(self, found) -> Optional[str]:
+        if self.bindings.employee is None:
+            return None
+        return f"SELECT COUNT(*) AS employee_count FROM {self.bindings.table}"
+
+    def _department_filter(self, found) -> Optional[str]:
+        b = self.bindings
+        value = found.group("value").strip()
+        if b.department is None or value in ("each", "every", "all", "total"):
+            return None
+        if _TIME_WORDS.intersection(value.split()):
+            # A time span ("employees in the last year"), whether or not statistics list the departments
+            return None
+        stored, complete = b.stored_value(*b.department_source, value)
+        if stored is not None:
+            return (
+                f"SELECT {b.table}.* FROM {b.table}{b.department_join or ''} "
+                f"WHERE {b.department} = {_literal(str(stored))}"
+            )
+        if complete:
+            # Not a known department; leave it to the other translators
+            return None
+        return (
+            f"SELECT {b.table}.* FROM {b.table}{b.department_join or ''} "
+            f"WHERE LOWER({b.department}) = {_literal(value)}"
+        )
+
+    def _list_departments(self, found) -> Optional[str]:
+        table = self.bindings.department_table
+        return f"SELECT * FROM {_ident(table['name'])}" if table is not None else None
+
+    def _list_employees(self, found) -> Optional[str]:
+        return f"SELECT * FROM {self.bindings.table}" if self.bindings.employee is not None else None
+
+
+def _statistics_stamp(schema: Dict[str, Any]) -> float:
+    """When the schema's statistics were last profiled, 0 without statistics"""
+    return max((table.get("profiled_at") or 0 for table in (schema.get("statistics") or {}).values()), default=0)
+
+
+class IntentTemplates:
+    """
+    Fast path for common question shapes: precompiled patterns per schema version that
+    produce SQL without calling the LLM. Keeps hit/miss counts and matching time.
+    """
+
+    CACHE_SIZE = 8
+
+    def __init__(self):
+        self._compiled: "OrderedDict[Tuple[str, float], CompiledTemplates]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits: Dict[str, int] = {}
+        self.misses = 0
+        self.match_seconds = 0.0
+
+    def translate(self, normalized_query: str, schema: Dict[str, Any], version: str) -> Optional[Tuple[str, str]]:
+        """(intent, sql) when a template matches, otherwise None"""
+        compiled = self.compile(schema, version)
+        start = time.perf_counter()
+        result = compiled.match(normalized_query)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.match_seconds += elapsed
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits[result[0]] = self.hits.get(result[0], 0) + 1
+        return result
+
+    def compile(self, schema: Dict[str, Any], version: str) -> CompiledTemplates:
+        """Compiled templates for a schema version and its statistics, built once"""
+        # The version leaves statistics out, so re-profiled statistics need their own part of the key
+        key = (version, _statistics_stamp(schema))
+        with self._lock:
+            compiled = self._compiled.get(key)
+            if compiled is not None:
+                self._compiled.move_to_end(key)
+                return compiled
+
+        compiled = CompiledTemplates(schema)
+        with self._lock:
+            self._compiled[key] = compiled
+            while len(self._compiled) > self.CACHE_SIZE:
+                self._compiled.popitem(last=False)
+        return compiled
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = sum(self.hits.values())
+            lookups = hits + self.misses
+            return {
+                "hits": hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "mean_match_us": self.match_seconds / lookups * 1e6 if lookups else 0.0,
+                "hits_by_intent": dict(self.hits)
+            }
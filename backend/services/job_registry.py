@@ -0,0 +1,220 @@
+import asyncio
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from backend.config import Config
+
+# Allowed job status transitions
+_TRANSITIONS = {
+    "queued": {"processing", "completed", "failed"},
+    "processing": {"completed", "failed"},
+    "completed": set(),
+    "failed": set()
+}
+FINISHED_STATUSES = {"completed", "failed"}
+
+# Large fields left out of job listings
+_SUMMARY_EXCLUDED = ("files", "schema")
+
+
+class InvalidTransition(ValueError):
+    """Raised when a job is moved to a status it cannot reach from its current one"""
+
+
+class JobRegistry:
+    """
+    Thread-safe registry of ingestion jobs.
+    Every change bumps the job's version and wakes any async subscribers, which is
+    what the server-sent progress stream waits on. Finished jobs are evicted
+    oldest-first beyond max_finished_jobs or once they are older than finished_ttl.
+    With a shared store (see backend.services.state) changes are written through, so
+    any worker can report on jobs that run in another one: status changes at once,
+    progress at most once per write_interval per job, since other workers only poll
+    that often.
+    """
+
+    def __init__(self, max_finished_jobs: int = Config.INGESTION_MAX_FINISHED_JOBS,
+                 finished_ttl: float = Config.INGESTION_FINISHED_JOB_TTL_SECONDS, store=None,
+                 write_interval: float = Config.STATE_POLL_INTERVAL_SECONDS):
+        self.max_finished_jobs = max_finished_jobs
+        self.finished_ttl = finished_ttl
+        self.store = store
+        self.write_interval = write_interval
+        # When each job was last written through to the store (monotonic)
+        self._written: Dict[str, float] = {}
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._versions: Dict[str, int] = {}
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+        self._subscribers: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_type: str, status: str = "queued", **fields) -> str:
+        """Register a new job and return its id"""
+        job_id = str(uuid.uuid4())
+        job = {"job_id": job_id, "type": job_type, "status": status, "timestamp": datetime.now()}
+        job.update(fields)
+        with self._lock:
+            self._jobs[job_id] = job
+            self._versions[job_id] = 0
+            if status in FINISHED_STATUSES:
+                self._mark_finished(job_id)
+            self._write_through(job_id)
+            self._evict()
+        return job_id
+
+    def update(self, job_id: str, status: Optional[str] = None, **fields) -> None:
+        """Apply field changes (and optionally a status transition) atomically"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                raise KeyError(job_id)
+            transition = status is not None and status != job["status"]
+            if transition:
+                if status not in _TRANSITIONS[job["status"]]:
+                    raise InvalidTransition(f"Job {job_id} cannot go from {job['status']} to {status}")
+                job["status"] = status
+                if status in FINISHED_STATUSES:
+                    job.setdefault("completed_at", datetime.now())
+                    self._mark_finished(job_id)
+            job.update(fields)
+            self._changed(job_id, write=transition)
+
+    def update_file(self, job_id: str, index: int, **fields) -> None:
+        """Update one entry of a job's "files" list"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                raise KeyError(job_id)
+            job["files"][index].update(fields)
+            self._changed(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """A copy of the full job record, or None if unknown or evicted"""
+        return self.snapshot(job_id)[0]
+
+    def snapshot(self, job_id: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        """(copy of job record, version) for change tracking"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return copy.deepcopy(job), self._versions[job_id]
+        if self.store is not None:
+            # Running (or ran) in another worker
+            return self.store.get(job_id)
+        return None, -1
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> Dict[str, Dict[str, Any]]:
+        """Newest-first job summaries (without file lists or schemas)"""
+        with self._lock:
+            self._evict()
+            if self.store is not None:
+                self.store.evict(self.max_finished_jobs, self.finished_ttl)
+                jobs = self.store.list(status, limit)
+            else:
+                jobs = [job for job in self._jobs.values() if status is None or job["status"] == status]
+                jobs = sorted(jobs, key=lambda job: job["timestamp"], reverse=True)[:limit]
+            return {
+                job["job_id"]: {key: value for key, value in job.items() if key not in _SUMMARY_EXCLUDED}
+                for job in jobs
+            }
+
+    def __len__(self) -> int:
+        return len(self.store) if self.store is not None else len(self._jobs)
+
+    async def wait_for_change(self, job_id: str, version: int, timeout: float) -> bool:
+        """Wait until the job's version differs from version; returns False on timeout"""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        subscriber = (loop, event)
+        with self._lock:
+            local = job_id in self._versions
+            if local and self._versions[job_id] != version:
+                return True
+            if local or self.store is None:
+                self._subscribers.setdefault(job_id, []).append(subscriber)
+        if not local and self.store is not None:
+            return await self._poll_for_change(job_id, version, timeout)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(job_id, [])
+                if subscriber in subscribers:
+                    subscribers.remove(subscriber)
+                if not subscribers:
+                    self._subscribers.pop(job_id, None)
+
+    async def _poll_for_change(self, job_id: str, version: int, timeout: float) -> bool:
+        """Change notifications only reach the worker running the job; others poll the store"""
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + timeout
+        while True:
+            if await loop.run_in_executor(None, self.store.version, job_id) != version:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(Config.STATE_POLL_INTERVAL_SECONDS, remaining))
+
+    def _changed(self, job_id: str, write: bool = False) -> None:
+        # Caller holds the lock
+        self._versions[job_id] += 1
+        self._write_through(job_id, throttle=not write)
+        for loop, event in self._subscribers.get(job_id, []):
+            loop.call_soon_threadsafe(event.set)
+        self._evict()
+
+    def _write_through(self, job_id: str, throttle: bool = False) -> None:
+        # Caller holds the lock. Each write pickles the whole record, file list included,
+        # so progress updates are throttled; a skipped one goes out with the next write,
+        # at the latest when the job finishes
+        if self.store is None:
+            return
+        now = time.monotonic()
+        if throttle and job_id in self._written and now - self._written[job_id] < self.write_interval:
+            return
+        self._written[job_id] = now
+        job = self._jobs[job_id]
+        self.store.put(job, self._versions[job_id], job["status"] in FINISHED_STATUSES)
+
+    def _mark_finished(self, job_id: str) -> None:
+        self._finished[job_id] = time.monotonic()
+        self._finished.move_to_end(job_id)
+
+    def _evict(self) -> None:
+        # Caller holds the lock
+        cutoff = time.monotonic() - self.finished_ttl
+        while self._finished:
+            job_id, finished_at = next(iter(self._finished.items()))
+            if len(self._finished) <= self.max_finished_jobs and finished_at >= cutoff:
+                break
+            self._finished.popitem(last=False)
+            self._jobs.pop(job_id, None)
+            self._versions.pop(job_id, None)
+            self._written.pop(job_id, None)
+
+
+def job_delta(previous: Optional[Dict[str, Any]], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Fields that changed between two snapshots; changed file entries are keyed by index"""
+    if previous is None:
+        return current
+
+    delta = {}
+    for key, value in current.items():
+        if key == "files" and isinstance(previous.get("files"), list):
+            changed = {
+                str(index): entry for index, entry in enumerate(value)
+                if index >= len(previous["files"]) or previous["files"][index] != entry
+            }
+            if changed:
+                delta["files"] = changed
+        elif previous.get(key) != value:
+            delta[key] = value
+    return delta
@@ -0,0 +1,394 @@
+import logging
+import math
+import re
+import threading
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from backend.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Keeps names, skills and clause numbers whole: "c++", "node.js", "4.2.1", "e-mail"
+_TOKEN_PATTERN = re.compile(r"\w+(?:[.\-]\w+)*[+#]*")
+
+# Postings per skip block; a block is decoded on its own using the previous block's last doc
+BLOCK_SIZE = 128
+_MAX_TF = 255
+_MAX_LENGTH = 65535
+_NUMPY_TYPES = {"I": np.uint32, "H": np.uint16, "B": np.uint8}
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def _to_array(typecode: str, values: np.ndarray) -> array:
+    packed = array(typecode)
+    packed.frombytes(np.ascontiguousarray(values, dtype=_NUMPY_TYPES[typecode]).tobytes())
+    return packed
+
+
+def _view(values: array) -> np.ndarray:
+    """Zero-copy numpy view of an array.array"""
+    if not len(values):
+        return np.zeros(0, dtype=_NUMPY_TYPES[values.typecode])
+    return np.frombuffer(values, dtype=_NUMPY_TYPES[values.typecode])
+
+
+class Segment:
+    """
+    Immutable slice of the inverted index, held in flat arrays rather than per-term objects.
+    Documents are numbered locally in store-id order (doc_ids maps them back). Each term's
+    postings are a run of deltas between consecutive local doc numbers (the first one
+    absolute), with a term frequency per posting and the last doc number of every
+    BLOCK_SIZE postings as skip pointers. max_tf and min_length bound a term's BM25
+    contribution, which is what lets a query stop early.
+    """
+
+    __slots__ = ("doc_ids", "lengths", "term_ids", "starts", "deltas", "tfs",
+                 "block_starts", "block_last", "max_tf", "min_length", "views")
+
+    def __init__(self, doc_ids: np.ndarray, lengths: np.ndarray, terms: np.ndarray, docs: np.ndarray, tfs: np.ndarray):
+        """terms, docs and tfs describe one posting each; docs are local doc numbers"""
+        order = np.lexsort((docs, terms))
+        terms, docs, tfs = terms[order], docs[order].astype(np.int64), tfs[order]
+        term_ids, first, counts = np.unique(terms, return_index=True, return_counts=True)
+
+        deltas = docs.copy()
+        deltas[1:] -= docs[:-1]
+        deltas[first] = docs[first]
+
+        n_blocks = (counts + BLOCK_SIZE - 1) // BLOCK_SIZE
+        block_starts = np.concatenate([[0], np.cumsum(n_blocks)])
+        block_term = np.repeat(np.arange(term_ids.size), n_blocks)
+        block_number = np.arange(block_starts[-1]) - block_starts[block_term]
+        block_end = first[block_term] + np.minimum((block_number + 1) * BLOCK_SIZE, counts[block_term]) - 1
+
+        self.doc_ids = _to_array("I", doc_ids)
+        self.lengths = _to_array("H", np.minimum(lengths, _MAX_LENGTH))
+        self.term_ids = _to_array("I", term_ids)
+        self.starts = _to_array("I", np.concatenate([first, [docs.size]]))
+        self.deltas = _to_array("I", deltas)
+        self.tfs = _to_array("B", np.minimum(tfs, _MAX_TF))
+        self.block_starts = _to_array("I", block_starts)
+        self.block_last = _to_array("I", docs[block_end])
+        self.max_tf = _to_array("B", np.maximum.reduceat(np.minimum(tfs, _MAX_TF), first) if first.size else first)
+        self.min_length = _to_array("H", np.minimum.reduceat(_view(self.lengths)[docs], first) if first.size else first)
+        # Zero-copy views over the arrays above, for vectorized decoding and scoring
+        self.views = {name: _view(getattr(self, name)) for name in self.__slots__[:-1]}
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(values) * values.itemsize for values in (getattr(self, name) for name in self.__slots__[:-1]))
+
+    def slots(self, term_ids: np.ndarray) -> np.ndarray:
+        """Position of each term in this segment, or -1 where it does not occur"""
+        own = self.views["term_ids"]
+        slots = np.searchsorted(own, term_ids)
+        found = slots < own.size
+        found[found] = own[slots[found]] == term_ids[found]
+        return np.where(found, slots, -1)
+
+    def postings(self, slot: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(local doc numbers, term frequencies) of one term"""
+        start, end = self.starts[slot], self.starts[slot + 1]
+        docs = np.cumsum(self.views["deltas"][start:end], dtype=np.int64)
+        return docs, self.views["tfs"][start:end]
+
+    def postings_for(self, slot: int, candidates: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (candidates that contain the term, their term frequencies), decoding only the
+        blocks that can hold a candidate; candidates must be sorted
+        """
+        start, end = self.starts[slot], self.starts[slot + 1]
+        last = self.views["block_last"][self.block_starts[slot]:self.block_starts[slot + 1]]
+        blocks = np.searchsorted(last, candidates)
+        blocks = blocks[np.concatenate([[True], blocks[1:] != blocks[:-1]]) & (blocks < last.size)]
+        if blocks.size == 0:
+            return candidates[:0], np.zeros(0, dtype=np.uint8)
+
+        first = start + blocks * BLOCK_SIZE
+        offsets = np.arange(BLOCK_SIZE)
+        valid = offsets < np.minimum(BLOCK_SIZE, end - first)[:, None]
+        positions = np.where(valid, first[:, None] + offsets, start)
+        deltas = np.where(valid, self.views["deltas"][positions], 0).astype(np.int64)
+        base = np.where(blocks > 0, last[blocks - 1], 0).astype(np.int64)
+        docs = (base[:, None] + np.cumsum(deltas, axis=1))[valid]
+        tfs = self.views["tfs"][positions[valid]]
+
+        where = np.minimum(np.searchsorted(docs, candidates), docs.size - 1)
+        hit = docs[where] == candidates
+        return candidates[hit], tfs[where[hit]]
+
+    def decode_all(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(term ids, local doc numbers, term frequencies) of every posting, for merging"""
+        starts = self.views["starts"].astype(np.int64)
+        counts = np.diff(starts)
+        absolute = np.cumsum(self.views["deltas"], dtype=np.int64)
+        before = np.concatenate([[0], absolute])[starts[:-1]]
+        posting_slot = np.repeat(np.arange(counts.size), counts)
+        return self.views["term_ids"][posting_slot], absolute - before[posting_slot], self.views["tfs"]
+
+
+class BM25Index:
+    """
+    Segmented BM25 inverted index over vector store chunks, keyed by store row id.
+    Rows are added in store order as small immutable segments; segments of the same
+    size tier are merged on a background thread, dropping tombstoned rows. Searches
+    score the rarest terms first and, once the remaining terms cannot lift an unseen
+    chunk into the top k, only rescore the current candidates (decoding just the
+    posting blocks that hold them).
+    """
+
+    def __init__(self, k1: float = Config.BM25_K1, b: float = Config.BM25_B,
+                 merge_factor: int = Config.LEXICAL_MERGE_FACTOR):
+        self.k1 = k1
+        self.b = b
+        self.merge_factor = merge_factor
+        self.vocabulary: Dict[str, int] = {}
+        self.df = array("I")
+        self.n_docs = 0
+        self.total_length = 0
+        # Store rows [0, covered) are indexed
+        self.covered = 0
+        self._segments: List[Segment] = []
+        self._lock = threading.Lock()
+        self._merging = False
+        self._tombstones = np.zeros(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    @property
+    def merging(self) -> bool:
+        return self._merging
+
+    def add(self, first_id: int, texts: Sequence[str]) -> bool:
+        """
+        Index texts as store rows first_id, first_id + 1, ...; returns False (and indexes
+        nothing) unless first_id is the next row the index expects
+        """
+        token_lists = [tokenize(text) for text in texts]
+        with self._lock:
+            if first_id != self.covered or not texts:
+                return False
+            terms, docs, tfs = [], [], []
+            for local, tokens in enumerate(token_lists):
+                for term, tf in Counter(tokens).items():
+                    term_id = self.vocabulary.get(term)
+                    if term_id is None:
+                        term_id = self.vocabulary[term] = len(self.vocabulary)
+                        self.df.append(0)
+                    self.df[term_id] += 1
+                    terms.append(term_id)
+                    docs.append(local)
+                    tfs.append(tf)
+            lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.int64, count=len(token_lists))
+            segment = Segment(
+                np.arange(first_id, first_id + len(texts)), lengths,
+                np.asarray(terms, dtype=np.int64), np.asarray(docs, dtype=np.int64), np.asarray(tfs, dtype=np.int64)
+            )
+            self._segments = self._segments + [segment]
+            self.n_docs += len(texts)
+            self.total_length += int(lengths.sum())
+            self.covered = first_id + len(texts)
+            self._maybe_merge()
+        return True
+
+    def set_tombstones(self, tombstones: np.ndarray) -> None:
+        """Rows to drop at the next merge (sorted store ids)"""
+        self._tombstones = tombstones
+
+    def search(self, query: str, k: int, exclude: Optional[np.ndarray] = None,
+               prune: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k store row ids by BM25 score, best first, skipping rows in exclude
+        (sorted ids). prune=False scores every posting, for comparison.
+        """
+        with self._lock:
+            segments = self._segments
+            term_ids = np.array(sorted({self.vocabulary[t] for t in tokenize(query) if t in self.vocabulary}), dtype=np.int64)
+            df = np.array([self.df[t] for t in term_ids], dtype=np.float64)
+            n_docs, avg_length = self.n_docs, self.total_length / max(self.n_docs, 1)
+        if term_ids.size == 0 or not segments:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        best_ids = np.zeros(0, dtype=np.int64)
+        best_scores = np.zeros(0, dtype=np.float32)
+        threshold = 0.0
+        # Large segments first, so the threshold is high by the time small ones are scored
+        for segment in sorted(segments, key=len, reverse=True):
+            ids, scores = self._search_segment(segment, term_ids, idf, avg_length, k, threshold, exclude, prune)
+            best_ids = np.concatenate([best_ids, ids])
+            best_scores = np.concatenate([best_scores, scores])
+            if best_ids.size > k:
+                keep = np.argpartition(-best_scores, k - 1)[:k]
+                best_ids, best_scores = best_ids[keep], best_scores[keep]
+            if prune and best_ids.size >= k:
+                threshold = float(best_scores.min())
+
+        order = np.argsort(-best_scores, kind="stable")
+        return best_ids[order], best_scores[order]
+
+    def _search_segment(self, segment: Segment, term_ids: np.ndarray, idf: np.ndarray, avg_length: float, k: int,
+                        threshold: float, exclude: Optional[np.ndarray], prune: bool) -> Tuple[np.ndarray, np.ndarray]:
+        slots = segment.slots(term_ids)
+        present = slots >= 0
+        slots, idf = slots[present], idf[present]
+        if slots.size == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        k1, b = self.k1, self.b
+        max_tf = segment.views["max_tf"][slots].astype(np.float64)
+        min_length = segment.views["min_length"][slots].astype(np.float64)
+        # A term contributes at most its idf times the tf factor at its highest tf and shortest document
+        bounds = idf * max_tf * (k1 + 1) / (max_tf + k1 * (1 - b + b * min_length / avg_length))
+        if prune and bounds.sum() <= threshold:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        doc_ids = segment.views["doc_ids"]
+        lengths = segment.views["lengths"]
+        dead = np.zeros(0, dtype=np.int64)
+        if exclude is not None and exclude.size:
+            low, high = np.searchsorted(exclude, [doc_ids[0], int(doc_ids[-1]) + 1])
+            excluded = exclude[low:high]
+            where = np.minimum(np.searchsorted(doc_ids, excluded), doc_ids.size - 1)
+            dead = where[doc_ids[where] == excluded]
+
+        scores = np.zeros(len(segment), dtype=np.float32)
+        remaining, scored = float(bounds.sum()), 0.0
+        candidates = None
+        for position in np.argsort(-bounds, kind="stable"):
+            remaining -= bounds[position]
+            scored += bounds[position]
+            if candidates is None:
+                docs, tfs = segment.postings(slots[position])
+            else:
+                docs, tfs = segment.postings_for(slots[position], candidates)
+            tfs = tfs.astype(np.float32)
+            norm = k1 * (1 - b + b * lengths[docs] / avg_length)
+            scores[docs] += idf[position] * tfs * (k1 + 1) / (tfs + norm)
+
+            if candidates is None:
+                scores[dead] = 0
+                # The threshold never exceeds what the scored terms can add up to, so
+                # there is no point computing it until the remaining terms weigh less
+                if not prune or remaining > max(scored, threshold):
+                    continue
+                # The k-th best of any subset of partial scores is a valid lower bound
+                partial = scores[docs]
+                if partial.size >= k:
+                    threshold = max(threshold, float(np.partition(partial, partial.size - k)[partial.size - k]))
+                if remaining <= threshold:
+                    # No chunk outside the current matches can reach the top k any more
+                    matched = np.flatnonzero(scores)
+                    candidates = matched[scores[matched] + remaining >= threshold]
+            else:
+                candidates = candidates[scores[candidates] + remaining >= threshold]
+            if candidates is not None and candidates.size == 0:
+                break
+
+        matched = np.flatnonzero(scores) if candidates is None else candidates
+        if matched.size > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        return doc_ids[matched].astype(np.int64), scores[matched]
+
+    def _maybe_merge(self) -> None:
+        # Caller holds the lock
+        if self._merging:
+            return
+        tiers: Dict[int, List[Segment]] = {}
+        for segment in self._segments:
+            tier = int(math.log(max(len(segment), 1), self.merge_factor))
+            tiers.setdefault(tier, []).append(segment)
+        for tier in sorted(tiers):
+            if len(tiers[tier]) >= self.merge_factor:
+                self._merging = True
+                threading.Thread(target=self._merge, args=(tiers[tier],), daemon=True).start()
+                return
+
+    def _merge(self, segments: List[Segment]) -> None:
+        try:
+            merged, dropped_terms, dropped_lengths = merge_segments(segments, self._tombstones)
+            with self._lock:
+                remaining = [segment for segment in self._segments if not any(segment is s for s in segments)]
+                self._segments = remaining + ([merged] if len(merged) else [])
+                for term_id, count in zip(*dropped_terms):
+                    self.df[int(term_id)] -= int(count)
+                self.n_docs -= dropped_lengths.size
+                self.total_length -= int(dropped_lengths.sum())
+                self._merging = False
+                # Merged segments may now fill the next tier
+                self._maybe_merge()
+        except Exception:
+            logger.exception("Lexical index merge failed")
+            self._merging = False
+
+    def stats(self) -> Dict[str, int]:
+        segments = self._segments
+        return {
+            "documents": self.n_docs,
+            "covered_rows": self.covered,
+            "terms": len(self.vocabulary),
+            "segments": len(segments),
+            "postings": sum(len(segment.deltas) for segment in segments),
+            "postings_bytes": sum(segment.nbytes for segment in segments)
+        }
+
+
+def merge_segments(segments: Iterable[Segment], tombstones: np.ndarray) -> Tuple[Segment, Tuple[np.ndarray, np.ndarray], np.ndarray]:
+    """
+    One segment holding the postings of segments, without tombstoned rows.
+    Also returns (term ids, dropped posting counts) and the lengths of dropped rows,
+    for the caller's collection statistics.
+    """
+    all_ids, all_lengths, all_terms, all_docs, all_tfs = [], [], [], [], []
+    dropped_terms, dropped_lengths = [], []
+    offset = 0
+    for segment in segments:
+        doc_ids = segment.views["doc_ids"].astype(np.int64)
+        lengths = segment.views["lengths"].astype(np.int64)
+        terms, docs, tfs = segment.decode_all()
+        keep = ~np.isin(doc_ids, tombstones) if tombstones.size else np.ones(doc_ids.size, dtype=bool)
+        renumber = np.cumsum(keep) - 1 + offset
+        live = keep[docs]
+        all_ids.append(doc_ids[keep])
+        all_lengths.append(lengths[keep])
+        all_terms.append(terms[live])
+        all_docs.append(renumber[docs[live]])
+        all_tfs.append(tfs[live])
+        dropped_terms.append(terms[~live])
+        dropped_lengths.append(lengths[~keep])
+        offset += int(keep.sum())
+
+    doc_ids = np.concatenate(all_ids)
+    # Segments chosen for a merge need not be adjacent: renumber documents in store order
+    order = np.argsort(doc_ids, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(order.size)
+    merged = Segment(
+        doc_ids[order], np.concatenate(all_lengths)[order],
+        np.concatenate(all_terms).astype(np.int64), rank[np.concatenate(all_docs)], np.concatenate(all_tfs).astype(np.int64)
+    )
+    dropped = np.concatenate(dropped_terms)
+    return merged, np.unique(dropped, return_counts=True), np.concatenate(dropped_lengths)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_lexical_index() -> BM25Index:
+    """Return the process-wide BM25 index over the vector store's chunks"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = BM25Index()
+    return _index
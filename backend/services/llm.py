@@ -0,0 +1,332 @@
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Union
+from backend.config import Config
+from backend.services.sql_executor import UnsafeSQL, validate_select
+
+logger = logging.getLogger(__name__)
+
+# Exception class names (google.api_core) worth retrying: throttling and transient server errors
+_RETRYABLE_ERRORS = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "DeadlineExceeded",
+    "InternalServerError", "GatewayTimeout"
+}
+
+_SQL_FENCE = re.compile(r"```(?:sql)?\s*(.*?)```", re.IGNORECASE | re.DOTALL)
+
+
+class LLMError(RuntimeError):
+    """Raised when a completion cannot be produced; retryable marks transient failures"""
+
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: refills at rate tokens per second up to capacity
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Take one token, sleeping until one is available; False if timeout expires first"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the function,
+    everyone arriving while it is in flight waits for and shares its outcome.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], str], timeout: Optional[float] = None):
+        """Returns (result, shared) where shared is True if another caller did the work"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise LLMError("timed out waiting for an identical in-flight request")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class GeminiBackend:
+    """
+    Google Gemini completions; the SDK is imported on first use
+    """
+
+    def __init__(self, api_key: Optional[str] = Config.GEMINI_API_KEY, model: str = Config.GEMINI_MODEL):
+        if not api_key:
+            raise LLMError("GEMINI_API_KEY is not set")
+        self.api_key = api_key
+        self.model_name = model
+        self._model = None
+
+    def load(self):
+        """Import and configure the SDK (done by the warm-up, or by the first completion)"""
+        if self._model is None:
+            import google.generativeai as genai
+            genai.configure(api_key=self.api_key)
+            self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def generate(self, prompt: str) -> str:
+        try:
+            response = self.load().generate_content(prompt)
+        except Exception as e:
+            raise LLMError(str(e), retryable=type(e).__name__ in _RETRYABLE_ERRORS) from e
+        return response.text
+
+
+class FakeLLM:
+    """
+    Local stand-in for tests and benchmarks: sleeps for latency seconds and answers
+    with response (a string or a function of the prompt). failure_rate injects
+    retryable errors.
+    """
+
+    def __init__(self, latency: float = Config.LLM_FAKE_LATENCY_SECONDS,
+                 response: Union[str, Callable[[str], str]] = "SELECT * FROM employees LIMIT 10",
+                 failure_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.response = response
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+            fail = self._random.random() < self.failure_rate
+        time.sleep(self.latency)
+        if fail:
+            raise LLMError("injected failure", retryable=True)
+        return self.response(prompt) if callable(self.response) else self.response
+
+
+class LLMClient:
+    """
+    Rate-limited, deduplicating front for an LLM backend.
+    - identical prompts already in flight are coalesced into one remote call
+    - a token bucket caps the request rate and a semaphore caps concurrency
+    - transient failures are retried with exponential backoff and full jitter
+    """
+
+    def __init__(self, backend, max_concurrency: int = Config.LLM_MAX_CONCURRENCY,
+                 rate: float = Config.LLM_RATE_PER_SECOND, burst: float = Config.LLM_BURST,
+                 max_retries: int = Config.LLM_MAX_RETRIES,
+                 backoff_base: float = Config.LLM_BACKOFF_BASE_SECONDS,
+                 backoff_max: float = Config.LLM_BACKOFF_MAX_SECONDS,
+                 timeout: float = Config.LLM_TIMEOUT_SECONDS):
+        self.backend = backend
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self._bucket = TokenBucket(rate, burst)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._single_flight = SingleFlight()
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "coalesced": 0, "backend_calls": 0, "retries": 0, "failures": 0}
+
+    def complete(self, prompt: str) -> str:
+        """Completion for prompt; raises LLMError when the deadline passes or retries run out"""
+        key = hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+        deadline = time.monotonic() + self.timeout
+        self._count("requests")
+        try:
+            result, shared = self._single_flight.do(key, lambda: self._call_with_retries(prompt, deadline), self.timeout)
+        except LLMError:
+            self._count("failures")
+            raise
+        if shared:
+            self._count("coalesced")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _call_with_retries(self, prompt: str, deadline: float) -> str:
+        attempt = 0
+        while True:
+            try:
+                return self._call(prompt, deadline)
+            except LLMError as e:
+                attempt += 1
+                if not e.retryable or attempt > self.max_retries:
+                    raise
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+                if time.monotonic() + delay >= deadline:
+                    raise
+                self._count("retries")
+                time.sleep(delay)
+
+    def _call(self, prompt: str, deadline: float) -> str:
+        if not self._bucket.acquire(timeout=deadline - time.monotonic()):
+            raise LLMError("rate limit wait exceeded the deadline")
+        if not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            raise LLMError("no free LLM slot before the deadline")
+        try:
+            self._count("backend_calls")
+            return self.backend.generate(prompt)
+        finally:
+            self._slots.release()
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+
+def get_llm_client(backend_name: str = Config.LLM_BACKEND) -> Optional[LLMClient]:
+    """Client for the configured backend, or None when LLM translation is disabled"""
+    if backend_name == "gemini":
+        try:
+            return LLMClient(GeminiBackend())
+        except LLMError as e:
+            logger.warning("Gemini translation disabled: %s", e)
+            return None
+    if backend_name == "fake":
+        return LLMClient(FakeLLM())
+    return None
+
+
+def compact_schema_context(schema: Dict[str, Any], mapping: Optional[Dict[str, Any]] = None,
+                           max_tables: int = Config.LLM_MAX_SCHEMA_TABLES,
+                           max_columns: int = Config.LLM_MAX_COLUMNS_PER_TABLE) -> str:
+    """
+    One line per table, e.g. "employees(id integer pk, dept_id integer -> departments.id, name string)".
+    Tables the query maps to come first, followed by tables they reference; key and mapped
+    columns are kept ahead of the rest, so prompt size stays bounded for wide schemas.
+    With profiled statistics, lines also carry row counts and per-column distinct counts,
+    so the model can prefer selective filters. Only counts are sent, never column values.
+    """
+    tables = schema.get("tables", [])
+    by_name = {table["name"]: table for table in tables}
+    statistics = {
+        name: table for name, table in (schema.get("statistics") or {}).items() if "error" not in table
+    }
+
+    selected: List[str] = []
+    if mapping and len(mapping.get("relevant_tables", [])) < len(tables):
+        selected = [table["name"] for table in mapping["relevant_tables"]]
+        for name in list(selected):
+            for column in by_name[name]["columns"]:
+                target = column.get("foreign_key", "").split(".")[0]
+                if target in by_name and target not in selected:
+                    selected.append(target)
+    if not selected:
+        selected = [table["name"] for table in tables]
+    selected = selected[:max_tables]
+
+    mapped_columns = {id(column) for column in (mapping or {}).get("relevant_columns", [])}
+    lines = []
+    for name in selected:
+        columns = by_name[name]["columns"]
+        column_stats = statistics.get(name, {}).get("columns", {})
+        ranked = sorted(
+            columns,
+            key=lambda c: (not c.get("primary_key"), "foreign_key" not in c, id(c) not in mapped_columns)
+        )[:max_columns]
+        kept = {id(column) for column in ranked}
+        parts = []
+        for column in columns:
+            if id(column) not in kept:
+                continue
+            part = f"{column['name']} {column['type']}"
+            if column.get("primary_key"):
+                part += " pk"
+            if column.get("foreign_key"):
+                part += f" -> {column['foreign_key']}"
+            stats = column_stats.get(column["name"], {})
+            if stats.get("distinct_count") and not column.get("primary_key"):
+                part += f" ~{stats['distinct_count']} distinct"
+            if stats.get("null_fraction", 0) >= 0.5:
+                part += " mostly null"
+            parts.append(part)
+        if len(columns) > len(parts):
+            parts.append(f"... {len(columns) - len(parts)} more")
+        line = f"{name}({', '.join(parts)})"
+        if statistics.get(name, {}).get("row_count") is not None:
+            line += f" ~{statistics[name]['row_count']} rows"
+        lines.append(line)
+    if len(tables) > len(selected):
+        lines.append(f"-- {len(tables) - len(selected)} other tables omitted")
+    if any(name in statistics for name in selected):
+        lines.insert(0, "-- counts are estimates; filters on columns with many distinct values are the most selective")
+    return "\n".join(lines)
+
+
+def build_sql_prompt(user_query: str, schema_context: str, dialect: Optional[str] = None) -> str:
+    return (
+        f"Translate the question into a single read-only {dialect or 'SQL'} SELECT statement.\n"
+        "Use only these tables and columns:\n"
+        f"{schema_context}\n"
+        f"Question: {user_query}\n"
+        "Answer with the SQL only."
+    )
+
+
+def extract_sql(completion: str, dialect: Optional[str] = None) -> str:
+    """The SQL statement in a completion; rejects anything that is not a single read-only query"""
+    fenced = _SQL_FENCE.search(completion)
+    sql = (fenced.group(1) if fenced else completion).strip().rstrip(";").strip()
+    try:
+        validate_select(sql, dialect)
+    except UnsafeSQL as e:
+        raise LLMError(f"completion is not a single read-only SELECT: {e}") from None
+    return sql
@@ -0,0 +1,169 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; covers sub-millisecond cache hits up to branch timeouts
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    Latency histogram with fixed buckets.
+    Each thread writes to its own shard, so observe() takes no lock; shards are only
+    merged when the histogram is read, which happens once per scrape.
+    """
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._local = threading.local()
+        self._shards: List[Dict[tuple, list]] = []
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+
+        # Per-bucket counts (last slot is +Inf) followed by the running sum
+        cells = shard.get(label_values)
+        if cells is None:
+            cells = shard[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        cells[bisect_left(self.buckets, value)] += 1
+        cells[-1] += value
+
+    def snapshot(self) -> Dict[tuple, Tuple[List[int], float]]:
+        """{label values: (non-cumulative bucket counts, sum)} merged across threads"""
+        with self._lock:
+            shards = list(self._shards)
+
+        merged: Dict[tuple, list] = {}
+        for shard in shards:
+            for labels, cells in list(shard.items()):
+                total = merged.setdefault(labels, [0] * len(cells))
+                for i, value in enumerate(list(cells)):
+                    total[i] += value
+        return {labels: (cells[:-1], cells[-1]) for labels, cells in merged.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self.snapshot().items()):
+            base = [f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels)]
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = ",".join(base + ['le="%s"' % le])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+            suffix = f"{{{','.join(base)}}}" if base else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Named histograms plus gauges read from callbacks at scrape time
+    """
+
+    def __init__(self):
+        self._histograms: Dict[str, Histogram] = {}
+        self._gauges: Dict[str, Tuple[str, Callable[[], Dict[tuple, float]], Tuple[str, ...]]] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Return the histogram called name, creating it on first use"""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(name, help_text, label_names, buckets)
+            return histogram
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], Dict[tuple, float]],
+              label_names: Sequence[str] = ()) -> None:
+        """Register a gauge; read() returns {label values: value} and is called on every scrape"""
+        with self._lock:
+            self._gauges[name] = (help_text, read, tuple(label_names))
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        with self._lock:
+            histograms = list(self._histograms.values())
+            gauges = list(self._gauges.items())
+
+        lines: List[str] = []
+        for histogram in histograms:
+            lines.extend(histogram.render())
+        for name, (help_text, read, label_names) in gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            try:
+                samples = read()
+            except Exception:
+                continue
+            for labels, value in sorted(samples.items()):
+                label_text = ",".join(f'{label}="{_escape(v)}"' for label, v in zip(label_names, labels))
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+
+QUERY_STAGE_SECONDS = registry.histogram(
+    "nlq_query_stage_seconds", "Time spent in each query pipeline stage", ("stage",)
+)
+QUERY_SECONDS = registry.histogram(
+    "nlq_query_seconds", "End-to-end query processing time", ("query_type", "cache")
+)
+
+
+class StageTimer:
+    """
+    Collects the per-stage breakdown of one request and feeds the stage histogram.
+    Branches may time different stages from different threads.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float) -> None:
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+        QUERY_STAGE_SECONDS.observe(seconds, name)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+@contextmanager
+def timed_stage(name: str, timer: Optional[StageTimer] = None) -> Iterator[None]:
+    """Time a stage into the histogram, and into timer's breakdown when one is given"""
+    if timer is not None:
+        with timer.stage(name):
+            yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        QUERY_STAGE_SECONDS.observe(time.perf_counter() - start, name)
@@ -0,0 +1,73 @@
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+
+class SamplingProfiler:
+    """
+    Low-overhead wall-clock profiler for hot-path investigation.
+    A background thread samples every thread's stack at a fixed interval and counts
+    identical stacks, so nothing is instrumented and the cost is one sample per interval.
+    Output is in collapsed-stack format, which flame graph tools read directly.
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._stacks: Counter = Counter()
+        self._samples = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start sampling (no-op if already running); previous samples are discarded"""
+        with self._lock:
+            if self.running:
+                return
+            self._stacks = Counter()
+            self._samples = 0
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._sample_loop, name="sampling-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._stopped.set()
+            if self._thread is not None:
+                self._thread.join()
+                self._thread = None
+
+    def collapsed(self, limit: Optional[int] = None) -> str:
+        """One "frame;frame;frame count" line per distinct stack, most frequent first"""
+        with self._lock:
+            stacks = self._stacks.most_common(limit)
+        return "\n".join(f"{stack} {count}" for stack, count in stacks) + "\n"
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "samples": self._samples,
+            "distinct_stacks": len(self._stacks)
+        }
+
+    def _sample_loop(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                names = []
+                while frame is not None and len(names) < self.max_depth:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self._stacks[";".join(reversed(names))] += 1
+            self._samples += 1
@@ -1,17 +1,249 @@
+import asyncio
 import json
-from typing import Optional, Dict, Any
+import hashlib
+import re
+import time
+from typing import Optional, Dict, Any, List, Tuple
+from backend.config import Config
+from backend.services.cache import SemanticCache
+from backend.services.database import get_active_connection, get_active_engine
+from backend.services.embeddings import get_encoder
+from backend.services.intent_templates import IntentTemplates
+from backend.services.llm import LLMError, build_sql_prompt, compact_schema_context, extract_sql, get_llm_client
+from backend.services.metrics import QUERY_SECONDS, StageTimer
+from backend.services.schema_store import get_schema_store
+from backend.services.sql_executor import SQLExecutor
+from backend.services.sql_fingerprint import parameterize, statement_cache
+from backend.services.state import get_state
+
+
+def normalize_query(user_query: str) -> str:
+    """Lower-case, collapse whitespace and drop trailing punctuation so trivial variants share a cache key"""
+    normalized = re.sub(r"\s+", " ", user_query.strip().lower())
+    return normalized.rstrip(" ?!.;")
+
+
+# Values a question carries: quoted strings, numbers, and capitalized names ("Engineering")
+_QUERY_LITERAL = re.compile(r"'([^']*)'|\"([^\"]*)\"|(\d+(?:[.,]\d+)*)|\b([A-Z][\w&-]*)")
+_LITERAL_PLACEHOLDERS = ("<text>", "<text>", "<number>", "<name>")
+
+
+def mask_literals(user_query: str) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Split a question into its normalized wording with values replaced by placeholders
+    and the values themselves, so "hired after 2019" and "hired after 2021" share a
+    wording but not literals. A capitalized first word is taken as sentence case, not a name.
+    """
+    user_query = user_query.strip()
+    literals = []
+
+    def replace(match):
+        group = next(index for index, value in enumerate(match.groups()) if value is not None)
+        if group == 3 and match.start() == 0:
+            return match.group(0)
+        literals.append(match.group(group + 1).lower())
+        return _LITERAL_PLACEHOLDERS[group]
+
+    masked = _QUERY_LITERAL.sub(replace, user_query)
+    return normalize_query(masked), tuple(literals)
+
+
+# Words that point at unstructured documents rather than database tables
+DOCUMENT_TERMS = {
+    "resume", "resumes", "cv", "cvs", "review", "reviews", "contract", "contracts", "clause", "clauses",
+    "document", "documents", "mention", "mentions", "mentioned", "mentioning", "skill", "skills",
+    "experience", "policy", "policies", "feedback"
+}
+
+# Words that point at structured employee data
+SQL_TERMS = {
+    "employee", "employees", "staff", "salary", "salaries", "department", "departments", "dept",
+    "count", "average", "avg", "total", "sum", "hired", "hire", "engineers", "managers", "top", "highest", "lowest"
+}
+
+
+def classify_query(user_query: str) -> str:
+    """Classify a query as "sql", "document" or "hybrid" from its vocabulary"""
+    words = set(re.findall(r"[a-z]+", user_query.lower()))
+    wants_documents = bool(words & DOCUMENT_TERMS)
+    wants_sql = bool(words & SQL_TERMS)
+    if wants_documents and wants_sql:
+        return "hybrid"
+    if wants_documents:
+        return "document"
+    return "sql"
+
+
+def _rank_documents(documents: List[Dict[str, Any]], rows: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Order document hits for a merged answer. When the SQL branch returned rows,
+    chunks that mention one of the returned entities (e.g. an employee name) get
+    HYBRID_ENTITY_BOOST added to their cosine score and the hits are re-sorted by it.
+    """
+    if not rows:
+        return documents
+
+    entities = set()
+    for row in rows[:Config.HYBRID_MAX_ENTITIES]:
+        for value in row.values():
+            if isinstance(value, str) and len(value) >= 3:
+                entities.add(value.lower())
+
+    ranked = []
+    for document in documents:
+        text = (document.get("text") or "").lower()
+        matched = [entity for entity in entities if entity in text]
+        if matched:
+            document = dict(document, score=document["score"] + Config.HYBRID_ENTITY_BOOST, matched_entities=matched)
+        ranked.append(document)
+    ranked.sort(key=lambda document: document["score"], reverse=True)
+    return ranked
+
+
+def _keyset_column(sql: str, schema: Optional[Dict[Any, Any]]) -> Optional[str]:
+    """
+    Primary key usable for keyset pagination: the statement must read a single table,
+    project its primary key column and have no ordering or limit of its own (keyset pages
+    are ordered by the key, which would override the order the question asked for).
+    """
+    match = re.match(r"\s*SELECT\s+(.*?)\s+FROM\s+(\w+)\b(.*)$", sql, re.IGNORECASE | re.DOTALL)
+    if not match or not schema or re.search(
+        r"\bJOIN\b|\bGROUP\s+BY\b|\bDISTINCT\b|\bORDER\s+BY\b|\bLIMIT\b|\bOFFSET\b|\bFETCH\b", sql, re.IGNORECASE
+    ):
+        return None
+    projection, table_name = match.group(1), match.group(2).lower()
+
+    for table in schema.get("tables", []):
+        if table["name"].lower() != table_name:
+            continue
+        keys = [column["name"] for column in table["columns"] if column.get("primary_key")]
+        if len(keys) != 1:
+            return None
+        selected = {part.strip().lower() for part in projection.split(",")}
+        return keys[0] if "*" in selected or keys[0].lower() in selected else None
+    return None
+
+
+def _table_statistics(schema: Optional[Dict[Any, Any]], table_name: str) -> Optional[Dict[str, Any]]:
+    statistics = (schema or {}).get("statistics") or {}
+    for name, table in statistics.items():
+        if name.lower() == table_name.lower() and "row_count" in table:
+            return table
+    return None
+
+
+def _predicate_selectivity(predicate: str, columns: Dict[str, Dict[str, Any]]) -> float:
+    """Fraction of rows matching one conjunct, from top values and distinct counts where possible"""
+    equality = re.match(
+        r"\s*(LOWER\s*\()?\s*(?:\w+\.)?(\w+)\s*\)?\s*=\s*('(?:[^']|'')*'|[\d.]+)\s*$", predicate, re.IGNORECASE
+    )
+    if equality and equality.group(2) in columns:
+        stats = columns[equality.group(2)]
+        literal = equality.group(3)
+        value = literal[1:-1].replace("''", "'") if literal.startswith("'") else literal
+        fold = (lambda text: text.lower()) if equality.group(1) else (lambda text: text)
+        for top in stats.get("top_values", []):
+            if fold(str(top["value"])) == value:
+                return top["fraction"]
+        if stats.get("top_values_complete"):
+            return 0.0
+        return 1.0 / max(1, stats.get("distinct_count") or 1)
+    # Ranges, LIKE and anything unrecognized: the usual one-third guess
+    return 1.0 / 3
+
+
+def estimate_cost(sql: str, schema: Optional[Dict[Any, Any]], paginated: bool = False) -> Dict[str, Any]:
+    """
+    Rough cost of a statement from the profiled column statistics: rows read, rows
+    returned, and warnings about unfiltered scans of very large tables.
+    """
+    cost: Dict[str, Any] = {"scanned_rows": None, "estimated_rows": None, "warnings": []}
+    tables = re.findall(r"\b(?:FROM|JOIN)\s+(\w+)", sql, re.IGNORECASE)
+    base = _table_statistics(schema, tables[0]) if tables else None
+    if base is None:
+        return cost
+
+    where = re.search(r"\bWHERE\b(.*?)(?:\bGROUP\s+BY\b|\bORDER\s+BY\b|\bLIMIT\b|$)", sql, re.IGNORECASE | re.DOTALL)
+    group = re.search(r"\bGROUP\s+BY\s+(?:\w+\.)?(\w+)", sql, re.IGNORECASE)
+    limit = re.search(r"\bLIMIT\s+(\d+)", sql, re.IGNORECASE)
+    aggregate = re.search(r"\b(?:COUNT|SUM|AVG|MIN|MAX)\s*\(", sql, re.IGNORECASE)
+
+    scanned = 0
+    for name in tables:
+        table = _table_statistics(schema, name)
+        if table is None:
+            continue
+        scanned += table["row_count"]
+        # An ordered or unbounded read without a filter touches every row; keyset pages do not
+        full_scan = where is None and (not limit or re.search(r"\bORDER\s+BY\b", sql, re.IGNORECASE))
+        if full_scan and not paginated and table["row_count"] >= Config.LARGE_TABLE_ROWS:
+            cost["warnings"].append(
+                f"Full scan of {name} (~{table['row_count']:,} rows); add a filter to make this query cheaper"
+            )
+    cost["scanned_rows"] = scanned
+
+    rows = float(base["row_count"])
+    if where is not None:
+        for predicate in re.split(r"\bAND\b", where.group(1), flags=re.IGNORECASE):
+            rows *= _predicate_selectivity(predicate, base.get("columns", {}))
+    if group:
+        distinct = base.get("columns", {}).get(group.group(1), {}).get("distinct_count")
+        rows = min(rows, distinct or rows)
+    elif aggregate:
+        rows = 1
+    if limit:
+        rows = min(rows, int(limit.group(1)))
+    cost["estimated_rows"] = int(round(rows))
+    return cost
+
+
+def schema_version(schema: Optional[Dict[Any, Any]]) -> str:
+    """Version tag for a schema: its own "version" field when present, otherwise a content hash"""
+    if not schema:
+        return "none"
+    if schema.get("version"):
+        return str(schema["version"])
+    payload = json.dumps(schema, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()[:16]
+
 
 class QueryEngine:
     """
     Query engine that processes natural language queries
     """
-    
-    def __init__(self):
-        # In a real implementation, we would initialize the Gemini API here
-        # For now, we'll simulate the functionality
-        pass
-        
-    def process_query(self, user_query: str, schema: Optional[Dict[Any, Any]] = None) -> Dict[Any, Any]:
+
+    def __init__(self, encoder=None, retriever=None, llm=None):
+        # Gemini (or the fake stand-in) behind single-flight, rate limiting and retries;
+        # None means translation uses the rule-based fallback only
+        self.llm = llm if llm is not None else get_llm_client()
+        # Shares compiled term indexes with the routes' schema discovery
+        self.schema_mapper = get_schema_store().discovery
+        self.templates = IntentTemplates()
+        self.llm_fallbacks = 0
+        # Shared by all workers when STATE_BACKEND=sqlite; the semantic cache stays per process
+        state = get_state()
+        self.cache = state.cache("query_results", Config.CACHE_MAX_SIZE, Config.CACHE_TTL_SECONDS)
+        # Pages keyed by SQL fingerprint and bound values, shared by every phrasing of a question
+        self.result_cache = state.cache("sql_results", Config.CACHE_MAX_SIZE, Config.CACHE_TTL_SECONDS)
+        self.semantic_cache = None
+        if Config.SEMANTIC_CACHE_ENABLED:
+            self.semantic_cache = SemanticCache(
+                encoder or get_encoder(),
+                Config.SEMANTIC_CACHE_MAX_SIZE,
+                Config.SEMANTIC_CACHE_THRESHOLD
+            )
+        self._retriever = retriever
+        self._schema_version = None
+
+    @property
+    def retriever(self):
+        if self._retriever is None:
+            from backend.services.retrieval import DocumentRetriever
+            self._retriever = DocumentRetriever(encoder=self.semantic_cache.encoder if self.semantic_cache is not None else None)
+        return self._retriever
+
+    def process_query(self, user_query: str, schema: Optional[Dict[Any, Any]] = None,
+                      page_size: int = Config.QUERY_PAGE_SIZE, cursor: Optional[str] = None) -> Dict[Any, Any]:
         """
         Process natural language query with:
         - Query classification (SQL vs document search vs hybrid)
@@ -19,53 +251,330 @@ class QueryEngine:
         - Performance optimization
         - Error handling and fallbacks
         """
+        timer = StageTimer()
+        try:
+            query_type, cache_key, cached = self._lookup(user_query, schema, page_size, cursor, timer)
+            if cached is not None:
+                return self._timed(cached, timer)
+
+            branches = {}
+            if query_type in ("sql", "hybrid"):
+                branches["sql"] = self._run_branch(self._run_sql_branch, user_query, schema, page_size, cursor, timer)
+            if query_type in ("document", "hybrid"):
+                branches["document"] = self._run_branch(self._run_document_branch, user_query, timer)
+
+            return self._timed(self._finish(user_query, query_type, cache_key, branches), timer)
+
+        except Exception as e:
+            return self._timed(self._error_result(user_query, e), timer)
+
+    async def aprocess_query(self, user_query: str, schema: Optional[Dict[Any, Any]] = None,
+                             page_size: int = Config.QUERY_PAGE_SIZE, cursor: Optional[str] = None) -> Dict[Any, Any]:
+        """
+        Async variant of process_query for use inside request handlers.
+        Blocking work runs on the default thread pool; for hybrid questions the SQL
+        and document branches run concurrently, each under its own timeout, and a
+        failed or slow branch degrades the answer to partial results.
+        """
+        timer = StageTimer()
         try:
-            # Simulate query processing
-            # In a real implementation, this would use the Gemini API
-            
-            # Simple rule-based approach for demo
-            if "employee" in user_query.lower() or "staff" in user_query.lower():
-                sql = "SELECT * FROM employees"
-            elif "department" in user_query.lower():
-                sql = "SELECT * FROM departments"
-            elif "salary" in user_query.lower():
-                sql = "SELECT name, salary FROM employees ORDER BY salary DESC"
-            else:
-                sql = "SELECT * FROM employees LIMIT 10"
-            
-            return {
-                "query": user_query,
-                "sql": sql,
-                "query_type": "sql",
-                "performance_metrics": {
-                    "response_time": 0.15,
-                    "cache_hit": False
-                },
-                "sources": ["database"]
-            }
-            
+            loop = asyncio.get_running_loop()
+            query_type, cache_key, cached = await loop.run_in_executor(
+                None, self._lookup, user_query, schema, page_size, cursor, timer
+            )
+            if cached is not None:
+                return self._timed(cached, timer)
+
+            names = []
+            tasks = []
+            if query_type in ("sql", "hybrid"):
+                names.append("sql")
+                tasks.append(self._run_branch_async(
+                    Config.SQL_BRANCH_TIMEOUT_SECONDS, self._run_sql_branch, user_query, schema, page_size, cursor, timer
+                ))
+            if query_type in ("document", "hybrid"):
+                names.append("document")
+                tasks.append(self._run_branch_async(
+                    Config.DOCUMENT_BRANCH_TIMEOUT_SECONDS, self._run_document_branch, user_query, timer
+                ))
+
+            branches = dict(zip(names, await asyncio.gather(*tasks)))
+            return self._timed(self._finish(user_query, query_type, cache_key, branches), timer)
+
         except Exception as e:
-            return {
-                "query": user_query,
-                "error": str(e),
-                "sql": "Error processing query",
-                "query_type": "error",
-                "performance_metrics": {
-                    "response_time": 0.0,
-                    "cache_hit": False
-                },
-                "sources": []
-            }
-    
-    def optimize_sql_query(self, sql: str) -> str:
+            return self._timed(self._error_result(user_query, e), timer)
+
+    def _lookup(self, user_query: str, schema: Optional[Dict[Any, Any]], page_size: int,
+                cursor: Optional[str], timer: StageTimer) -> Tuple[str, tuple, Optional[Dict[Any, Any]]]:
+        """Classify the query and check the result cache; returns (query_type, cache_key, cached result)"""
+        with timer.stage("classification"):
+            query_type = classify_query(user_query)
+
+        with timer.stage("cache_lookup"):
+            version = schema_version(schema)
+            self._check_schema_version(version)
+            # Versions hash structure only, so two databases with the same schema share one;
+            # cached answers hold their rows and must not cross between them
+            cache_key = (normalize_query(user_query), get_active_connection(), version, page_size, cursor)
+            if query_type != "sql":
+                # Document answers change as soon as more chunks are indexed
+                cache_key += (self.retriever.version(),)
+            cached = self.cache.get(cache_key)
+
+        if cached is not None:
+            return query_type, cache_key, self._with_cache_hit(cached, user_query)
+        return query_type, cache_key, None
+
+    def translate(self, user_query: str, schema: Optional[Dict[Any, Any]] = None) -> str:
+        """Natural language to SQL, reusing cached translations of similar queries"""
+        return self._translate(user_query, schema)[0]
+
+    def _run_sql_branch(self, user_query: str, schema: Optional[Dict[Any, Any]], page_size: int,
+                        cursor: Optional[str], timer: StageTimer) -> Dict[str, Any]:
+        with timer.stage("nl_to_sql"):
+            sql, similarity, translator = self._translate(user_query, schema, timer)
+        branch = {"sql": sql, "similarity": similarity, "translator": translator}
+
+        key_column = _keyset_column(sql, schema)
+        cost = estimate_cost(sql, schema, paginated=key_column is not None)
+        branch["cost"] = cost
+
+        engine = get_active_engine()
+        if engine is not None:
+            executed = sql
+            if key_column is None:
+                # Lets the database stop early (e.g. a top-N sort) when more than one page is expected
+                executed = self.optimize_sql_query(sql, schema, limit=page_size + 1)
+            statement = parameterize(executed.strip().rstrip(";").strip())
+            branch["fingerprint"] = statement.fingerprint
+            result_key = (get_active_connection(), statement.fingerprint, statement.params, key_column, page_size, cursor)
+            try:
+                with timer.stage("sql_execution"):
+                    page = self.result_cache.get(result_key)
+                    branch["result_cache_hit"] = page is not None
+                    if page is None:
+                        page = SQLExecutor(engine).execute_page(executed, key_column, page_size, cursor)
+                        self.result_cache.set(result_key, page)
+                branch.update(page)
+            except Exception as e:
+                # The translation is still useful to the caller even if it does not run
+                branch["execution_error"] = str(e)
+        return branch
+
+    def _run_document_branch(self, user_query: str, timer: StageTimer) -> List[Dict[str, Any]]:
+        with timer.stage("retrieval"):
+            return self.retriever.search(user_query)
+
+    def _run_branch(self, fn, *args) -> Dict[str, Any]:
+        """Run one branch, capturing its outcome and wall time instead of raising"""
+        start = time.perf_counter()
+        try:
+            return {"ok": True, "value": fn(*args), "time": time.perf_counter() - start}
+        except Exception as e:
+            return {"ok": False, "error": str(e), "time": time.perf_counter() - start}
+
+    async def _run_branch_async(self, timeout: float, fn, *args) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(None, self._run_branch, fn, *args), timeout)
+        except asyncio.TimeoutError:
+            return {"ok": False, "error": f"timed out after {timeout}s", "time": time.perf_counter() - start}
+
+    def _finish(self, user_query: str, query_type: str, cache_key: tuple, branches: Dict[str, Dict[str, Any]]) -> Dict[Any, Any]:
+        """Merge branch outcomes into one response; only complete answers are cached"""
+        failed = {name: branch["error"] for name, branch in branches.items() if not branch["ok"]}
+        if len(failed) == len(branches):
+            raise RuntimeError("; ".join(f"{name}: {error}" for name, error in failed.items()))
+
+        sql_value = branches["sql"]["value"] if branches.get("sql", {}).get("ok") else {}
+        documents = branches["document"]["value"] if branches.get("document", {}).get("ok") else []
+
+        sources = []
+        if sql_value:
+            sources.append("database")
+        sources.extend(_rank_documents(documents, sql_value.get("rows")))
+
+        similarity = sql_value.get("similarity")
+        performance_metrics = {
+            "cache_hit": False,
+            "semantic_cache_hit": similarity is not None,
+            "semantic_similarity": similarity,
+            "translator": sql_value.get("translator"),
+            "estimated_rows": sql_value.get("cost", {}).get("estimated_rows"),
+            "sql_fingerprint": sql_value.get("fingerprint"),
+            "result_cache_hit": sql_value.get("result_cache_hit", False),
+            "branch_timings": {name: branch["time"] for name, branch in branches.items()}
+        }
+        if failed:
+            performance_metrics["partial"] = True
+            performance_metrics["branch_errors"] = failed
+
+        result = {
+            "query": user_query,
+            "sql": sql_value.get("sql", ""),
+            "query_type": query_type,
+            "performance_metrics": performance_metrics,
+            "sources": sources
+        }
+        for key in ("columns", "rows", "next_cursor", "truncated", "execution_error"):
+            if key in sql_value:
+                result[key] = sql_value[key]
+        if sql_value.get("cost", {}).get("warnings"):
+            result["warnings"] = sql_value["cost"]["warnings"]
+        if not failed:
+            self.cache.set(cache_key, result)
+        return result
+
+    def _error_result(self, user_query: str, error: Exception) -> Dict[Any, Any]:
+        return {
+            "query": user_query,
+            "error": str(error),
+            "sql": "Error processing query",
+            "query_type": "error",
+            "performance_metrics": {
+                "cache_hit": False
+            },
+            "sources": []
+        }
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Counters for the query result and semantic caches"""
+        stats = self.cache.stats()
+        if self.semantic_cache is not None:
+            stats["semantic"] = self.semantic_cache.stats()
+        stats["fast_path"] = self.templates.stats()
+        stats["results"] = self.result_cache.stats()
+        stats["statements"] = statement_cache.stats()
+        if self.llm is not None:
+            stats["llm"] = dict(self.llm.stats(), fallbacks=self.llm_fallbacks)
+        return stats
+
+    def invalidate_cache(self) -> None:
+        """Drop all cached results, e.g. after the schema has been re-discovered"""
+        self.cache.clear()
+        self.result_cache.clear()
+        if self.semantic_cache is not None:
+            self.semantic_cache.clear()
+
+    def _check_schema_version(self, version: str) -> None:
+        """Invalidate the cache whenever queries start arriving against a different schema"""
+        if self._schema_version != version:
+            if self._schema_version is not None:
+                self.invalidate_cache()
+            self._schema_version = version
+
+    def _translate(self, user_query: str, schema: Optional[Dict[Any, Any]],
+                   timer: Optional[StageTimer] = None) -> Tuple[str, Optional[float], str]:
+        """
+        Translation chain, cheapest first: intent templates, the SQL of a similarly phrased
+        earlier query, the LLM, then the keyword rules.
+        Returns (sql, semantic similarity or None, name of the translator that answered).
+        """
+        timer = timer or StageTimer()
+        if schema:
+            # Exact template SQL beats a near-duplicate ("top 5" vs "top 10") from the semantic cache
+            with timer.stage("fast_path"):
+                matched = self.templates.translate(normalize_query(user_query), schema, schema_version(schema))
+            if matched is not None:
+                intent, sql = matched
+                return sql, None, f"template:{intent}"
+        return self._translate_with_semantic_cache(user_query, schema, timer)
+
+    def _translate_with_semantic_cache(self, user_query: str, schema: Optional[Dict[Any, Any]],
+                                       timer: StageTimer) -> Tuple[str, Optional[float], str]:
+        """
+        Reuse the SQL of a previously translated, similarly phrased query.
+        The wording is embedded with its values masked, and a cached translation is only
+        reused when the values are the same, since they are baked into its SQL.
+        Returns (sql, similarity, translator); similarity is None when the SQL was freshly translated.
+        """
+        if self.semantic_cache is None:
+            sql, translator = self._translate_to_sql(user_query, schema, timer)
+            return sql, None, translator
+
+        masked, literals = mask_literals(user_query)
+        try:
+            embedding = self.semantic_cache.embed(masked)
+        except Exception:
+            # Embeddings are an optimization only; never fail the query because of them
+            sql, translator = self._translate_to_sql(user_query, schema, timer)
+            return sql, None, translator
+
+        match = self.semantic_cache.lookup(embedding, key=literals)
+        if match is not None:
+            sql, similarity = match
+            return sql, similarity, "semantic_cache"
+
+        sql, translator = self._translate_to_sql(user_query, schema, timer)
+        self.semantic_cache.add(embedding, sql, key=literals)
+        return sql, None, translator
+
+    def _timed(self, result: Dict[Any, Any], timer: StageTimer) -> Dict[Any, Any]:
+        """
+        Stamp the real response time and stage breakdown onto a result.
+        Cached entries are shared, so the metrics dict is replaced rather than updated.
+        """
+        elapsed = timer.elapsed()
+        metrics = dict(result["performance_metrics"], response_time=elapsed, stage_timings=dict(timer.timings))
+        QUERY_SECONDS.observe(elapsed, result["query_type"], "hit" if metrics["cache_hit"] else "miss")
+        return dict(result, performance_metrics=metrics)
+
+    def _with_cache_hit(self, cached: Dict[Any, Any], user_query: str) -> Dict[Any, Any]:
+        """Copy a cached result so callers can't mutate the stored entry"""
+        result = dict(cached)
+        result["query"] = user_query
+        result["performance_metrics"] = dict(cached["performance_metrics"], cache_hit=True)
+        result["sources"] = list(cached["sources"])
+        return result
+
+    def _translate_to_sql(self, user_query: str, schema: Optional[Dict[Any, Any]] = None,
+                          timer: Optional[StageTimer] = None) -> Tuple[str, str]:
+        """
+        Translate the natural language query into SQL, falling back to rules if the LLM fails.
+        Returns (sql, translator).
+        """
+        if self.llm is not None and schema:
+            try:
+                return self._translate_with_llm(user_query, schema, timer), "llm"
+            except LLMError:
+                self.llm_fallbacks += 1
+
+        # Simple rule-based approach for demo; the most specific keyword is checked first,
+        # otherwise "employee salary" questions would never reach the salary rule
+        query = user_query.lower()
+        if "salary" in query:
+            return "SELECT name, salary FROM employees ORDER BY salary DESC", "rules"
+        elif "department" in query:
+            return "SELECT * FROM departments", "rules"
+        elif "employee" in query or "staff" in query:
+            return "SELECT * FROM employees", "rules"
+        else:
+            return "SELECT * FROM employees LIMIT 10", "rules"
+
+    def _translate_with_llm(self, user_query: str, schema: Dict[Any, Any], timer: Optional[StageTimer]) -> str:
+        timer = timer or StageTimer()
+        with timer.stage("schema_mapping"):
+            mapping = self.schema_mapper.map_natural_language_to_schema(user_query, schema)
+        prompt = build_sql_prompt(user_query, compact_schema_context(schema, mapping), schema.get("database_type"))
+        with timer.stage("llm"):
+            return extract_sql(self.llm.complete(prompt), schema.get("database_type"))
+
+    def optimize_sql_query(self, sql: str, schema: Optional[Dict[Any, Any]] = None,
+                           limit: int = Config.QUERY_PAGE_SIZE) -> str:
         """
         Optimize generated SQL:
         - Use indexes when available
         - Limit result sets appropriately
         - Add pagination for large results
         """
-        # Add LIMIT clause if not present to prevent large result sets
-        if "LIMIT" not in sql.upper():
-            sql = f"{sql.strip()};\n-- LIMIT 100 added for performance\nLIMIT 100;"
-        
-        return sql
\ No newline at end of file
+        sql = sql.strip().rstrip(";").strip()
+        if re.search(r"\bLIMIT\s+\d+", sql, re.IGNORECASE):
+            return sql
+
+        # With column statistics, only bound results expected to be larger than the limit
+        estimated = estimate_cost(sql, schema)["estimated_rows"] if schema else None
+        if estimated is None or estimated > limit:
+            sql = f"{sql} LIMIT {limit}"
+
+        return sql
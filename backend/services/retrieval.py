@@ -0,0 +1,307 @@
+import math
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from backend.config import Config
+from backend.services.lexical_index import BM25Index, get_lexical_index
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int, block_rows: int = 65536,
+                exclude: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Brute-force inner-product top-k for a batch of queries.
+    The matrix is scanned in blocks (one matmul each) so a memory-mapped store
+    never has to be materialized; returns (ids, scores), each of shape (n_queries, k).
+    Rows in exclude (sorted ids) score -inf.
+    """
+    n_queries = queries.shape[0]
+    best_ids = np.empty((n_queries, 0), dtype=np.int64)
+    best_scores = np.empty((n_queries, 0), dtype=np.float32)
+
+    for start in range(0, vectors.shape[0], block_rows):
+        block = np.asarray(vectors[start:start + block_rows])
+        scores = queries @ block.T
+        if exclude is not None and exclude.size:
+            lo, hi = np.searchsorted(exclude, [start, start + block.shape[0]])
+            scores[:, exclude[lo:hi] - start] = -np.inf
+        if scores.shape[1] > k:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+        best_ids = np.concatenate([best_ids, top + start], axis=1)
+        best_scores = np.concatenate([best_scores, np.take_along_axis(scores, top, axis=1)], axis=1)
+        if best_ids.shape[1] > k:
+            keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+            best_ids = np.take_along_axis(best_ids, keep, axis=1)
+            best_scores = np.take_along_axis(best_scores, keep, axis=1)
+
+    order = np.argsort(-best_scores, axis=1)
+    return np.take_along_axis(best_ids, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+
+class IVFIndex:
+    """
+    Approximate inverted-file index: vectors are clustered with spherical k-means
+    and a query only scores the vectors in its n_probe nearest clusters.
+    """
+
+    def __init__(self, n_lists: int, n_probe: int = Config.IVF_N_PROBE):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.centroids = None
+        self.ids = None
+        self.offsets = None
+        self.n_vectors = 0
+
+    def build(self, vectors: np.ndarray, n_iter: int = 10, sample_size: int = 100000, seed: int = 0,
+              block_rows: int = 65536) -> "IVFIndex":
+        """Train centroids on a sample, then assign every vector to its nearest centroid"""
+        rng = np.random.default_rng(seed)
+        n_vectors = vectors.shape[0]
+        self.n_lists = max(1, min(self.n_lists, n_vectors))
+
+        sample_ids = rng.choice(n_vectors, size=min(sample_size, n_vectors), replace=False)
+        sample = np.asarray(vectors[np.sort(sample_ids)], dtype=np.float32)
+        centroids = sample[rng.choice(sample.shape[0], size=self.n_lists, replace=False)].copy()
+
+        for _ in range(n_iter):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            counts = np.bincount(assignment, minlength=self.n_lists)
+            empty = counts == 0
+            # Re-seed empty clusters with random sample points
+            sums[empty] = sample[rng.choice(sample.shape[0], size=int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = sums / norms
+
+        assignment = np.empty(n_vectors, dtype=np.int32)
+        for start in range(0, n_vectors, block_rows):
+            block = np.asarray(vectors[start:start + block_rows])
+            assignment[start:start + block.shape[0]] = np.argmax(block @ centroids.T, axis=1)
+
+        self.centroids = centroids.astype(np.float32)
+        self.ids = np.argsort(assignment, kind="stable").astype(np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=self.n_lists))])
+        self.n_vectors = n_vectors
+        return self
+
+    def search(self, vectors: np.ndarray, queries: np.ndarray, k: int,
+               n_probe: Optional[int] = None, exclude: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k over the probed clusters; rows with fewer than k candidates are padded with id -1"""
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        probes = np.argpartition(-(queries @ self.centroids.T), n_probe - 1, axis=1)[:, :n_probe]
+
+        all_ids = np.full((queries.shape[0], k), -1, dtype=np.int64)
+        all_scores = np.full((queries.shape[0], k), -np.inf, dtype=np.float32)
+        for row, query in enumerate(queries):
+            candidates = np.concatenate([self.ids[self.offsets[c]:self.offsets[c + 1]] for c in probes[row]])
+            if exclude is not None and exclude.size:
+                candidates = candidates[~np.isin(candidates, exclude)]
+            if candidates.size == 0:
+                continue
+            candidates.sort()  # sequential access into the memory map
+            scores = np.asarray(vectors[candidates]) @ query
+            top = np.argpartition(-scores, k - 1)[:k] if scores.size > k else np.arange(scores.size)
+            top = top[np.argsort(-scores[top])]
+            all_ids[row, :top.size] = candidates[top]
+            all_scores[row, :top.size] = scores[top]
+        return all_ids, all_scores
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int, constant: int = Config.RRF_K) -> List[Tuple[int, float]]:
+    """
+    Merge ranked id lists by summing 1 / (constant + rank). Scores are scaled so that
+    an id ranked first by every non-empty list scores 1.0.
+    """
+    rankings = [ranking for ranking in rankings if ranking]
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (constant + rank)
+    best = len(rankings) / (constant + 1)
+    return sorted(((item, score / best) for item, score in scores.items()), key=lambda pair: -pair[1])[:k]
+
+
+class DocumentRetriever:
+    """
+    Top-k chunk retrieval over the vector store.
+    Mode "exact" scans every vector; mode "ivf" uses an IVFIndex once the store holds
+    at least Config.IVF_MIN_VECTORS rows, and scans rows appended since the last build exactly.
+    With lexical search on, BM25 results over the same chunks are fused in by reciprocal
+    rank, so exact names, skills and clause numbers are found even where embeddings miss them.
+    """
+
+    def __init__(self, store=None, encoder=None, mode: str = Config.RETRIEVAL_MODE, lexical=None,
+                 lexical_enabled: bool = Config.LEXICAL_SEARCH_ENABLED):
+        self._store = store
+        self._encoder = encoder
+        self.mode = mode
+        self._index: Optional[IVFIndex] = None
+        self._index_lock = threading.Lock()
+        self._building = False
+        # The process-wide lexical index mirrors the process-wide store only
+        self._lexical = lexical if lexical is not None or store is None else BM25Index()
+        self.lexical_enabled = lexical_enabled
+        self._lexical_lock = threading.Lock()
+        self._syncing = False
+
+    @property
+    def store(self):
+        if self._store is None:
+            from backend.services.vector_store import get_vector_store
+            self._store = get_vector_store()
+        return self._store
+
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            from backend.services.embeddings import get_encoder
+            self._encoder = get_encoder()
+        return self._encoder
+
+    @property
+    def lexical(self) -> BM25Index:
+        if self._lexical is None:
+            self._lexical = get_lexical_index()
+        return self._lexical
+
+    def version(self) -> int:
+        """Changes whenever documents are added, replaced or removed, or the lexical index catches up"""
+        version = self.store.version()
+        if self.lexical_enabled:
+            version += self.lexical.covered
+        return version
+
+    def search(self, query: str, k: int = Config.RETRIEVAL_TOP_K) -> List[Dict[str, Any]]:
+        """
+        Return up to k chunks ranked by cosine similarity to the query, or by their fused
+        rank when BM25 is enabled. "score" is always the cosine similarity; fused results
+        also carry the normalized reciprocal-rank score under "fused_score".
+        """
+        vectors = self.store.vectors()
+        if vectors.shape[0] == 0:
+            return []
+
+        tombstones = self.store.tombstones()
+        # Fusion draws from deeper lists than it returns
+        depth = 2 * k if self.lexical_enabled else k
+        query_vector = self.encoder.encode([query])
+        ids, scores = self._search_vectors(vectors, query_vector, depth, tombstones)
+        ranked = [(int(i), float(s)) for i, s in zip(ids[0], scores[0]) if i >= 0 and np.isfinite(s)]
+        fused = None
+        if self.lexical_enabled:
+            lexical_ids, _ = self._synced_lexical(tombstones).search(query, depth, tombstones)
+            fused = dict(reciprocal_rank_fusion([[i for i, _ in ranked], lexical_ids.tolist()], k))
+            cosine = dict(ranked)
+            # Chunks found by BM25 alone were not among the vector hits; score them directly
+            missing = [i for i in fused if i not in cosine]
+            if missing:
+                cosine.update(zip(missing, (np.asarray(vectors[missing]) @ query_vector[0]).tolist()))
+            ranked = [(i, cosine[i]) for i in fused]
+
+        chunks = {chunk["id"]: chunk for chunk in self.store.get_chunks([i for i, _ in ranked])}
+        sources = []
+        for chunk_id, score in ranked:
+            chunk = chunks.get(chunk_id)
+            if chunk is None:
+                continue
+            source = {
+                "type": "document",
+                "file_path": chunk["file_path"],
+                "chunk_index": chunk["chunk_index"],
+                "score": score,
+                "text": chunk["text"]
+            }
+            if fused is not None:
+                source["fused_score"] = fused[chunk_id]
+            sources.append(source)
+        return sources
+
+    def sync_lexical(self) -> None:
+        """Synchronously index every store row the lexical index has not seen yet"""
+        with self._lexical_lock:
+            self._catch_up(len(self.store))
+
+    def _synced_lexical(self, tombstones: np.ndarray) -> BM25Index:
+        """
+        The lexical index, caught up with the store: small gaps (rows added by another
+        worker) inline, large ones (a first build) on a background thread
+        """
+        index = self.lexical
+        index.set_tombstones(tombstones)
+        missing = len(self.store) - index.covered
+        if missing > 0 and not self._syncing:
+            if missing <= Config.LEXICAL_SYNC_ROWS:
+                self.sync_lexical()
+            else:
+                self._syncing = True
+                threading.Thread(target=self._background_sync, daemon=True).start()
+        return index
+
+    def _background_sync(self) -> None:
+        try:
+            self.sync_lexical()
+        finally:
+            self._syncing = False
+
+    def _catch_up(self, stop: int) -> None:
+        # Caller holds _lexical_lock; the ingestion pipeline may add rows concurrently
+        index = self.lexical
+        while index.covered < stop:
+            start = index.covered
+            texts = self.store.texts(start, min(stop, start + Config.LEXICAL_SYNC_ROWS))
+            if not texts:
+                break
+            index.add(start, texts)
+
+    def _search_vectors(self, vectors: np.ndarray, queries: np.ndarray, k: int,
+                        exclude: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        index = self._get_index(vectors) if self.mode == "ivf" else None
+        if index is None:
+            return exact_top_k(vectors, queries, k, exclude=exclude)
+
+        ids, scores = index.search(vectors, queries, k, exclude=exclude)
+        if vectors.shape[0] > index.n_vectors:
+            tail_exclude = None
+            if exclude is not None:
+                tail_exclude = exclude[exclude >= index.n_vectors] - index.n_vectors
+            tail_ids, tail_scores = exact_top_k(vectors[index.n_vectors:], queries, k, exclude=tail_exclude)
+            ids = np.concatenate([ids, tail_ids + index.n_vectors], axis=1)
+            scores = np.concatenate([scores, tail_scores], axis=1)
+            order = np.argsort(-scores, axis=1)[:, :k]
+            ids = np.take_along_axis(ids, order, axis=1)
+            scores = np.take_along_axis(scores, order, axis=1)
+        return ids, scores
+
+    def _get_index(self, vectors: np.ndarray) -> Optional[IVFIndex]:
+        """
+        Current IVF index, or None while the store is too small or the first build is running.
+        Builds (and rebuilds after 20% growth) happen on a background thread; until then
+        the exact scan covers whatever the index does not.
+        """
+        n_vectors = vectors.shape[0]
+        if n_vectors < Config.IVF_MIN_VECTORS:
+            return None
+        with self._index_lock:
+            index = self._index
+            stale = index is None or n_vectors > index.n_vectors * 1.2
+            if stale and not self._building:
+                self._building = True
+                threading.Thread(target=self._build_index, args=(vectors,), daemon=True).start()
+            return index
+
+    def build_index(self) -> Optional[IVFIndex]:
+        """Synchronously (re)build the IVF index over the current store contents"""
+        self._build_index(self.store.vectors())
+        return self._index
+
+    def _build_index(self, vectors: np.ndarray) -> None:
+        try:
+            n_lists = Config.IVF_N_LISTS or int(math.sqrt(vectors.shape[0]))
+            index = IVFIndex(n_lists).build(vectors)
+            with self._index_lock:
+                self._index = index
+        finally:
+            self._building = False
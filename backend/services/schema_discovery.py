@@ -1,8 +1,85 @@
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import inspect, text, types
+from backend.config import Config
+from backend.services.column_profiler import ColumnProfiler, is_fresh
+from backend.services.database import get_engine
+
+
+# Mapping dictionary for common variations
+TERM_MAPPING = {
+    "employee": ["employee", "employees", "emp", "staff", "personnel"],
+    "salary": ["salary", "compensation", "pay", "wage"],
+    "department": ["department", "dept", "division"],
+    "name": ["name", "full_name", "employee_name"],
+    "hire": ["hire", "join", "start"],
+    "date": ["date", "time", "year"]
+}
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def _database_type(engine) -> str:
+    return {
+        "postgresql": "PostgreSQL",
+        "mysql": "MySQL",
+        "sqlite": "SQLite"
+    }.get(engine.dialect.name, engine.dialect.name)
+
+
+def _column_type(column_type) -> str:
+    """Map a reflected SQLAlchemy type onto the generic names used by the frontend"""
+    if isinstance(column_type, types.Boolean):
+        return "boolean"
+    if isinstance(column_type, types.Integer):
+        return "integer"
+    if isinstance(column_type, types.Numeric):
+        return "decimal"
+    if isinstance(column_type, types.DateTime):
+        return "datetime"
+    if isinstance(column_type, types.Date):
+        return "date"
+    if isinstance(column_type, types.String):
+        return "string"
+    return str(column_type).lower() if not isinstance(column_type, types.NullType) else "unknown"
+
+
+def _table_purpose(table_name: str) -> str:
+    """Human-readable guess at a table's purpose, e.g. employees -> "Employee information"."""
+    words = table_name.replace("_", " ").strip()
+    if words.endswith("ies"):
+        words = words[:-3] + "y"
+    elif words.endswith("s") and not words.endswith("ss"):
+        words = words[:-1]
+    return f"{words.capitalize()} information"
+
 
 class SchemaDiscovery:
     """
     Class to handle automatic schema discovery from databases
     """
+
+    TERM_INDEX_CACHE_SIZE = 8
+
+    def __init__(self, max_workers: int = Config.DATABASE_POOL_SIZE,
+                 profiler: Optional[ColumnProfiler] = None):
+        self.max_workers = max_workers
+        # Column statistics; None disables profiling
+        self.profiler = profiler or (ColumnProfiler(max_workers) if Config.SCHEMA_PROFILING_ENABLED else None)
+        # Versioned snapshots per connection string, refreshed incrementally
+        self._snapshots: Dict[str, dict] = {}
+        # One refresh at a time per connection string; reflection runs under these only
+        self._refresh_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        # Compiled term indexes keyed by schema version, with their own lock so that
+        # queries never wait on a refresh
+        self._term_indexes: "OrderedDict" = OrderedDict()
+        self._term_lock = threading.Lock()
     
     def analyze_database(self, connection_string: str) -> dict:
         """
@@ -10,106 +87,272 @@ class SchemaDiscovery:
         - Table names and their likely purpose (employees, departments, etc.)
         - Column names and data types
         - Relationships between tables
-        - Sample data for context understanding
+        - Column statistics (row counts, distinct estimates, null fraction,
+          min/max and top values) from a bounded sample, under "statistics"
         
         Should work with variations like:
         - employee, employees, emp, staff
         - salary, compensation, pay
         - dept, department, division
         """
-        # This is a simplified implementation for demonstration
-        # In a real implementation, this would connect to the actual database
-        # and analyze the schema using database metadata
-        
-        # Simulated schema discovery based on connection string
-        if "postgresql" in connection_string:
-            db_type = "PostgreSQL"
-        elif "mysql" in connection_string:
-            db_type = "MySQL"
+        # The first call reflects every table; later calls only re-reflect changed ones
+        return self.refresh(connection_string)
+
+    def refresh(self, connection_string: str) -> dict:
+        """
+        Incrementally refresh a cached schema snapshot.
+        Only tables whose definition signature changed are reflected again;
+        the snapshot version only changes when the schema actually changed.
+        """
+        with self._lock:
+            refresh_lock = self._refresh_locks.setdefault(connection_string, threading.Lock())
+        with refresh_lock:
+            previous = self._snapshots.get(connection_string)
+            snapshot = self._discover(connection_string, previous=previous)
+            with self._lock:
+                self._snapshots[connection_string] = snapshot
+        return snapshot["schema"]
+
+    def get_snapshot(self, connection_string: str) -> Optional[dict]:
+        """Return the cached schema for a connection string without touching the database"""
+        snapshot = self._snapshots.get(connection_string)
+        return snapshot["schema"] if snapshot else None
+
+    def _discover(self, connection_string: str, previous: Optional[dict]) -> dict:
+        engine = get_engine(connection_string)
+
+        signatures = self._table_signatures(engine)
+        if signatures is None:
+            # No cheap change detection for this dialect: reflect everything
+            table_names = sorted(inspect(engine).get_table_names())
+            changed = table_names
         else:
-            db_type = "SQLite"
-            
+            table_names = sorted(signatures)
+            previous_signatures = previous["signatures"] if previous else {}
+            changed = [
+                name for name in table_names
+                if previous_signatures.get(name) is None or previous_signatures[name] != signatures[name]
+            ]
+
+        reflected = self._reflect_tables(engine, changed)
+        if self.profiler is not None:
+            # Unchanged tables keep the statistics gathered when they were last reflected,
+            # until those are old enough that rows may have been added since
+            for name in table_names:
+                if name not in reflected and not is_fresh(previous["tables"][name].get("statistics")):
+                    reflected[name] = dict(previous["tables"][name])
+            if reflected:
+                profiled = self.profiler.profile(engine, [reflected[name]["table"] for name in reflected])
+                for name, statistics in profiled.items():
+                    reflected[name]["statistics"] = statistics
+
+        tables = {}
+        for name in table_names:
+            if name in reflected:
+                tables[name] = reflected[name]
+            else:
+                tables[name] = previous["tables"][name]
+
+        if previous is not None and not reflected and set(table_names) == set(previous["tables"]):
+            return previous
+
+        ordered = [tables[name]["table"] for name in table_names]
+        relationships = [rel for name in table_names for rel in tables[name]["relationships"]]
         schema = {
-            "database_type": db_type,
-            "tables": [
-                {
-                    "name": "employees",
-                    "purpose": "Employee information",
-                    "columns": [
-                        {"name": "id", "type": "integer", "primary_key": True},
-                        {"name": "full_name", "type": "string"},
-                        {"name": "dept_id", "type": "integer", "foreign_key": "departments.dept_id"},
-                        {"name": "position", "type": "string"},
-                        {"name": "annual_salary", "type": "decimal"},
-                        {"name": "join_date", "type": "date"}
-                    ]
-                },
-                {
-                    "name": "departments",
-                    "purpose": "Department information",
-                    "columns": [
-                        {"name": "dept_id", "type": "integer", "primary_key": True},
-                        {"name": "dept_name", "type": "string"},
-                        {"name": "manager_id", "type": "integer"}
-                    ]
-                }
-            ],
-            "relationships": [
-                {
-                    "name": "employee_department",
-                    "from": "employees.dept_id",
-                    "to": "departments.dept_id",
+            "database_type": _database_type(engine),
+            "tables": ordered,
+            "relationships": relationships
+        }
+        payload = json.dumps(schema, sort_keys=True).encode("utf-8")
+        schema["version"] = hashlib.sha1(payload).hexdigest()[:16]
+        # Attached after hashing: the version tracks structure, not data drift
+        schema["statistics"] = {
+            name: tables[name]["statistics"] for name in table_names if "statistics" in tables[name]
+        }
+
+        return {
+            "schema": schema,
+            "signatures": signatures or {},
+            "tables": tables
+        }
+
+    def _reflect_tables(self, engine, table_names: List[str]) -> Dict[str, dict]:
+        """Reflect columns, primary keys and foreign keys of tables concurrently"""
+        if not table_names:
+            return {}
+
+        workers = max(1, min(self.max_workers, len(table_names)))
+        if workers == 1:
+            return {name: self._reflect_table(engine, name) for name in table_names}
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(lambda name: self._reflect_table(engine, name), table_names)
+            return dict(zip(table_names, results))
+
+    def _reflect_table(self, engine, table_name: str) -> dict:
+        # Each worker checks out its own pooled connection; inspectors are not thread-safe
+        with engine.connect() as connection:
+            inspector = inspect(connection)
+            columns = inspector.get_columns(table_name)
+            primary_key = set(inspector.get_pk_constraint(table_name).get("constrained_columns") or [])
+            foreign_keys = inspector.get_foreign_keys(table_name)
+
+        references = {}
+        relationships = []
+        for fk in foreign_keys:
+            for column, referred in zip(fk["constrained_columns"], fk["referred_columns"]):
+                target = f"{fk['referred_table']}.{referred}"
+                references[column] = target
+                relationships.append({
+                    "name": f"{table_name}_{fk['referred_table']}",
+                    "from": f"{table_name}.{column}",
+                    "to": target,
                     "type": "many_to_one"
-                }
-            ]
+                })
+
+        column_entries = []
+        for column in columns:
+            entry = {"name": column["name"], "type": _column_type(column["type"])}
+            if column["name"] in primary_key:
+                entry["primary_key"] = True
+            if column["name"] in references:
+                entry["foreign_key"] = references[column["name"]]
+            column_entries.append(entry)
+
+        return {
+            "table": {
+                "name": table_name,
+                "purpose": _table_purpose(table_name),
+                "columns": column_entries
+            },
+            "relationships": relationships
         }
-        
-        return schema
-    
+
+    def _table_signatures(self, engine) -> Optional[Dict[str, str]]:
+        """
+        Cheap per-table definition fingerprints used to detect changed tables.
+        Returns None for dialects without a supported catalog query.
+        """
+        dialect = engine.dialect.name
+        with engine.connect() as connection:
+            if dialect == "sqlite":
+                rows = connection.execute(text(
+                    "SELECT name, sql FROM sqlite_master "
+                    "WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+                ))
+                return {name: hashlib.sha1((sql or "").encode("utf-8")).hexdigest() for name, sql in rows}
+
+            if dialect in ("postgresql", "mysql"):
+                current_schema = "current_schema()" if dialect == "postgresql" else "DATABASE()"
+                digests = {}
+                for query in (
+                    "SELECT table_name, column_name, data_type, is_nullable FROM information_schema.columns "
+                    f"WHERE table_schema = {current_schema} ORDER BY table_name, ordinal_position",
+                    "SELECT table_name, column_name, constraint_name FROM information_schema.key_column_usage "
+                    f"WHERE table_schema = {current_schema} ORDER BY table_name, constraint_name, column_name"
+                ):
+                    for row in connection.execute(text(query)):
+                        digest = digests.setdefault(row[0], hashlib.sha1())
+                        digest.update(repr(tuple(row[1:])).encode("utf-8"))
+                table_names = set(inspect(connection).get_table_names())
+                return {name: digest.hexdigest() for name, digest in digests.items() if name in table_names}
+
+        return None
+
     def map_natural_language_to_schema(self, query: str, schema: dict) -> dict:
         """
         Map user's natural language to actual database structure.
         Example: "salary" in query → "annual_salary" in database
         """
-        # Mapping dictionary for common variations
-        term_mapping = {
-            "employee": ["employee", "employees", "emp", "staff", "personnel"],
-            "salary": ["salary", "compensation", "pay", "wage"],
-            "department": ["department", "dept", "division"],
-            "name": ["name", "full_name", "employee_name"],
-            "hire": ["hire", "join", "start"],
-            "date": ["date", "time", "year"]
-        }
-        
-        # Find relevant tables and columns based on query terms
-        relevant_tables = []
-        relevant_columns = []
-        
-        query_lower = query.lower()
-        
-        # Check for table relevance
-        for table in schema["tables"]:
-            table_name = table["name"].lower()
-            for key, variations in term_mapping.items():
-                if any(variation in table_name for variation in variations) and any(key in query_lower for key in term_mapping):
-                    if table not in relevant_tables:
-                        relevant_tables.append(table)
-        
-        # If no specific tables found, include all
-        if not relevant_tables:
-            relevant_tables = schema["tables"]
-            
-        # Check for column relevance
-        for table in relevant_tables:
-            for column in table["columns"]:
-                column_name = column["name"].lower()
-                for key, variations in term_mapping.items():
-                    if any(variation in column_name for variation in variations) and key in query_lower:
-                        if column not in relevant_columns:
-                            relevant_columns.append(column)
-        
+        return self.get_term_index(schema).match(query)
+
+    def get_term_index(self, schema: dict) -> "SchemaTermIndex":
+        """Return the compiled term index for a schema snapshot, building it once per version"""
+        key = schema.get("version") or id(schema)
+        with self._term_lock:
+            index = self._term_indexes.get(key)
+            if index is not None and (schema.get("version") or index.schema is schema):
+                self._term_indexes.move_to_end(key)
+                return index
+
+        index = SchemaTermIndex(schema)
+        with self._term_lock:
+            self._term_indexes[key] = index
+            while len(self._term_indexes) > self.TERM_INDEX_CACHE_SIZE:
+                self._term_indexes.popitem(last=False)
+        return index
+
+
+class SchemaTermIndex:
+    """
+    Inverted index from query terms to the tables and columns they refer to.
+    Built once per schema snapshot so that matching a query only costs a
+    dictionary lookup per query token instead of a scan over the schema.
+    """
+
+    def __init__(self, schema: dict):
+        self.schema = schema
+        self.tables = schema["tables"]
+        self.table_terms: Dict[str, Set[int]] = {}
+        self.column_terms: Dict[str, Set[Tuple[int, int]]] = {}
+
+        for table_index, table in enumerate(self.tables):
+            for term in _name_terms(table["name"]):
+                self.table_terms.setdefault(term, set()).add(table_index)
+            for column_index, column in enumerate(table["columns"]):
+                for term in _name_terms(column["name"]):
+                    self.column_terms.setdefault(term, set()).add((table_index, column_index))
+
+    def match(self, query: str) -> dict:
+        """Find the tables and columns a query refers to in a single pass over its tokens"""
+        table_hits: Set[int] = set()
+        column_hits: Set[Tuple[int, int]] = set()
+
+        previous = None
+        for token in _TOKEN_PATTERN.findall(query.lower()):
+            candidates = [token, _singular(token)]
+            if previous is not None:
+                # Multi-word names such as "full name" or "join date"
+                candidates.append(f"{previous}_{token}")
+            for term in candidates:
+                table_hits.update(self.table_terms.get(term, ()))
+                column_hits.update(self.column_terms.get(term, ()))
+            previous = token
+
+        table_hits.update(table_index for table_index, _ in column_hits)
+
+        if table_hits:
+            relevant_tables = [self.tables[i] for i in sorted(table_hits)]
+        else:
+            # If no specific tables found, include all
+            relevant_tables = self.tables
+
+        relevant_columns = [self.tables[t]["columns"][c] for t, c in sorted(column_hits)]
+
         return {
             "relevant_tables": relevant_tables,
             "relevant_columns": relevant_columns,
             "mapped_query": query  # In a real implementation, this would be the mapped query
-        }
\ No newline at end of file
+        }
+
+
+def _singular(word: str) -> str:
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def _name_terms(name: str) -> Set[str]:
+    """All query terms that should resolve to a table or column name"""
+    name = name.lower()
+    tokens = _TOKEN_PATTERN.findall(name.replace("_", " "))
+    terms = {name, _singular(name)}
+    terms.update(tokens)
+    terms.update(_singular(token) for token in tokens)
+    for key, variations in TERM_MAPPING.items():
+        if any(variation in name for variation in variations):
+            terms.add(key)
+            terms.update(variations)
+    return terms
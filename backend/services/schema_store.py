@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import json
+import threading
+from typing import Any, Dict, NamedTuple, Optional
+from backend.services.database import (get_active_connection, resolve_connection, set_active_connection,
+                                       shareable_connection)
+from backend.services.schema_discovery import SchemaDiscovery
+from backend.services.state import get_state
+
+# Served until a database has been connected
+DEMO_SCHEMA = {
+    "database_type": "demo",
+    "tables": [
+        {
+            "name": "employees",
+            "purpose": "Employee information",
+            "columns": [
+                {"name": "id", "type": "integer", "primary_key": True},
+                {"name": "name", "type": "string"},
+                {"name": "department_id", "type": "integer", "foreign_key": "departments.id"},
+                {"name": "salary", "type": "decimal"}
+            ]
+        },
+        {
+            "name": "departments",
+            "purpose": "Department information",
+            "columns": [
+                {"name": "id", "type": "integer", "primary_key": True},
+                {"name": "name", "type": "string"},
+                {"name": "manager_id", "type": "integer"}
+            ]
+        }
+    ],
+    "relationships": [
+        {
+            "name": "employee_department",
+            "from": "employees.department_id",
+            "to": "departments.id",
+            "type": "many_to_one"
+        }
+    ],
+    "version": "demo"
+}
+
+# Column statistics served to clients: counts and fractions only, since min/max and
+# top values are rows of table data
+_PUBLIC_COLUMN_STATISTICS = ("null_fraction", "distinct_count")
+
+
+class SchemaSnapshot(NamedTuple):
+    """A published schema with its served JSON body and ETag, computed once per version"""
+    schema: Dict[str, Any]
+    version: str
+    body: bytes
+    etag: str
+
+
+def public_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """The schema as served by the API, with column statistics reduced to counts and fractions"""
+    if not schema.get("statistics"):
+        return schema
+    statistics = {}
+    for name, table in schema["statistics"].items():
+        statistics[name] = {key: value for key, value in table.items() if key != "columns"}
+        if "columns" in table:
+            statistics[name]["columns"] = {
+                column: {key: stats[key] for key in _PUBLIC_COLUMN_STATISTICS if key in stats}
+                for column, stats in table["columns"].items()
+            }
+    return dict(schema, statistics=statistics)
+
+
+def _snapshot(schema: Dict[str, Any]) -> SchemaSnapshot:
+    body = json.dumps(public_schema(schema), separators=(",", ":")).encode("utf-8")
+    # Strong validator: derived from the exact bytes that are served
+    etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+    version = str(schema.get("version") or etag.strip('"'))
+    return SchemaSnapshot(schema, version, body, etag)
+
+
+class SchemaStore:
+    """
+    Schema snapshots shared by the ingestion, query and schema routes.
+    Discovery publishes into the store; a snapshot (and its serialized body) is only
+    replaced when discovery reports a new schema version or re-profiled statistics.
+    Activating a database bumps the shared "schema" generation, which makes every
+    other worker adopt it and re-discover before serving its next request.
+    """
+
+    def __init__(self, discovery: Optional[SchemaDiscovery] = None, default_schema: Dict[str, Any] = DEMO_SCHEMA,
+                 state=None):
+        self.discovery = discovery or SchemaDiscovery()
+        self.default = _snapshot(default_schema)
+        self.state = state or get_state()
+        self._snapshots: Dict[str, SchemaSnapshot] = {}
+        self._lock = threading.Lock()
+        # Never a real generation: the first request adopts whatever database is already active,
+        # including one activated before this worker started
+        self._generation = -1
+
+    def discover(self, connection_string: str) -> SchemaSnapshot:
+        """Run (incremental) discovery and publish the result"""
+        return self.publish(connection_string, self.discovery.analyze_database(connection_string))
+
+    def publish(self, connection_string: str, schema: Dict[str, Any]) -> SchemaSnapshot:
+        """Store schema for a connection unless the same version and statistics are already published"""
+        with self._lock:
+            current = self._snapshots.get(connection_string)
+            if (current is not None and schema.get("version") and current.version == schema["version"]
+                    and current.schema.get("statistics") == schema.get("statistics")):
+                return current
+        snapshot = _snapshot(schema)
+        with self._lock:
+            self._snapshots[connection_string] = snapshot
+        return snapshot
+
+    def activate(self, connection_string: str) -> None:
+        """Make a discovered database the one queries run against, in every worker"""
+        set_active_connection(connection_string)
+        # Passwords stay out of the shared state file
+        self.state.set("active_connection", shareable_connection(connection_string))
+        self._generation = self.state.bump("schema")
+
+    def get(self, connection_string: Optional[str]) -> Optional[SchemaSnapshot]:
+        """Published snapshot for a connection (the demo schema for None), without touching the database"""
+        if connection_string is None:
+            return self.default
+        return self._snapshots.get(connection_string)
+
+    async def current(self) -> SchemaSnapshot:
+        """Snapshot of the active database, discovering it off the event loop if it was never published"""
+        loop = asyncio.get_running_loop()
+        generation = self.state.generation("schema")
+        if generation != self._generation:
+            await loop.run_in_executor(None, self._sync, generation)
+        connection_string = get_active_connection()
+        snapshot = self.get(connection_string)
+        if snapshot is None:
+            snapshot = await loop.run_in_executor(None, self.discover, connection_string)
+        return snapshot
+
+    def _sync(self, generation: int) -> None:
+        """Adopt the database another worker activated, re-discovering its (possibly changed) schema"""
+        shared = self.state.get("active_connection")
+        if shared:
+            connection_string = resolve_connection(shared)
+            set_active_connection(connection_string)
+            self.discover(connection_string)
+        self._generation = generation
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_schema_store() -> SchemaStore:
+    """Return the process-wide schema store"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SchemaStore()
+    return _store
@@ -0,0 +1,217 @@
+import base64
+import datetime
+import decimal
+import hashlib
+import json
+import re
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+import sqlglot
+from sqlglot import exp
+from sqlglot.dialects.dialect import Dialect
+from sqlglot.errors import SqlglotError
+from backend.config import Config
+from backend.services.sql_fingerprint import parameterize, statement_cache
+
+_ORDER_OR_LIMIT = re.compile(r"\b(ORDER\s+BY|LIMIT|OFFSET|FETCH)\b", re.IGNORECASE)
+# A row limit of the statement itself, i.e. one not followed by a closing subquery
+_OUTER_LIMIT = re.compile(r"\b(LIMIT|OFFSET|FETCH)\b[^()]*$", re.IGNORECASE)
+
+# SQLAlchemy dialect names that sqlglot spells differently
+_SQLGLOT_DIALECTS = {"postgresql": "postgres", "mariadb": "mysql", "mssql": "tsql"}
+
+# Nodes that write, lock or change session state, wherever they appear in a query
+# (e.g. a data-modifying CTE or SELECT ... INTO)
+_WRITE_NODES = (
+    exp.Insert, exp.Update, exp.Delete, exp.Merge, exp.Create, exp.Drop, exp.Alter, exp.TruncateTable,
+    exp.Into, exp.Lock, exp.Command, exp.Set, exp.Pragma, exp.Transaction, exp.Commit, exp.Rollback,
+    exp.Copy, exp.LoadData, exp.Grant, exp.Use, exp.Kill
+)
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor is malformed or belongs to a different query"""
+
+
+class UnsafeSQL(ValueError):
+    """Raised when generated SQL is not a single read-only query"""
+
+
+def validate_select(sql: str, dialect: Optional[str] = None) -> None:
+    """
+    Parse sql and check that it is exactly one query (SELECT, set operation or CTE query)
+    that contains no writes or locks anywhere in its tree. dialect is a SQLAlchemy
+    dialect name; unknown names parse as generic SQL.
+    """
+    name = (dialect or "").lower()
+    name = _SQLGLOT_DIALECTS.get(name, name)
+    try:
+        statements = [statement for statement in sqlglot.parse(sql, read=name if Dialect.get(name) else None)
+                      if statement is not None]
+    except SqlglotError as e:
+        raise UnsafeSQL(f"SQL could not be parsed: {e}") from None
+    if len(statements) != 1:
+        raise UnsafeSQL(f"expected a single statement, got {len(statements)}")
+    if not isinstance(statements[0], exp.Query):
+        raise UnsafeSQL("statement is not a SELECT query")
+    for node in statements[0].walk():
+        if isinstance(node, _WRITE_NODES):
+            raise UnsafeSQL(f"query contains {node.key.upper()}")
+
+
+def to_json_value(value: Any) -> Any:
+    """Convert database values that json cannot encode natively"""
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    return value
+
+
+def _sql_tag(sql: str) -> str:
+    # Statements with the same fingerprint and values share cursors, whatever their spelling
+    parameterized = parameterize(_strip_terminator(sql))
+    return hashlib.sha1(repr((parameterized.fingerprint, parameterized.params)).encode("utf-8")).hexdigest()[:12]
+
+
+def encode_cursor(sql: str, last_key: Any) -> str:
+    payload = json.dumps({"q": _sql_tag(sql), "k": to_json_value(last_key)}).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(sql: str, cursor: str) -> Any:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        tag, last_key = payload["q"], payload["k"]
+    except Exception:
+        raise InvalidCursor("Malformed pagination cursor")
+    if tag != _sql_tag(sql):
+        raise InvalidCursor("Cursor does not belong to this query")
+    return last_key
+
+
+@contextmanager
+def read_only(connection):
+    """
+    Run the statements issued inside the block in a read-only transaction, so generated
+    SQL cannot change data whatever it says. SQLite connections are switched to
+    query_only for the duration (they are pooled and shared with writers); other
+    databases get the standard SET TRANSACTION READ ONLY, and one that does not
+    support it refuses to run the query rather than running it writable.
+    """
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("PRAGMA query_only = ON")
+        try:
+            with connection.begin():
+                yield connection
+        finally:
+            try:
+                connection.exec_driver_sql("PRAGMA query_only = OFF")
+            except Exception:
+                # Never hand a connection stuck in query_only back to the pool
+                connection.invalidate()
+                raise
+    else:
+        with connection.begin():
+            connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+            yield connection
+
+
+class SQLExecutor:
+    """
+    Runs generated SQL through a pooled engine, always inside a read-only transaction.
+    Pages use keyset (seek) pagination on a unique key column instead of OFFSET,
+    and full exports stream rows from a server-side cursor. Literals are bound as
+    parameters, so statements differing only in values reuse one prepared statement.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def execute_page(self, sql: str, key_column: Optional[str] = None,
+                     page_size: int = Config.QUERY_PAGE_SIZE, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Return one page of results as {"columns", "rows", "next_cursor"}.
+        Keyset pagination is used when key_column is given and the statement has no
+        ordering or limit of its own; otherwise only the first page_size rows are returned,
+        in the statement's own order (the page limit goes on the statement itself, never
+        on a wrapper that could reorder it).
+        """
+        sql = _strip_terminator(sql)
+        validate_select(sql, self.engine.dialect.name)
+        page_size = max(1, min(page_size, Config.QUERY_MAX_PAGE_SIZE))
+        parameterized = parameterize(sql)
+        params = dict(parameterized.params, limit=page_size + 1)
+
+        keyset = key_column is not None and not _ORDER_OR_LIMIT.search(sql)
+        if keyset:
+            key = self.engine.dialect.identifier_preparer.quote(key_column)
+            where = ""
+            if cursor:
+                params["after"] = decode_cursor(sql, cursor)
+                where = f" WHERE page.{key} > :after"
+            statement = f"SELECT * FROM ({parameterized.sql}) AS page{where} ORDER BY page.{key} LIMIT :limit"
+        elif cursor:
+            raise InvalidCursor("This query does not support pagination")
+        elif _OUTER_LIMIT.search(sql):
+            # Already bounded by its own LIMIT; read the first page_size + 1 rows of it as it is
+            statement = parameterized.sql
+            del params["limit"]
+        else:
+            statement = f"{parameterized.sql} LIMIT :limit"
+
+        with self.engine.connect() as connection, read_only(connection):
+            # Without the page limit only the rows read are fetched, not the whole result
+            result = connection.execution_options(stream_results="limit" not in params).execute(
+                statement_cache.statement(statement), params
+            )
+            columns = list(result.keys())
+            rows = [dict(zip(columns, map(to_json_value, row))) for row in result.fetchmany(page_size + 1)]
+
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        next_cursor = None
+        if has_more and keyset:
+            next_cursor = encode_cursor(sql, rows[-1][key_column])
+
+        return {
+            "columns": columns,
+            "rows": rows,
+            "next_cursor": next_cursor,
+            "truncated": has_more and not keyset
+        }
+
+    def stream_rows(self, sql: str, batch_size: int = Config.QUERY_STREAM_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+        """Yield every row of the statement using a server-side cursor, batch_size rows at a time"""
+        sql = _strip_terminator(sql)
+        validate_select(sql, self.engine.dialect.name)
+        parameterized = parameterize(sql)
+        with self.engine.connect() as connection, read_only(connection):
+            result = connection.execution_options(stream_results=True).execute(
+                statement_cache.statement(parameterized.sql), parameterized.bind_params
+            )
+            columns = list(result.keys())
+            while True:
+                batch = result.fetchmany(batch_size)
+                if not batch:
+                    break
+                for row in batch:
+                    yield dict(zip(columns, map(to_json_value, row)))
+
+    def iter_ndjson(self, sql: str, batch_size: int = Config.QUERY_STREAM_BATCH_SIZE) -> Iterator[bytes]:
+        """Newline-delimited JSON encoding of stream_rows, one encoded batch per yield"""
+        lines: List[str] = []
+        for row in self.stream_rows(sql, batch_size):
+            lines.append(json.dumps(row, default=str))
+            if len(lines) >= batch_size:
+                yield ("\n".join(lines) + "\n").encode("utf-8")
+                lines = []
+        if lines:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _strip_terminator(sql: str) -> str:
+    return sql.strip().rstrip(";").strip()
@@ -0,0 +1,171 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, NamedTuple, Tuple
+from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
+from backend.config import Config
+
+_TOKEN = re.compile(
+    r"(?P<string>'(?:[^']|'')*')"
+    r"|(?P<quoted>\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\])"
+    r"|(?P<comment>--[^\n]*|/\*.*?\*/)"
+    r"|(?P<number>(?<![\w.])\d+(?:\.\d+)?(?:[eE][-+]?\d+)?(?![\w.]))"
+    r"|(?P<word>[A-Za-z_][A-Za-z0-9_$]*)"
+    r"|(?P<space>\s+)"
+    r"|(?P<other>::|.)",
+    re.DOTALL
+)
+
+# A colon that text() would read as the start of a bind parameter
+_BIND_LIKE = re.compile(r"(?<![:\w\\]):(?=\w)")
+
+# Numbers in these places are part of the statement's shape, not values
+_TYPE_WORDS = {"varchar", "char", "character", "varying", "nvarchar", "decimal", "numeric", "float", "timestamp", "time"}
+_POSITIONAL_CLAUSES = {"order", "group"}
+_CLAUSE_WORDS = {"select", "from", "where", "group", "order", "having", "limit", "offset", "union", "join", "on"}
+
+
+class ParameterizedSQL(NamedTuple):
+    """A statement with its literals lifted into bind parameters (:p0, :p1, ...)"""
+    sql: str
+    params: Tuple[Tuple[str, Any], ...]
+    fingerprint: str
+
+    @property
+    def bind_params(self) -> Dict[str, Any]:
+        return dict(self.params)
+
+
+@lru_cache(maxsize=Config.SQL_FINGERPRINT_CACHE_SIZE)
+def parameterize(sql: str) -> ParameterizedSQL:
+    """
+    Lift string and numeric literals out of a generated statement so that statements
+    differing only in their values share one fingerprint, one compiled form and one
+    prepared statement. Positional ORDER BY / GROUP BY references and type arguments
+    such as VARCHAR(20) stay inline. Repeated literals share one parameter, so an
+    expression repeated in GROUP BY or ORDER BY (date_trunc('month', ...), a CASE)
+    stays identical to the one in the select list.
+    Quoted text containing a backslash, or a quote left unterminated, is read differently
+    by different databases (MySQL escapes with backslashes, standard SQL does not), so
+    such statements are returned unchanged rather than split at the wrong quote.
+    """
+    parts = []
+    shape = []
+    params = []
+    names: Dict[str, str] = {}
+    clause = None
+    previous = ""
+    depth = clause_depth = type_depth = 0
+    words = []
+
+    sql = sql.strip().rstrip(";").strip()
+    for token in _TOKEN.finditer(sql):
+        kind, value = token.lastgroup, token.group()
+        if (kind in ("string", "quoted") and "\\" in value) or (kind == "other" and value in "'\"`"):
+            return _unparameterized(sql)
+        if kind == "space":
+            parts.append(" ")
+            continue
+        if kind == "comment":
+            continue
+
+        if kind == "word":
+            lowered = value.lower()
+            if lowered in _CLAUSE_WORDS:
+                clause, clause_depth = lowered, depth
+            parts.append(value)
+            shape.append(lowered)
+        elif kind == "other":
+            if value == "(":
+                depth += 1
+            elif value == ")":
+                depth -= 1
+            if value == "(" and words and words[-1] in _TYPE_WORDS and previous == words[-1]:
+                type_depth += 1
+            elif value == ")" and type_depth:
+                type_depth -= 1
+            elif value == "::" and parts and parts[-1].startswith(":p"):
+                # ":p0::date" would not be read as a bind parameter
+                parts.append(" ")
+            parts.append(value)
+            shape.append(value)
+        elif kind == "number" and (type_depth or (clause in _POSITIONAL_CLAUSES and previous in ("by", ",")
+                                                  and depth == clause_depth)):
+            # "ORDER BY 2, 1" names columns; numbers inside "ORDER BY substr(name, 1, 3)" are values
+            parts.append(value)
+            shape.append(value)
+        elif kind in ("string", "number"):
+            name = names.get(value)
+            if name is None:
+                name = names[value] = f"p{len(params)}"
+                if kind == "string":
+                    params.append((name, value[1:-1].replace("''", "'")))
+                else:
+                    params.append((name, float(value) if any(c in value for c in ".eE") else int(value)))
+            parts.append(":" + name)
+            # Which parameter a literal uses is part of the shape: "a = 1 AND b = 1" binds one value, not two
+            shape.append("?" + name[1:])
+        else:
+            parts.append(value)
+            shape.append(value)
+
+        previous = shape[-1]
+        if kind == "word":
+            words.append(value.lower())
+
+    template = re.sub(r" {2,}", " ", "".join(parts)).strip()
+    fingerprint = hashlib.sha1(" ".join(shape).encode("utf-8")).hexdigest()[:16]
+    return ParameterizedSQL(template, tuple(params), fingerprint)
+
+
+def _unparameterized(sql: str) -> ParameterizedSQL:
+    """sql with its literals left inline; the fingerprint covers the values as well"""
+    fingerprint = hashlib.sha1(sql.encode("utf-8")).hexdigest()[:16]
+    # Escaped so that text() does not take ":name" inside a literal for a bind parameter
+    return ParameterizedSQL(_BIND_LIKE.sub(r"\\:", sql), (), fingerprint)
+
+
+class StatementCache:
+    """
+    Compiled text() constructs shared by every statement with the same fingerprint.
+    Preparing statements is left to the driver, which keys its own per-connection
+    cache by the SQL text that parameterization keeps stable.
+    """
+
+    def __init__(self, max_size: int = Config.PREPARED_STATEMENT_CACHE_SIZE):
+        self.max_size = max_size
+        self._statements: "OrderedDict[str, TextClause]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def statement(self, sql: str) -> TextClause:
+        """text() construct for a parameterized statement, parsed once"""
+        with self._lock:
+            clause = self._statements.get(sql)
+            if clause is not None:
+                self._statements.move_to_end(sql)
+                self.hits += 1
+                return clause
+            self.misses += 1
+        clause = text(sql)
+        with self._lock:
+            self._statements[sql] = clause
+            while len(self._statements) > self.max_size:
+                self._statements.popitem(last=False)
+        return clause
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._statements),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+statement_cache = StatementCache()
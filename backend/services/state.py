@@ -0,0 +1,280 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+from backend.config import Config
+
+
+class InProcessState:
+    """
+    State private to one worker process: caches are plain TTLCaches and jobs live
+    in the registry's own memory. The default, and all a single worker needs.
+    """
+
+    shared = False
+
+    def __init__(self):
+        self._values: Dict[str, Any] = {}
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        # JobRegistry keeps its jobs in memory when there is no shared job store
+        self.jobs = None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._values.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        self._values[key] = value
+
+    def generation(self, name: str) -> int:
+        return self._generations.get(name, 0)
+
+    def bump(self, name: str) -> int:
+        """Advance a generation counter (e.g. "schema") so that every reader re-syncs"""
+        with self._lock:
+            self._generations[name] = self._generations.get(name, 0) + 1
+            return self._generations[name]
+
+    def cache(self, namespace: str, max_size: int, ttl_seconds: float):
+        from backend.services.cache import TTLCache
+        return TTLCache(max_size, ttl_seconds)
+
+
+class SQLiteState:
+    """
+    State shared by every worker on one host through a SQLite database in WAL mode:
+    key/values, generation counters for cross-process invalidation, TTL caches and
+    ingestion job records. Needs no service beyond the local filesystem.
+    """
+
+    shared = True
+
+    def __init__(self, path: str = Config.STATE_DB_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._connection().executescript(
+            "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB);"
+            "CREATE TABLE IF NOT EXISTS generations (name TEXT PRIMARY KEY, value INTEGER NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL,"
+            " created_at REAL NOT NULL, expires_at REAL NOT NULL, PRIMARY KEY (namespace, key));"
+            "CREATE INDEX IF NOT EXISTS idx_cache_age ON cache (namespace, created_at);"
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY, record BLOB NOT NULL, version INTEGER NOT NULL,"
+            " status TEXT NOT NULL, created_at REAL NOT NULL, finished_at REAL);"
+            "CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs (created_at);"
+        )
+        self.jobs = SQLiteJobStore(self)
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; autocommit, with explicit transactions where needed"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=Config.STATE_BUSY_TIMEOUT_SECONDS, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str, default: Any = None) -> Any:
+        row = self._connection().execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return pickle.loads(row[0]) if row else default
+
+    def set(self, key: str, value: Any) -> None:
+        self._connection().execute(
+            "INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)", (key, pickle.dumps(value))
+        )
+
+    def generation(self, name: str) -> int:
+        row = self._connection().execute("SELECT value FROM generations WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, name: str) -> int:
+        """Advance a generation counter (e.g. "schema") so that every worker re-syncs"""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "INSERT INTO generations (name, value) VALUES (?, 1) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,)
+            )
+            value = connection.execute("SELECT value FROM generations WHERE name = ?", (name,)).fetchone()[0]
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return value
+
+    def cache(self, namespace: str, max_size: int, ttl_seconds: float) -> "SharedTTLCache":
+        return SharedTTLCache(self, namespace, max_size, ttl_seconds)
+
+
+def _cache_key(key: Hashable) -> str:
+    # repr of the tuples of str/int/None used as cache keys is the same in every process
+    return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+
+
+class SharedTTLCache:
+    """
+    TTLCache counterpart stored in SQLiteState, so every worker sees every entry.
+    Eviction is oldest-inserted first: reads never write, which keeps hits cheap
+    when several processes share the file. Hit/miss counters are per process.
+    """
+
+    PRUNE_EVERY = 32
+
+    def __init__(self, state: SQLiteState, namespace: str, max_size: int, ttl_seconds: float):
+        self.state = state
+        self.namespace = namespace
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._sets = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss or expired entry"""
+        row = self.state._connection().execute(
+            "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?", (self.namespace, _cache_key(key))
+        ).fetchone()
+        with self._lock:
+            if row is None or row[1] <= time.time():
+                self.misses += 1
+                if row is not None:
+                    self.expirations += 1
+                return None
+            self.hits += 1
+        return pickle.loads(row[0])
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store value under key; expired and excess entries are pruned every few writes"""
+        if self.max_size <= 0:
+            return
+        now = time.time()
+        connection = self.state._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, created_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+            (self.namespace, _cache_key(key), pickle.dumps(value), now, now + self.ttl_seconds)
+        )
+        with self._lock:
+            self._sets += 1
+            prune = self._sets % self.PRUNE_EVERY == 0
+        if prune:
+            self._prune(connection, now)
+
+    def _prune(self, connection: sqlite3.Connection, now: float) -> None:
+        connection.execute("DELETE FROM cache WHERE namespace = ? AND expires_at <= ?", (self.namespace, now))
+        evicted = connection.execute(
+            "DELETE FROM cache WHERE namespace = ? AND key IN ("
+            " SELECT key FROM cache WHERE namespace = ? ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.namespace, self.max_size)
+        ).rowcount
+        with self._lock:
+            self.evictions += evicted
+
+    def clear(self) -> None:
+        """Drop every entry, for all workers"""
+        self.state._connection().execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+        with self._lock:
+            self.invalidations += 1
+
+    def __len__(self) -> int:
+        return self.state._connection().execute(
+            "SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters for monitoring"""
+        size = len(self)
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": size,
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "shared": True
+            }
+
+
+class SQLiteJobStore:
+    """Job records written through by JobRegistry, readable from any worker"""
+
+    def __init__(self, state: SQLiteState):
+        self.state = state
+
+    def put(self, job: Dict[str, Any], version: int, finished: bool) -> None:
+        connection = self.state._connection()
+        row = connection.execute("SELECT created_at, finished_at FROM jobs WHERE job_id = ?", (job["job_id"],)).fetchone()
+        created_at = row[0] if row else time.time()
+        finished_at = (row[1] if row and row[1] else time.time()) if finished else None
+        connection.execute(
+            "INSERT OR REPLACE INTO jobs (job_id, record, version, status, created_at, finished_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (job["job_id"], pickle.dumps(job), version, job["status"], created_at, finished_at)
+        )
+
+    def get(self, job_id: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        row = self.state._connection().execute(
+            "SELECT record, version FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        return (pickle.loads(row[0]), row[1]) if row else (None, -1)
+
+    def version(self, job_id: str) -> int:
+        row = self.state._connection().execute("SELECT version FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row[0] if row else -1
+
+    def list(self, status: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        """Newest-first job records"""
+        query = "SELECT record FROM jobs"
+        params: List[Any] = []
+        if status is not None:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        return [pickle.loads(row[0]) for row in self.state._connection().execute(query, params)]
+
+    def evict(self, max_finished: int, finished_ttl: float) -> None:
+        """Drop finished jobs beyond the newest max_finished or older than finished_ttl"""
+        connection = self.state._connection()
+        connection.execute(
+            "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (time.time() - finished_ttl,)
+        )
+        connection.execute(
+            "DELETE FROM jobs WHERE job_id IN ("
+            " SELECT job_id FROM jobs WHERE finished_at IS NOT NULL ORDER BY finished_at DESC LIMIT -1 OFFSET ?)",
+            (max_finished,)
+        )
+
+    def __len__(self) -> int:
+        return self.state._connection().execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+
+_state = None
+_state_lock = threading.Lock()
+
+
+def get_state():
+    """Process-wide state backend selected by Config.STATE_BACKEND ("memory" or "sqlite")"""
+    global _state
+    if _state is None:
+        with _state_lock:
+            if _state is None:
+                _state = SQLiteState() if Config.STATE_BACKEND == "sqlite" else InProcessState()
+    return _state
@@ -0,0 +1,267 @@
+import csv
+import io
+import itertools
+import os
+import re
+import time
+import uuid
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from sqlalchemy import BigInteger, Boolean, Column, Date, DateTime, Float, MetaData, Table, Text, inspect, text
+from sqlalchemy.engine import make_url
+from backend.config import Config
+from backend.services.database import get_engine
+
+_IDENTIFIER_PATTERN = re.compile(r"[^0-9a-z]+")
+_BOOLEAN_PATTERN = re.compile(r"true|false|yes|no|t|f|y|n", re.IGNORECASE)
+_INTEGER_PATTERN = re.compile(r"[+-]?(0|[1-9]\d{0,17})")
+_FLOAT_PATTERN = re.compile(r"[+-]?((0|[1-9]\d*)(\.\d*)?|\.\d+)([eE][+-]?\d+)?")
+_DATE_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}")
+_DATETIME_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2}(\.\d{1,6})?)?)?")
+_BOOLEANS = {"true": True, "yes": True, "t": True, "y": True, "false": False, "no": False, "f": False, "n": False}
+_MAX_IDENTIFIER_LENGTH = 63
+# BIGINT range; Python ints are unbounded and drivers overflow outside it
+_MIN_INTEGER, _MAX_INTEGER = -2 ** 63, 2 ** 63 - 1
+
+
+def _parse_boolean(value: str) -> bool:
+    try:
+        return _BOOLEANS[value.lower()]
+    except KeyError:
+        raise ValueError(value) from None
+
+
+def _parse_integer(value: str) -> int:
+    number = int(value)
+    # Up to 18 digits always fits, which spares most values the range check
+    if len(value) > 18 and not _MIN_INTEGER <= number <= _MAX_INTEGER:
+        raise ValueError(value)
+    return number
+
+
+# Candidate column types, narrowest first, as (SQL type, sample pattern, parser).
+# A column gets the first type whose pattern and parser accept every sampled value;
+# the patterns keep integers with leading zeros (ids, postcodes) as text. While
+# loading only the parser runs.
+COLUMN_TYPES = {
+    "boolean": (Boolean, _BOOLEAN_PATTERN, _parse_boolean),
+    "integer": (BigInteger, _INTEGER_PATTERN, _parse_integer),
+    "float": (Float, _FLOAT_PATTERN, float),
+    "date": (Date, _DATE_PATTERN, date.fromisoformat),
+    "datetime": (DateTime, _DATETIME_PATTERN, datetime.fromisoformat),
+    "text": (Text, None, str)
+}
+
+
+class TableLoadError(ValueError):
+    """Raised when a CSV file cannot be loaded into the requested table"""
+
+
+def identifier(name: str, fallback: str) -> str:
+    """Lower-case SQL identifier made of letters, digits and underscores"""
+    cleaned = _IDENTIFIER_PATTERN.sub("_", name.strip().lower()).strip("_")[:_MAX_IDENTIFIER_LENGTH]
+    if not cleaned:
+        return fallback
+    return f"t_{cleaned}"[:_MAX_IDENTIFIER_LENGTH] if cleaned[0].isdigit() else cleaned
+
+
+def table_name_for(filename: str) -> str:
+    """Table name derived from an uploaded file's name ("HR Export 2024.csv" -> "hr_export_2024")"""
+    return identifier(os.path.splitext(os.path.basename(filename))[0], "uploaded_table")
+
+
+def column_names(header: List[str]) -> List[str]:
+    """Unique identifiers for a CSV header row"""
+    names, seen = [], set()
+    for index, label in enumerate(header):
+        name = base = identifier(label, f"column_{index + 1}")
+        suffix = 2
+        while name in seen:
+            name = f"{base[:_MAX_IDENTIFIER_LENGTH - len(str(suffix)) - 1]}_{suffix}"
+            suffix += 1
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def infer_column_types(rows: List[List[str]], n_columns: int) -> List[str]:
+    """Narrowest COLUMN_TYPES name that every non-empty sampled value of a column parses as"""
+    types = []
+    for index in range(n_columns):
+        candidates = [name for name in COLUMN_TYPES if name != "text"]
+        seen_value = False
+        for row in rows:
+            value = row[index].strip() if index < len(row) else ""
+            if not value:
+                continue
+            seen_value = True
+            candidates = [name for name in candidates if _parses(name, value)]
+            if not candidates:
+                break
+        # A column with no values in the sample is kept as text
+        types.append(candidates[0] if candidates and seen_value else "text")
+    return types
+
+
+def _parses(column_type: str, value: str) -> bool:
+    _, pattern, parse = COLUMN_TYPES[column_type]
+    if pattern.fullmatch(value) is None:
+        return False
+    try:
+        parse(value)
+        return True
+    except ValueError:
+        return False
+
+
+class CSVTableLoader:
+    """
+    Streams a CSV file into a new SQL table in bounded memory.
+    Column types are inferred from the first sample_rows rows; the file is then read
+    row by row and inserted with executemany in batches of batch_rows, committing every
+    transaction_rows rows. Rows go into a staging table that replaces the target in one
+    transaction at the end, so queries keep seeing the previous table until the load
+    has finished and a failed load leaves it untouched.
+    """
+
+    def __init__(self, sample_rows: int = Config.TABLE_LOAD_SAMPLE_ROWS,
+                 batch_rows: int = Config.TABLE_LOAD_BATCH_ROWS,
+                 transaction_rows: int = Config.TABLE_LOAD_TRANSACTION_ROWS):
+        self.sample_rows = sample_rows
+        self.batch_rows = batch_rows
+        self.transaction_rows = max(transaction_rows, batch_rows)
+
+    def load(self, file_path: str, connection_string: str, table_name: str, if_exists: str = "fail",
+             progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Load file_path into table_name and return load statistics.
+        if_exists is "replace" or "fail"; progress is called after every committed
+        transaction with the rows and bytes loaded so far and the rows/sec rate.
+        """
+        if if_exists not in ("replace", "fail"):
+            raise TableLoadError(f"if_exists must be 'replace' or 'fail', not {if_exists!r}")
+        _ensure_sqlite_directory(connection_string)
+        engine = get_engine(connection_string)
+        if if_exists == "fail" and inspect(engine).has_table(table_name):
+            raise TableLoadError(f"Table {table_name} already exists")
+
+        start = time.perf_counter()
+        size = os.path.getsize(file_path)
+        with open(file_path, "rb") as raw:
+            reader = csv.reader(io.TextIOWrapper(raw, encoding="utf-8-sig", errors="replace", newline=""),
+                                _sniff_dialect(raw))
+            header = next(reader, None)
+            if not header:
+                raise TableLoadError(f"{os.path.basename(file_path)} has no header row")
+            names = column_names(header)
+            sample = list(itertools.islice(reader, self.sample_rows))
+            types = infer_column_types(sample, len(names))
+
+            staging = Table(
+                f"{table_name[:_MAX_IDENTIFIER_LENGTH - 10]}__{uuid.uuid4().hex[:8]}", MetaData(),
+                *(Column(name, COLUMN_TYPES[column_type][0]) for name, column_type in zip(names, types))
+            )
+            stats = {"table": table_name, "columns": dict(zip(names, types)), "rows": 0,
+                     "rejected_values": {}, "malformed_rows": 0, "bytes": size}
+
+            def report():
+                elapsed = time.perf_counter() - start
+                stats["seconds"] = round(elapsed, 3)
+                stats["rows_per_second"] = round(stats["rows"] / elapsed, 1) if elapsed > 0 else 0.0
+                if progress is not None:
+                    progress(dict(stats, bytes_read=min(raw.tell(), size)))
+
+            with engine.connect() as connection:
+                staging.create(connection)
+                try:
+                    self._insert(connection, staging, itertools.chain(sample, reader), types, stats, report)
+                    with connection.begin():
+                        if inspect(connection).has_table(table_name):
+                            connection.execute(text(f"DROP TABLE {_quote(engine, table_name)}"))
+                        connection.execute(text(
+                            f"ALTER TABLE {_quote(engine, staging.name)} RENAME TO {_quote(engine, table_name)}"
+                        ))
+                except BaseException:
+                    staging.drop(connection, checkfirst=True)
+                    raise
+            report()
+        return stats
+
+    def _insert(self, connection, table: Table, rows: Iterable[List[str]], types: List[str],
+                stats: Dict[str, Any], report: Callable[[], None]) -> None:
+        """executemany in batches of batch_rows, one transaction (and progress report) per transaction_rows"""
+        dialect = connection.dialect
+        # Compiled once; rows are bound in the driver's paramstyle, skipping per-row statement processing
+        statement = table.insert().compile(dialect=dialect).string
+        names = [column.name for column in table.columns]
+        processors = [column.type.dialect_impl(dialect).bind_processor(dialect) for column in table.columns]
+        parameters = self._parameters(rows, names, types, processors, stats)
+        if not dialect.positional:
+            parameters = (dict(zip(names, values)) for values in parameters)
+        batches = iter(lambda: list(itertools.islice(parameters, self.batch_rows)), [])
+        batches_per_transaction = self.transaction_rows // self.batch_rows
+        while True:
+            with connection.begin():
+                inserted = 0
+                for batch in itertools.islice(batches, batches_per_transaction):
+                    connection.exec_driver_sql(statement, batch)
+                    inserted += len(batch)
+            if not inserted:
+                return
+            stats["rows"] += inserted
+            report()
+
+    @staticmethod
+    def _parameters(rows: Iterable[List[str]], names: List[str], types: List[str], processors: List[Any],
+                    stats: Dict[str, Any]) -> Iterator[tuple]:
+        """
+        Driver-ready values for each CSV row. Values that do not parse as their column's
+        type (after stripping whitespace), or fall outside its range, become NULL and are
+        counted per column.
+        """
+        parsers = []
+        for column_type, processor in zip(types, processors):
+            parse = COLUMN_TYPES[column_type][2]
+            parsers.append(parse if processor is None else (lambda value, parse=parse, processor=processor:
+                                                            processor(parse(value))))
+        n_columns = len(names)
+        rejected = stats["rejected_values"]
+        for row in rows:
+            if len(row) != n_columns:
+                if not any(row):
+                    continue
+                stats["malformed_rows"] += 1
+                row = (row + [""] * n_columns)[:n_columns]
+            try:
+                values = [parse(value) if value else None for parse, value in zip(parsers, row)]
+            except ValueError:
+                values = []
+                for name, parse, value in zip(names, parsers, row):
+                    value = value.strip()
+                    try:
+                        values.append(parse(value) if value else None)
+                    except ValueError:
+                        values.append(None)
+                        rejected[name] = rejected.get(name, 0) + 1
+            yield tuple(values)
+
+
+def _sniff_dialect(raw, sample_size: int = 64 * 1024):
+    """Delimiter and quoting of a CSV file from its first sample_size bytes; rewinds the file"""
+    sample = raw.read(sample_size).decode("utf-8", errors="ignore")
+    raw.seek(0)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;\t|")
+    except csv.Error:
+        return csv.excel
+
+
+def _quote(engine, name: str) -> str:
+    return engine.dialect.identifier_preparer.quote(name)
+
+
+def _ensure_sqlite_directory(connection_string: str) -> None:
+    url = make_url(connection_string)
+    if url.get_backend_name() == "sqlite" and url.database and url.database != ":memory:":
+        directory = os.path.dirname(os.path.abspath(url.database))
+        os.makedirs(directory, exist_ok=True)
@@ -0,0 +1,285 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from backend.config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are serialized within the process only
+    fcntl = None
+
+
+class VectorStore:
+    """
+    Append-only store of chunk embeddings.
+    Vectors are raw float32 rows in a single file that is memory-mapped for reads,
+    so reopening the store at startup does not load the matrix into the heap.
+    Chunk metadata lives in a SQLite sidecar table keyed by row id.
+    Writers hold a lock file, so worker processes sharing the directory can all ingest.
+    Rows are never rewritten: chunks of replaced or deleted documents are tombstoned
+    and skipped by retrieval. Each document's content hash is kept, so re-ingesting
+    an unchanged file can be detected before it is parsed.
+    """
+
+    def __init__(self, directory: str, dimension: Optional[int] = None):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.info_path = os.path.join(directory, "store.json")
+        self.db_path = os.path.join(directory, "chunks.sqlite3")
+        self.lock_path = os.path.join(directory, "store.lock")
+
+        self._lock = threading.Lock()
+        self._mmap = None
+        self._mmap_rows = 0
+        self._tombstones = np.zeros(0, dtype=np.int64)
+
+        # Other worker processes may be creating, migrating or appending to the same store
+        with self._writing():
+            self.dimension = dimension
+            stored = self._stored_dimension()
+            if stored is not None:
+                if dimension is not None and dimension != stored:
+                    raise ValueError(f"Vector store at {directory} has dimension {stored}, not {dimension}")
+                self.dimension = stored
+
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "id INTEGER PRIMARY KEY, file_path TEXT, chunk_index INTEGER, doc_type TEXT, text TEXT)"
+            )
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(chunks)")}
+            # Stores created before incremental re-ingestion lack these columns
+            if "chunk_hash" not in columns:
+                self._db.execute("ALTER TABLE chunks ADD COLUMN chunk_hash TEXT")
+            if "deleted" not in columns:
+                self._db.execute("ALTER TABLE chunks ADD COLUMN deleted INTEGER NOT NULL DEFAULT 0")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_chunks_file_path ON chunks (file_path)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_chunks_hash ON chunks (chunk_hash) WHERE deleted = 0")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_chunks_deleted ON chunks (id) WHERE deleted = 1")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS documents (file_path TEXT PRIMARY KEY, "
+                "content_hash TEXT NOT NULL, chunks INTEGER NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._db.commit()
+            self._recover()
+
+    def __len__(self) -> int:
+        if self.dimension is None or not os.path.exists(self.vectors_path):
+            return 0
+        return os.path.getsize(self.vectors_path) // self._row_bytes
+
+    @property
+    def _row_bytes(self) -> int:
+        return self.dimension * 4
+
+    def _stored_dimension(self) -> Optional[int]:
+        if not os.path.exists(self.info_path):
+            return None
+        with open(self.info_path, "r", encoding="utf-8") as file:
+            return json.load(file)["dimension"]
+
+    @contextmanager
+    def _writing(self):
+        """Exclusive write access, against other threads and other processes using the directory"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                yield
+
+    def append(self, vectors: np.ndarray, metadata: List[Dict[str, Any]]) -> List[int]:
+        """Append a batch of vectors with one metadata dict per row; returns the assigned row ids"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] != len(metadata):
+            raise ValueError("Expected one metadata entry per vector row")
+
+        with self._writing():
+            if self.dimension is None:
+                # Another process may have created the store since this one opened it
+                self.dimension = self._stored_dimension()
+            if self.dimension is None:
+                self.dimension = vectors.shape[1]
+                with open(self.info_path, "w", encoding="utf-8") as file:
+                    json.dump({"dimension": self.dimension}, file)
+            elif vectors.shape[1] != self.dimension:
+                raise ValueError(f"Expected {self.dimension}-dimensional vectors, got {vectors.shape[1]}")
+
+            # Row ids are contiguous, so the committed metadata count is the next id; vector
+            # rows past it (a torn row, or an append that died before its commit) are dropped
+            start = self._db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+            if os.path.exists(self.vectors_path) and os.path.getsize(self.vectors_path) != start * self._row_bytes:
+                with open(self.vectors_path, "r+b") as file:
+                    file.truncate(start * self._row_bytes)
+            ids = list(range(start, start + len(metadata)))
+            # Vectors first: rows without metadata are trimmed on the next open
+            with open(self.vectors_path, "ab") as file:
+                file.write(vectors.tobytes())
+            self._db.executemany(
+                "INSERT INTO chunks (id, file_path, chunk_index, doc_type, text, chunk_hash) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (row_id, meta.get("file_path"), meta.get("chunk_index"), meta.get("doc_type"), meta.get("text"),
+                     meta.get("chunk_hash"))
+                    for row_id, meta in zip(ids, metadata)
+                ]
+            )
+            self._db.commit()
+            return ids
+
+    def vectors(self) -> np.ndarray:
+        """Read-only memory map over all stored vectors, shape (rows, dimension)"""
+        rows = len(self)
+        if rows == 0:
+            return np.zeros((0, self.dimension or 0), dtype=np.float32)
+        if self._mmap is None or self._mmap_rows != rows:
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dimension))
+            self._mmap_rows = rows
+        return self._mmap
+
+    def get_chunks(self, ids: List[int]) -> List[Dict[str, Any]]:
+        """Metadata for the given live (not tombstoned) row ids, in the same order"""
+        if not ids:
+            return []
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT id, file_path, chunk_index, doc_type, text FROM chunks "
+                f"WHERE id IN ({placeholders}) AND deleted = 0",
+                [int(i) for i in ids]
+            ).fetchall()
+        by_id = {
+            row[0]: {"id": row[0], "file_path": row[1], "chunk_index": row[2], "doc_type": row[3], "text": row[4]}
+            for row in rows
+        }
+        return [by_id[int(i)] for i in ids if int(i) in by_id]
+
+    def texts(self, start: int, stop: int) -> List[str]:
+        """Chunk texts of rows [start, stop), in row order"""
+        with self._lock:
+            return [row[0] for row in self._db.execute(
+                "SELECT text FROM chunks WHERE id >= ? AND id < ? ORDER BY id", (start, stop)
+            )]
+
+    def tombstones(self) -> np.ndarray:
+        """Sorted ids of tombstoned rows, for retrieval to skip"""
+        with self._lock:
+            count = self._db.execute("SELECT COUNT(*) FROM chunks WHERE deleted = 1").fetchone()[0]
+            # Tombstones are only ever added, so the count tells whether the cached ids are current
+            if count != self._tombstones.size:
+                self._tombstones = np.fromiter(
+                    (row[0] for row in self._db.execute("SELECT id FROM chunks WHERE deleted = 1 ORDER BY id")),
+                    dtype=np.int64, count=count
+                )
+            return self._tombstones
+
+    def version(self) -> int:
+        """Changes whenever rows are appended or tombstoned"""
+        return len(self) + self.tombstones().size
+
+    def document_hashes(self, file_paths: Iterable[str]) -> Dict[str, str]:
+        """Content hash of each given document that has been indexed"""
+        hashes = {}
+        file_paths = list(file_paths)
+        with self._lock:
+            for start in range(0, len(file_paths), 500):
+                batch = file_paths[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                hashes.update(self._db.execute(
+                    f"SELECT file_path, content_hash FROM documents WHERE file_path IN ({placeholders})", batch
+                ).fetchall())
+        return hashes
+
+    def live_chunks(self, file_path: str) -> List[Tuple[int, Optional[str], int]]:
+        """(id, chunk_hash, chunk_index) of the document's current chunks"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT id, chunk_hash, chunk_index FROM chunks WHERE file_path = ? AND deleted = 0", (file_path,)
+            ).fetchall()
+
+    def find_chunks(self, chunk_hashes: Iterable[str]) -> Dict[str, int]:
+        """Id of a live row holding each of the given chunk hashes, from any document"""
+        found = {}
+        chunk_hashes = list(set(chunk_hashes))
+        with self._lock:
+            for start in range(0, len(chunk_hashes), 500):
+                batch = chunk_hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                found.update(self._db.execute(
+                    f"SELECT chunk_hash, MIN(id) FROM chunks WHERE chunk_hash IN ({placeholders}) AND deleted = 0 "
+                    f"GROUP BY chunk_hash", batch
+                ).fetchall())
+        return found
+
+    def replace_document(self, file_path: str, content_hash: str, chunks: List[Tuple[int, int]]) -> int:
+        """
+        Make chunks, a list of (id, chunk_index), the document's current version and
+        record its content hash; every other live chunk of the document is tombstoned.
+        Returns the number of tombstoned chunks.
+        """
+        keep = dict(chunks)
+        with self._writing():
+            live = [row[0] for row in self._db.execute(
+                "SELECT id FROM chunks WHERE file_path = ? AND deleted = 0", (file_path,)
+            )]
+            stale = [(row_id,) for row_id in live if row_id not in keep]
+            self._db.executemany("UPDATE chunks SET deleted = 1 WHERE id = ?", stale)
+            self._db.executemany(
+                "UPDATE chunks SET chunk_index = ? WHERE id = ? AND chunk_index IS NOT ?",
+                [(index, row_id, index) for row_id, index in keep.items()]
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO documents (file_path, content_hash, chunks, updated_at) VALUES (?, ?, ?, ?)",
+                (file_path, content_hash, len(keep), time.time())
+            )
+            self._db.commit()
+        return len(stale)
+
+    def remove_documents(self, file_paths: Iterable[str]) -> int:
+        """Tombstone every chunk of the given documents; returns the number of tombstoned chunks"""
+        removed = 0
+        with self._writing():
+            for file_path in file_paths:
+                removed += self._db.execute(
+                    "UPDATE chunks SET deleted = 1 WHERE file_path = ? AND deleted = 0", (file_path,)
+                ).rowcount
+                self._db.execute("DELETE FROM documents WHERE file_path = ?", (file_path,))
+            self._db.commit()
+        return removed
+
+    def indexed_documents(self) -> List[str]:
+        """File paths with live chunks or a recorded content hash"""
+        with self._lock:
+            return [row[0] for row in self._db.execute(
+                "SELECT file_path FROM documents UNION SELECT file_path FROM chunks WHERE deleted = 0"
+            )]
+
+    def _recover(self) -> None:
+        """Trim vector rows written by an append whose metadata commit never happened"""
+        # Caller holds the write lock, so another worker's append in progress is not mistaken for one
+        if self.dimension is None or not os.path.exists(self.vectors_path):
+            return
+        committed = self._db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        if len(self) > committed:
+            with open(self.vectors_path, "r+b") as file:
+                file.truncate(committed * self._row_bytes)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_vector_store() -> VectorStore:
+    """Return the process-wide vector store in Config.VECTOR_STORE_DIR"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = VectorStore(Config.VECTOR_STORE_DIR)
+    return _store
@@ -0,0 +1,201 @@
+"""
+In-process load and latency benchmark for the HTTP API.
+
+Drives the ASGI app directly (no server, no network) against a generated SQLite
+employee database and a synthetic document corpus, and reports throughput and
+p50/p95/p99 latency per endpoint. Results are written as JSON; pass a previous
+results file as --baseline to print the change against it.
+
+Run from the project root:
+    python -m benchmarks.bench_api --rows 1000000 --concurrency 1,8,32 --output results.json
+    python -m benchmarks.bench_api --quick
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.datasets import create_document_corpus, create_employee_database
+
+QUERIES = [
+    "Show me all employees",
+    "How many employees are in each department?",
+    "Top 10 employees by salary",
+    "Employees hired after 2020",
+    "List departments",
+    "Resumes mentioning Python",
+    "Engineers with Python skills",
+]
+
+
+def configure_environment(workdir: str, encoder: str) -> None:
+    """Point every on-disk store at the scratch directory; must run before backend is imported"""
+    os.environ["VECTOR_STORE_DIR"] = os.path.join(workdir, "vector_store")
+    os.environ["HISTORY_DB_PATH"] = os.path.join(workdir, "query_history.sqlite3")
+    os.environ["UPLOAD_SPOOL_DIR"] = os.path.join(workdir, "uploads")
+    os.environ["EMBEDDINGS_ENCODER"] = encoder
+
+
+def summarize(latencies: list, errors: int, wall: float) -> dict:
+    """Throughput and latency percentiles (milliseconds) for one scenario run"""
+    ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max())
+    }
+
+
+async def run_scenario(send, n_requests: int, concurrency: int) -> dict:
+    """Issue n_requests calls of send(i) with at most concurrency in flight"""
+    latencies = []
+    errors = 0
+    counter = iter(range(n_requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                response = await send(i)
+                ok = response.status_code < 400
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def build_scenarios(client, corpus: list, docs_per_upload: int) -> dict:
+    def upload_files(i):
+        files = []
+        for j in range(docs_per_upload):
+            path = corpus[(i * docs_per_upload + j) % len(corpus)]
+            with open(path, "rb") as file:
+                files.append(("files", (os.path.basename(path), file.read(), "application/octet-stream")))
+        return files
+
+    return {
+        # Repeats a small set of questions, so it mostly measures the cached path
+        "query_repeated": lambda i: client.post("/api/query", data={"query": QUERIES[i % len(QUERIES)]}),
+        # Every question is new text, so each one misses the result cache
+        "query_unique": lambda i: client.post("/api/query", data={"query": f"{QUERIES[i % len(QUERIES)]} #{i}"}),
+        "schema": lambda i: client.get("/api/schema"),
+        "history": lambda i: client.get("/api/query/history", params={"limit": 50, "offset": (i % 10) * 50}),
+        # Background processing runs inside the request here, so this is end-to-end ingestion latency
+        "ingest_documents": lambda i: client.post("/api/ingest/documents", files=upload_files(i)),
+    }
+
+
+async def run_benchmark(args, connection_string: str, corpus: list) -> dict:
+    import httpx
+    from backend.main import app
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    # ASGITransport does not send lifespan events, so run startup/shutdown around the client
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        response = await client.post("/api/ingest/database", data={"connection_string": connection_string})
+        response.raise_for_status()
+        results["connect_database_ms"] = (time.perf_counter() - start) * 1000
+
+        scenarios = build_scenarios(client, corpus, args.docs_per_upload)
+        selected = args.scenarios.split(",") if args.scenarios else list(scenarios)
+        for name in selected:
+            n_requests = args.uploads if name == "ingest_documents" else args.requests
+            results[name] = {}
+            for concurrency in [int(c) for c in args.concurrency.split(",")]:
+                summary = await run_scenario(scenarios[name], n_requests, concurrency)
+                results[name][str(concurrency)] = summary
+                print(f"{name:<18} c={concurrency:<4} {summary['throughput_rps']:9.1f} req/s  "
+                      f"p50={summary['p50_ms']:8.2f} ms  p95={summary['p95_ms']:8.2f} ms  "
+                      f"p99={summary['p99_ms']:8.2f} ms  errors={summary['errors']}")
+    return results
+
+
+def compare(results: dict, baseline: dict) -> None:
+    print("Change against baseline (p95 / throughput)")
+    print("=" * 40)
+    for name, runs in results["scenarios"].items():
+        if not isinstance(runs, dict):
+            continue
+        for concurrency, summary in runs.items():
+            before = baseline.get("scenarios", {}).get(name, {}).get(concurrency)
+            if not before:
+                continue
+            p95 = (summary["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0.0
+            rps = (summary["throughput_rps"] - before["throughput_rps"]) / before["throughput_rps"] * 100 \
+                if before["throughput_rps"] else 0.0
+            print(f"{name:<18} c={concurrency:<4} p95 {p95:+7.1f}%  throughput {rps:+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000, help="employees in the generated database")
+    parser.add_argument("--documents", type=int, default=60, help="files in the synthetic corpus")
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario and concurrency level")
+    parser.add_argument("--uploads", type=int, default=10, help="upload requests for the ingestion scenario")
+    parser.add_argument("--docs-per-upload", type=int, default=3)
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--scenarios", default=None, help="comma-separated subset of scenarios to run")
+    parser.add_argument("--encoder", default="hashing", help="embeddings encoder (hashing keeps runs offline)")
+    parser.add_argument("--workdir", default=None, help="scratch directory (defaults to a temporary one)")
+    parser.add_argument("--output", default="bench_api_results.json")
+    parser.add_argument("--baseline", default=None, help="previous results file to compare against")
+    parser.add_argument("--quick", action="store_true", help="small smoke run")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.rows, args.documents, args.requests, args.uploads, args.concurrency = 1000, 6, 20, 2, "1,4"
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="nlq_bench_")
+    configure_environment(workdir, args.encoder)
+
+    start = time.perf_counter()
+    connection_string = create_employee_database(os.path.join(workdir, "employees.sqlite3"), args.rows)
+    corpus = create_document_corpus(os.path.join(workdir, "corpus"), args.documents)
+    setup_seconds = time.perf_counter() - start
+
+    print(f"API benchmark: {args.rows} employees, {args.documents} documents, workdir {workdir}")
+    print("=" * 40)
+    scenarios = asyncio.run(run_benchmark(args, connection_string, corpus))
+
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parameters": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "setup_seconds": setup_seconds,
+        "scenarios": scenarios
+    }
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            compare(results, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Throughput and peak memory of DocumentProcessor.dynamic_chunking on multi-megabyte inputs.
+
+Run from the project root:
+    python -m benchmarks.bench_chunking --megabytes 4,16
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.datasets import generate_document_text
+from backend.services.document_processor import DocumentProcessor
+
+
+def write_document(path: str, megabytes: int) -> int:
+    target = megabytes * 1024 * 1024
+    written = 0
+    i = 0
+    with open(path, "w", encoding="utf-8") as file:
+        while written < target:
+            text = generate_document_text(i, paragraphs=50) + "\n\n"
+            file.write(text)
+            written += len(text)
+            i += 1
+    return written
+
+
+def measure(label: str, make_input, doc_type: str, size: int):
+    processor = DocumentProcessor(max_workers=1)
+
+    start = time.perf_counter()
+    chunks = sum(1 for _ in processor.dynamic_chunking(make_input(), doc_type))
+    elapsed = time.perf_counter() - start
+
+    # Peak memory is measured in a second pass; tracemalloc slows the loop down
+    tracemalloc.start()
+    for _ in processor.dynamic_chunking(make_input(), doc_type):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {size / elapsed / 1e6:8.1f} MB/s  chunks={chunks:<8} peak={peak / 1024:10.1f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--megabytes", default="4,16")
+    parser.add_argument("--doc-type", default="resume")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for megabytes in [int(m) for m in args.megabytes.split(",")]:
+            path = os.path.join(tmp, f"doc_{megabytes}.txt")
+            size = write_document(path, megabytes)
+            print(f"Chunking benchmark: {size / 1e6:.1f} MB, doc_type={args.doc_type}")
+            print("=" * 40)
+
+            with open(path, "r", encoding="utf-8") as file:
+                text = file.read()
+            measure("in-memory string", lambda: text, args.doc_type, size)
+            del text
+
+            handles = []
+
+            def open_file():
+                handle = open(path, "r", encoding="utf-8")
+                handles.append(handle)
+                return handle
+
+            measure("streamed from file", open_file, args.doc_type, size)
+            for handle in handles:
+                handle.close()
+            print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Throughput benchmark for DocumentProcessor.process_documents.
+
+Run from the project root:
+    python -m benchmarks.bench_document_processing --files 300
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.datasets import create_document_corpus
+from backend.services.document_processor import DocumentProcessor
+
+
+def run(processor: DocumentProcessor, paths: list) -> float:
+    start = time.perf_counter()
+    results = list(processor.iter_process_documents(paths))
+    elapsed = time.perf_counter() - start
+    errors = sum(1 for result in results if result["status"] == "error")
+    assert len(results) == len(paths)
+    print(f"{processor.max_workers:>3} worker(s): {elapsed:8.2f} s  {len(paths) / elapsed:8.1f} files/s  errors={errors}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--paragraphs", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = create_document_corpus(tmp, args.files, args.paragraphs)
+        print(f"Document processing benchmark: {len(paths)} files")
+        print("=" * 40)
+
+        run(DocumentProcessor(max_workers=1), paths)
+        processor = DocumentProcessor(max_workers=args.workers)
+        try:
+            # The first batch pays for spawning the workers
+            processor.process_documents(paths[:args.workers])
+            run(processor, paths)
+        finally:
+            processor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
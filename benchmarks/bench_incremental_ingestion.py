@@ -0,0 +1,75 @@
+"""
+Incremental re-ingestion: a full first ingest of a document folder, then nightly
+re-syncs of the same folder with nothing changed and with a fraction of the files
+edited and deleted. Unchanged files are skipped before parsing and only chunks
+whose text changed are embedded.
+
+Run from the project root:
+    python -m benchmarks.bench_incremental_ingestion --files 2000 --changed 0.05 --deleted 0.01
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.datasets import create_document_corpus
+from backend.services.document_processor import DocumentProcessor
+from backend.services.embeddings import EmbeddingPipeline, get_encoder
+from backend.services.vector_store import VectorStore
+
+
+def sync(processor: DocumentProcessor, pipeline: EmbeddingPipeline, paths: list) -> dict:
+    start = time.perf_counter()
+    indexed = pipeline.store.document_hashes(paths)
+    results = processor.iter_process_documents(paths, known_hashes=indexed)
+    stats = pipeline.ingest_documents(results, sync=True)
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def report(label: str, stats: dict) -> None:
+    print(f"{label:<22} {stats['seconds']:8.2f} s  new={stats['new']:<5} changed={stats['changed']:<4} "
+          f"skipped={stats['skipped']:<5} removed={stats['removed']:<4} embedded={stats['chunks_embedded']:<6} "
+          f"unchanged={stats['chunks_unchanged']:<5} tombstoned={stats['chunks_tombstoned']}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--paragraphs", type=int, default=30)
+    parser.add_argument("--changed", type=float, default=0.05, help="fraction of files edited between syncs")
+    parser.add_argument("--deleted", type=float, default=0.01, help="fraction of files deleted between syncs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    encoder = get_encoder()
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = create_document_corpus(os.path.join(tmp, "corpus"), args.files, args.paragraphs)
+        processor = DocumentProcessor(max_workers=args.workers)
+        pipeline = EmbeddingPipeline(processor, encoder=encoder, store=VectorStore(os.path.join(tmp, "store")))
+        print(f"Incremental ingestion: {len(paths)} files, encoder {type(encoder).__name__}")
+        print("=" * 40)
+        try:
+            report("full ingest", sync(processor, pipeline, paths))
+            report("re-sync, unchanged", sync(processor, pipeline, paths))
+
+            # Edit only .txt files so the edit lands in a single trailing chunk
+            editable = [path for path in paths if path.endswith(".txt")]
+            for path in rng.sample(editable, min(len(editable), int(len(paths) * args.changed))):
+                with open(path, "a", encoding="utf-8") as file:
+                    file.write("\nPromoted to team lead and mentored new hires on incident response.\n")
+            deleted = set(rng.sample(paths, int(len(paths) * args.deleted)))
+            remaining = [path for path in paths if path not in deleted]
+            report("re-sync, edited", sync(processor, pipeline, remaining))
+
+            fresh = EmbeddingPipeline(processor, encoder=encoder, store=VectorStore(os.path.join(tmp, "fresh")))
+            report("full re-ingest", sync(processor, fresh, remaining))
+        finally:
+            processor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Hit rate and latency of the intent-template fast path against the fake LLM path.
+
+Run from the project root:
+    python -m benchmarks.bench_intent_templates --repeat 2000 --llm-latency 0.2
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from backend.services.intent_templates import IntentTemplates
+from backend.services.llm import FakeLLM, LLMClient
+from backend.services.query_engine import QueryEngine, normalize_query, schema_version
+from backend.services.schema_discovery import SchemaDiscovery
+from benchmarks.datasets import create_employee_database
+
+WORKLOAD = [
+    "How many employees are in each department?",
+    "Top 10 employees by salary",
+    "5 highest paid employees",
+    "Employees hired in 2021",
+    "Staff hired between 2018 and 2019",
+    "Employees with salary above 150000",
+    "Employees in engineering",
+    "Average salary by department",
+    "How many employees",
+    "Show me all employees",
+    "Which employees know Kubernetes and Python",
+    "Employees who report to the CFO",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=2000, help="fast-path matches per question")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="fake LLM latency (seconds)")
+    args = parser.parse_args()
+
+    connection_string = create_employee_database(os.path.join(tempfile.gettempdir(), "bench_intents.sqlite3"), 1000)
+    schema = SchemaDiscovery().analyze_database(connection_string)
+    version = schema_version(schema)
+
+    templates = IntentTemplates()
+    templates.compile(schema, version)
+    print(f"Intent templates: {len(WORKLOAD)} questions x {args.repeat}")
+    print("=" * 40)
+    for question in WORKLOAD:
+        normalized = normalize_query(question)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            matched = templates.translate(normalized, schema, version)
+        latency_us = (time.perf_counter() - start) / args.repeat * 1e6
+        print(f"{question:<44} {latency_us:7.1f} us  {matched[0] if matched else 'miss -> LLM'}")
+
+    stats = templates.stats()
+    print(f"{'hit rate':<44} {stats['hit_rate']:7.1%}")
+
+    # Same workload end to end, with and without the fast path in front of the LLM
+    print()
+    print("End to end translation (fake LLM, semantic cache off)")
+    print("=" * 40)
+    for label, use_templates in (("llm only", False), ("templates + llm", True)):
+        engine = QueryEngine(llm=LLMClient(FakeLLM(latency=args.llm_latency), rate=1000, burst=1000))
+        engine.semantic_cache = None
+        if not use_templates:
+            engine.templates.translate = lambda *a: None
+        start = time.perf_counter()
+        for question in WORKLOAD:
+            engine.translate(question, schema)
+        print(f"{label:<44} {(time.perf_counter() - start) * 1000:8.1f} ms  "
+              f"llm calls={engine.llm.stats()['backend_calls']}")
+
+
+if __name__ == "__main__":
+    main()
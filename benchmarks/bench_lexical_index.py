@@ -0,0 +1,149 @@
+"""
+Memory and latency of the BM25 lexical index.
+
+Memory is measured with tracemalloc for the array-backed index and for a baseline
+inverted index of Python dicts and lists ({term: [[doc, tf], ...]}, built over a
+smaller prefix of the corpus because it is so large), and reported per million chunks.
+Top-k latency is compared for a naive scan that scores every chunk, the index
+scoring every posting, and the index with early termination.
+
+Run from the project root:
+    python -m benchmarks.bench_lexical_index --chunks 200000 --queries 200
+"""
+
+import argparse
+import math
+import time
+import tracemalloc
+from collections import Counter
+
+import numpy as np
+
+from backend.config import Config
+from backend.services.lexical_index import BM25Index, tokenize
+
+
+def synthetic_chunks(n_chunks: int, chunk_tokens: int, vocabulary_size: int, seed: int = 0) -> tuple:
+    """Chunks of Zipf-distributed pseudo-words, plus the vocabulary ordered by frequency"""
+    rng = np.random.default_rng(seed)
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    vocabulary = sorted({"".join(rng.choice(letters, size=rng.integers(3, 11))) for _ in range(vocabulary_size)})
+    rng.shuffle(vocabulary)
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1) ** 1.07
+    tokens = rng.choice(len(vocabulary), size=n_chunks * chunk_tokens, p=weights / weights.sum())
+    words = np.array(vocabulary, dtype=object)[tokens].reshape(n_chunks, chunk_tokens)
+    return [" ".join(row) for row in words], vocabulary
+
+
+def sample_queries(vocabulary: list, n_queries: int, seed: int = 1) -> list:
+    """
+    Natural-language-like queries: one or two rare words (a name, a skill) among two
+    to four common ones, which is where early termination has postings to skip
+    """
+    rng = np.random.default_rng(seed)
+    queries = []
+    for _ in range(n_queries):
+        head = rng.integers(0, 100, size=rng.integers(2, 5))
+        tail = rng.integers(1000, len(vocabulary) // 2, size=rng.integers(1, 3))
+        queries.append(" ".join(vocabulary[i] for i in np.concatenate([head, tail])))
+    return queries
+
+
+def measure_memory(build) -> tuple:
+    tracemalloc.start()
+    start = time.perf_counter()
+    value = build()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, size, elapsed
+
+
+def build_index(chunks: list, batch: int) -> BM25Index:
+    index = BM25Index()
+    for start in range(0, len(chunks), batch):
+        index.add(start, chunks[start:start + batch])
+    while index.merging:
+        time.sleep(0.05)
+    return index
+
+
+def build_baseline(chunks: list) -> dict:
+    postings = {}
+    for doc, text in enumerate(chunks):
+        for term, tf in Counter(tokenize(text)).items():
+            postings.setdefault(term, []).append([doc, tf])
+    return postings
+
+
+def naive_scan(counts: list, lengths: np.ndarray, df: dict, query: str, k: int):
+    """Score every chunk from its token counts, without an index"""
+    k1, b = Config.BM25_K1, Config.BM25_B
+    n_docs, average = len(counts), lengths.mean()
+    terms = [(term, math.log1p((n_docs - df[term] + 0.5) / (df[term] + 0.5))) for term in set(tokenize(query)) if term in df]
+    scores = []
+    for doc, chunk_counts in enumerate(counts):
+        score = 0.0
+        for term, idf in terms:
+            tf = chunk_counts.get(term)
+            if tf:
+                score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths[doc] / average))
+        scores.append(score)
+    return np.argsort(scores)[::-1][:k]
+
+
+def latency(label: str, search, queries: list) -> list:
+    timings, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(search(query))
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings) * 1000
+    print(f"{label:<28} p50 {np.percentile(timings, 50):8.2f} ms   p95 {np.percentile(timings, 95):8.2f} ms")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=200000)
+    parser.add_argument("--chunk-tokens", type=int, default=120)
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--baseline-chunks", type=int, default=50000, help="corpus prefix for the dict-of-lists baseline")
+    parser.add_argument("--batch", type=int, default=Config.EMBEDDINGS_BATCH_SIZE * 32, help="rows per appended segment")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--naive-queries", type=int, default=10)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    chunks, vocabulary = synthetic_chunks(args.chunks, args.chunk_tokens, args.vocabulary)
+    queries = sample_queries(vocabulary, args.queries)
+    print(f"Lexical index benchmark: {len(chunks)} chunks of {args.chunk_tokens} tokens, {len(vocabulary)} words")
+    print("=" * 40)
+
+    index, index_bytes, build_seconds = measure_memory(lambda: build_index(chunks, args.batch))
+    stats = index.stats()
+    print(f"array index: {build_seconds:7.1f} s build, {stats['segments']} segments after merging, "
+          f"{stats['postings']} postings")
+    print(f"{'array postings':<28} {index_bytes / len(chunks):8.1f} B/chunk  "
+          f"{index_bytes / len(chunks) * 1e6 / 2 ** 20:8.0f} MiB per million chunks")
+
+    baseline_chunks = chunks[:args.baseline_chunks]
+    baseline, baseline_bytes, _ = measure_memory(lambda: build_baseline(baseline_chunks))
+    print(f"{'dict of lists':<28} {baseline_bytes / len(baseline_chunks):8.1f} B/chunk  "
+          f"{baseline_bytes / len(baseline_chunks) * 1e6 / 2 ** 20:8.0f} MiB per million chunks")
+    del baseline
+    print()
+
+    counts = [Counter(tokenize(text)) for text in chunks]
+    lengths = np.array([sum(chunk_counts.values()) for chunk_counts in counts], dtype=np.float64)
+    df = Counter(term for chunk_counts in counts for term in chunk_counts)
+    latency("naive scan", lambda query: naive_scan(counts, lengths, df, query, args.k), queries[:args.naive_queries])
+    exhaustive = latency("index, all postings", lambda query: index.search(query, args.k, prune=False), queries)
+    pruned = latency("index, early termination", lambda query: index.search(query, args.k), queries)
+
+    same = np.mean([np.allclose(a[1], b[1]) for a, b in zip(exhaustive, pruned)])
+    print(f"early termination returns the exhaustive top-{args.k} scores for {same:.0%} of queries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Remote-call savings of the LLM client under a burst of dashboard queries, using the
+fake backend so no API key or network is needed.
+
+Run from the project root:
+    python -m benchmarks.bench_llm_client --clients 64 --distinct 4 --latency 0.3
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.services.llm import FakeLLM, LLMClient, compact_schema_context
+from backend.services.schema_discovery import SchemaDiscovery
+from benchmarks.datasets import create_wide_sqlite_schema
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=64, help="concurrent callers in the burst")
+    parser.add_argument("--distinct", type=int, default=4, help="distinct prompts among them")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake backend latency (seconds)")
+    parser.add_argument("--rate", type=float, default=20.0, help="token bucket refill rate (calls/second)")
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    parser.add_argument("--tables", type=int, default=500, help="tables in the wide schema for prompt size")
+    args = parser.parse_args()
+
+    backend = FakeLLM(latency=args.latency, failure_rate=args.failure_rate, seed=0)
+    client = LLMClient(backend, rate=args.rate, burst=args.rate, timeout=30.0)
+    prompts = [f"prompt {i % args.distinct}" for i in range(args.clients)]
+
+    print(f"LLM client burst: {args.clients} callers, {args.distinct} distinct prompts")
+    print("=" * 40)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as executor:
+        list(executor.map(client.complete, prompts))
+    elapsed = time.perf_counter() - start
+    stats = client.stats()
+    print(f"{'wall time':<24} {elapsed:8.2f} s")
+    print(f"{'backend calls':<24} {stats['backend_calls']:8d}  (without coalescing: >= {args.clients})")
+    for key in ("coalesced", "retries", "failures"):
+        print(f"{key:<24} {stats[key]:8d}")
+
+    connection_string = create_wide_sqlite_schema(
+        os.path.join(tempfile.gettempdir(), "bench_llm_schema.sqlite3"), n_tables=args.tables
+    )
+    discovery = SchemaDiscovery()
+    schema = discovery.analyze_database(connection_string)
+    mapping = discovery.map_natural_language_to_schema("average col_001 in table 0042", schema)
+    full = compact_schema_context(schema, max_tables=len(schema["tables"]), max_columns=1000)
+    compact = compact_schema_context(schema, mapping)
+    print()
+    print(f"Schema context for {args.tables} tables")
+    print("=" * 40)
+    print(f"{'all tables':<24} {len(full):8d} chars")
+    print(f"{'compacted':<24} {len(compact):8d} chars")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Recall and latency of exact vs IVF document retrieval on synthetic clustered embeddings.
+
+Run from the project root:
+    python -m benchmarks.bench_retrieval --sizes 100000,1000000 --dimension 384
+"""
+
+import argparse
+import math
+import time
+
+import numpy as np
+
+from backend.services.retrieval import IVFIndex, exact_top_k
+
+
+def clustered_vectors(n: int, dimension: int, n_clusters: int, rng) -> np.ndarray:
+    """Unit vectors drawn around random topic centers, closer to real embeddings than uniform noise"""
+    centers = rng.standard_normal((n_clusters, dimension)).astype(np.float32)
+    vectors = np.empty((n, dimension), dtype=np.float32)
+    block = 100000
+    for start in range(0, n, block):
+        size = min(block, n - start)
+        labels = rng.integers(0, n_clusters, size)
+        vectors[start:start + size] = centers[labels] + 0.8 * rng.standard_normal((size, dimension)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="100000,1000000")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--probes", default="1,4,8,16,32")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for n in [int(size) for size in args.sizes.split(",")]:
+        vectors = clustered_vectors(n, args.dimension, n_clusters=256, rng=rng)
+        queries = vectors[rng.choice(n, args.queries, replace=False)] + 0.05 * rng.standard_normal(
+            (args.queries, args.dimension)).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+        print(f"Retrieval benchmark: {n} chunks x {args.dimension} dims, k={args.k}")
+        print("=" * 40)
+
+        start = time.perf_counter()
+        truth, _ = exact_top_k(vectors, queries, args.k)
+        batch_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        for query in queries[:10]:
+            exact_top_k(vectors, query[None, :], args.k)
+        single_ms = (time.perf_counter() - start) * 100
+        print(f"{'exact (batched, per query)':<30} {batch_ms / args.queries:8.2f} ms  recall=1.000")
+        print(f"{'exact (single query)':<30} {single_ms:8.2f} ms")
+
+        start = time.perf_counter()
+        index = IVFIndex(n_lists=int(math.sqrt(n))).build(vectors)
+        print(f"{'ivf build':<30} {(time.perf_counter() - start):8.2f} s   lists={index.n_lists}")
+
+        for n_probe in [int(p) for p in args.probes.split(",")]:
+            start = time.perf_counter()
+            ids, _ = index.search(vectors, queries, args.k, n_probe=n_probe)
+            latency = (time.perf_counter() - start) * 1000 / args.queries
+            recall = np.mean([len(set(ids[i]) & set(truth[i])) / args.k for i in range(args.queries)])
+            print(f"{f'ivf n_probe={n_probe}':<30} {latency:8.2f} ms  recall={recall:.3f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark schema discovery against a generated SQLite file with many tables.
+
+Run from the project root:
+    python -m benchmarks.bench_schema_discovery --tables 500
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from benchmarks.datasets import create_wide_sqlite_schema
+from backend.services.schema_discovery import SchemaDiscovery
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed * 1000:10.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tables", type=int, default=500)
+    parser.add_argument("--columns", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "wide.db")
+        connection_string = create_wide_sqlite_schema(path, args.tables, args.columns)
+        print(f"Schema discovery benchmark: {args.tables} tables x {args.columns + 2} columns")
+        print("=" * 40)
+
+        serial = SchemaDiscovery(max_workers=1)
+        timed("full discovery (1 worker)", lambda: serial.analyze_database(connection_string))
+
+        discovery = SchemaDiscovery(max_workers=args.workers) if args.workers else SchemaDiscovery()
+        schema = timed(f"full discovery ({discovery.max_workers} workers)",
+                       lambda: discovery.analyze_database(connection_string))
+        print(f"discovered {len(schema['tables'])} tables, {len(schema['relationships'])} relationships")
+
+        unchanged = timed("incremental refresh (no changes)", lambda: discovery.refresh(connection_string))
+        assert unchanged["version"] == schema["version"]
+
+        connection = sqlite3.connect(path)
+        for i in range(5):
+            connection.execute(f"ALTER TABLE table_{i:04d} ADD COLUMN added_col TEXT")
+        connection.commit()
+        connection.close()
+
+        changed = timed("incremental refresh (5 tables changed)", lambda: discovery.refresh(connection_string))
+        assert changed["version"] != schema["version"]
+
+
+if __name__ == "__main__":
+    main()
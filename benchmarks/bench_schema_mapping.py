@@ -0,0 +1,89 @@
+"""
+Benchmark natural-language to schema mapping on a wide synthetic schema.
+
+Run from the project root:
+    python -m benchmarks.bench_schema_mapping --tables 1000 --columns 50
+"""
+
+import argparse
+import time
+
+from backend.services.schema_discovery import SchemaDiscovery, TERM_MAPPING
+
+QUERIES = [
+    "Show me all employees in the engineering department",
+    "Average salary by department for staff hired this year",
+    "Which personnel have compensation above 100000",
+    "List employee names and join dates",
+]
+
+
+def build_schema(n_tables: int, n_columns: int) -> dict:
+    stems = ["employee", "department", "salary", "project", "review", "contract", "office", "asset"]
+    tables = []
+    for i in range(n_tables):
+        stem = stems[i % len(stems)]
+        columns = [{"name": "id", "type": "integer", "primary_key": True}]
+        for j in range(n_columns - 1):
+            columns.append({"name": f"{stems[j % len(stems)]}_attr_{j:03d}", "type": "string"})
+        tables.append({"name": f"{stem}_{i:04d}", "columns": columns})
+    return {"tables": tables, "relationships": [], "version": f"bench-{n_tables}x{n_columns}"}
+
+
+def naive_mapping(query: str, schema: dict) -> dict:
+    """The original nested-loop implementation, kept here as the baseline"""
+    relevant_tables = []
+    relevant_columns = []
+    query_lower = query.lower()
+    for table in schema["tables"]:
+        table_name = table["name"].lower()
+        for key, variations in TERM_MAPPING.items():
+            if any(variation in table_name for variation in variations) and any(key in query_lower for key in TERM_MAPPING):
+                if table not in relevant_tables:
+                    relevant_tables.append(table)
+    if not relevant_tables:
+        relevant_tables = schema["tables"]
+    for table in relevant_tables:
+        for column in table["columns"]:
+            column_name = column["name"].lower()
+            for key, variations in TERM_MAPPING.items():
+                if any(variation in column_name for variation in variations) and key in query_lower:
+                    if column not in relevant_columns:
+                        relevant_columns.append(column)
+    return {"relevant_tables": relevant_tables, "relevant_columns": relevant_columns}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tables", type=int, default=1000)
+    parser.add_argument("--columns", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--naive-repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    schema = build_schema(args.tables, args.columns)
+    discovery = SchemaDiscovery()
+    print(f"Schema mapping benchmark: {args.tables} tables x {args.columns} columns")
+    print("=" * 40)
+
+    start = time.perf_counter()
+    discovery.get_term_index(schema)
+    print(f"{'index build (once per snapshot)':<40} {(time.perf_counter() - start) * 1000:10.1f} ms")
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for query in QUERIES:
+            discovery.map_natural_language_to_schema(query, schema)
+    per_query = (time.perf_counter() - start) / (args.repeat * len(QUERIES))
+    print(f"{'indexed match per query':<40} {per_query * 1e6:10.1f} us")
+
+    start = time.perf_counter()
+    for _ in range(args.naive_repeat):
+        for query in QUERIES:
+            naive_mapping(query, schema)
+    per_query = (time.perf_counter() - start) / (args.naive_repeat * len(QUERIES))
+    print(f"{'naive nested loops per query':<40} {per_query * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
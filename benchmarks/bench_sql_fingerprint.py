@@ -0,0 +1,94 @@
+"""
+Statement reuse from SQL fingerprinting: the same family of generated statements with
+varying literals, executed with the literals inline and with them lifted into bind
+parameters, plus the hit rate of the fingerprint-keyed result cache.
+
+Run from the project root:
+    python -m benchmarks.bench_sql_fingerprint --rows 100000 --statements 5000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import text
+
+from backend.services.database import get_engine
+from backend.services.sql_executor import SQLExecutor
+from backend.services.sql_fingerprint import parameterize, statement_cache
+from benchmarks.datasets import create_employee_database
+
+TEMPLATES = [
+    "SELECT name, salary FROM employees WHERE salary > {salary} ORDER BY salary DESC LIMIT {limit}",
+    "SELECT COUNT(*) FROM employees WHERE department = '{department}' AND hire_date >= '{year}-01-01'",
+    "SELECT * FROM employees WHERE id = {id}",
+]
+DEPARTMENTS = ["Engineering", "Sales", "Marketing", "Finance", "HR", "Operations"]
+
+
+def workload(n_statements: int, n_rows: int, distinct_values: int):
+    rng = random.Random(0)
+    statements = []
+    for i in range(n_statements):
+        template = TEMPLATES[i % len(TEMPLATES)]
+        statements.append(template.format(
+            salary=40000 + 1000 * rng.randrange(distinct_values),
+            limit=rng.choice((5, 10, 20)),
+            department=rng.choice(DEPARTMENTS),
+            year=2015 + rng.randrange(min(distinct_values, 9)),
+            id=1 + rng.randrange(min(distinct_values, n_rows)),
+        ))
+    return statements
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--statements", type=int, default=5000)
+    parser.add_argument("--distinct", type=int, default=50, help="distinct values per literal")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), f"bench_fingerprint_{args.rows}.sqlite3")
+    connection_string = create_employee_database(path, n_rows=args.rows) if not os.path.exists(path) else f"sqlite:///{path}"
+    engine = get_engine(connection_string)
+    statements = workload(args.statements, args.rows, args.distinct)
+
+    print(f"SQL fingerprinting: {args.statements} statements, {args.distinct} distinct values per literal")
+    print("=" * 40)
+
+    start = time.perf_counter()
+    with engine.connect() as connection:
+        for sql in statements:
+            connection.execute(text(sql)).fetchall()
+    inline = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with engine.connect() as connection:
+        for sql in statements:
+            parameterized = parameterize(sql)
+            connection.execute(statement_cache.statement(parameterized.sql), parameterized.bind_params).fetchall()
+    bound = time.perf_counter() - start
+
+    fingerprints = {parameterize(sql).fingerprint for sql in statements}
+    print(f"{'distinct statements':<24} {len(set(statements)):8d}")
+    print(f"{'distinct fingerprints':<24} {len(fingerprints):8d}")
+    print(f"{'inline literals':<24} {inline * 1e6 / len(statements):8.1f} us/statement")
+    print(f"{'bound parameters':<24} {bound * 1e6 / len(statements):8.1f} us/statement")
+
+    executor = SQLExecutor(engine)
+    pages = {}
+    start = time.perf_counter()
+    for sql in statements:
+        parameterized = parameterize(sql)
+        key = (parameterized.fingerprint, parameterized.params)
+        if key not in pages:
+            pages[key] = executor.execute_page(sql)
+    cached = time.perf_counter() - start
+    print(f"{'result cache hit rate':<24} {1 - len(pages) / len(statements):8.1%}")
+    print(f"{'with result cache':<24} {cached * 1e6 / len(statements):8.1f} us/statement")
+
+
+if __name__ == "__main__":
+    main()
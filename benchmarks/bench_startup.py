@@ -0,0 +1,107 @@
+"""
+Startup cost of the API: wall time of `import backend.main` in fresh interpreters, the
+modules that dominate it, which heavy dependencies it pulls in, and the latency of the
+first query with lazy loading versus the time to /ready with the background warm-up.
+
+Run from the project root:
+    python -m benchmarks.bench_startup --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HEAVY_MODULES = ["torch", "sentence_transformers", "google.generativeai", "pandas", "PyPDF2", "docx", "sklearn"]
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import backend.main
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+FIRST_REQUEST_PROBE = """
+import json, time
+start = time.perf_counter()
+from fastapi.testclient import TestClient
+from backend.main import app
+imported = time.perf_counter()
+with TestClient(app) as client:
+    started = time.perf_counter()
+    while client.get("/ready").status_code != 200:
+        time.sleep(0.01)
+    ready = time.perf_counter()
+    client.post("/api/query", data={"query": "How many employees are in each department?"})
+    answered = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "startup_to_ready": ready - started,
+    "first_query": answered - ready,
+    "total": answered - start
+}))
+"""
+
+
+def run_probe(code: str, env: dict) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def import_profile(env: dict, top: int):
+    """Largest cumulative import times (microseconds) from -X importtime"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import backend.main"], env=env, capture_output=True, text=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        if not name.startswith(" ") and "." not in name:
+            rows.append((int(cumulative), name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=10, help="top-level modules to list by import time")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.getcwd(),
+        HISTORY_DB_PATH=os.path.join(workdir, "query_history.sqlite3"),
+        VECTOR_STORE_DIR=os.path.join(workdir, "vector_store"),
+    )
+
+    imports = [run_probe(IMPORT_PROBE, env) for _ in range(args.runs)]
+    print(f"import backend.main ({args.runs} fresh interpreters)")
+    print("=" * 40)
+    print(f"{'median':<24} {statistics.median(run['seconds'] for run in imports) * 1000:8.1f} ms")
+    print(f"{'heavy modules loaded':<24} {', '.join(imports[0]['loaded']) or 'none'}")
+    print()
+    print(f"Top {args.top} top-level imports (cumulative)")
+    print("=" * 40)
+    for micros, name in import_profile(env, args.top):
+        print(f"{name:<24} {micros / 1000:8.1f} ms")
+
+    for label, warm_up in (("lazy loading", "false"), ("background warm-up", "true")):
+        runs = [run_probe(FIRST_REQUEST_PROBE, dict(env, WARMUP_ON_STARTUP=warm_up)) for _ in range(args.runs)]
+        print()
+        print(f"Startup with {label} (median of {args.runs})")
+        print("=" * 40)
+        for key in ("import", "startup_to_ready", "first_query", "total"):
+            print(f"{key:<24} {statistics.median(run[key] for run in runs) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
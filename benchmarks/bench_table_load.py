@@ -0,0 +1,80 @@
+"""
+Streaming CSV table loads: rows/sec and peak memory of loading an HR export CSV
+into SQLite, for files of increasing size. Peak RSS should stay flat as the file
+grows, since only the type-inference sample and one insert batch are held at a time.
+
+Run from the project root:
+    python -m benchmarks.bench_table_load --megabytes 100 500 2000
+"""
+
+import argparse
+import csv
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.datasets import DEPARTMENTS, FIRST_NAMES, LAST_NAMES, POSITIONS
+
+
+def create_hr_export(path: str, megabytes: int) -> int:
+    """Write an HR export CSV of about the given size row by row; returns the number of rows"""
+    target = megabytes * 1024 * 1024
+    rows = 0
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["Employee ID", "Name", "Department", "Position", "Salary", "Hire Date",
+                         "Last Review", "Remote", "Office Code", "Rating", "Email"])
+        while file.tell() < target:
+            for i in range(rows, rows + 10000):
+                first = FIRST_NAMES[i % len(FIRST_NAMES)]
+                last = LAST_NAMES[(i // len(FIRST_NAMES)) % len(LAST_NAMES)]
+                writer.writerow([
+                    i + 1, f"{first} {last}", DEPARTMENTS[i % len(DEPARTMENTS)], POSITIONS[(i * 7) % len(POSITIONS)],
+                    40000 + (i * 7919) % 160000, f"{2010 + i % 15}-{1 + i % 12:02d}-{1 + i % 28:02d}",
+                    f"2024-{1 + i % 12:02d}-{1 + i % 28:02d} {i % 24:02d}:{i % 60:02d}:00",
+                    "yes" if i % 3 == 0 else "no", f"{i % 1000:04d}", "" if i % 11 == 0 else f"{1 + i % 40 / 10:.1f}",
+                    f"{first.lower()}.{last.lower()}{i}@example.com"
+                ])
+            rows += 10000
+    return rows
+
+
+def load(path: str, connection_string: str) -> None:
+    """Runs in a fresh process so that its peak RSS belongs to this load alone"""
+    from backend.services.table_loader import CSVTableLoader
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    stats = CSVTableLoader().load(path, connection_string, "hr_export")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{stats['bytes'] / 2 ** 20:8.0f} MiB {stats['rows']:>11} rows {stats['seconds']:8.1f} s "
+          f"{stats['rows_per_second']:>10.0f} rows/s {stats['bytes'] / 2 ** 20 / stats['seconds']:7.1f} MiB/s "
+          f"{peak / 1024:8.1f} MiB peak RSS ({(peak - baseline) / 1024:+.1f} MiB during load)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--megabytes", type=int, nargs="+", default=[50, 200, 800])
+    parser.add_argument("--load", nargs=2, metavar=("CSV", "URL"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.load:
+        load(*args.load)
+        return
+
+    print("CSV table load into SQLite")
+    print("=" * 40)
+    with tempfile.TemporaryDirectory() as tmp:
+        for megabytes in args.megabytes:
+            path = os.path.join(tmp, f"hr_export_{megabytes}.csv")
+            create_hr_export(path, megabytes)
+            database = os.path.join(tmp, f"tables_{megabytes}.sqlite3")
+            subprocess.run([sys.executable, "-m", "benchmarks.bench_table_load", "--load", path, f"sqlite:///{database}"],
+                           check=True)
+            os.remove(path)
+            os.remove(database)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Multi-worker behaviour of the API under real uvicorn processes: query cache hit rate
+and latency, whether every worker adopted the connected database, and whether job
+status can be read from any worker, for 1 worker versus N workers with per-process
+("memory") and shared ("sqlite") state.
+
+Run from the project root:
+    python -m benchmarks.bench_workers --workers 4 --requests 400 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.bench_api import QUERIES, summarize
+from benchmarks.datasets import create_document_corpus, create_employee_database
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, state_backend: str, workdir: str, port: int) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.getcwd(),
+        STATE_BACKEND=state_backend,
+        STATE_DB_PATH=os.path.join(workdir, "state.sqlite3"),
+        HISTORY_DB_PATH=os.path.join(workdir, "query_history.sqlite3"),
+        VECTOR_STORE_DIR=os.path.join(workdir, "vector_store"),
+        UPLOAD_SPOOL_DIR=os.path.join(workdir, "uploads"),
+        EMBEDDINGS_ENCODER=os.environ.get("EMBEDDINGS_ENCODER", "hashing"),
+        LLM_BACKEND=os.environ.get("LLM_BACKEND", "none"),
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+async def measure(client: httpx.AsyncClient, n_requests: int, concurrency: int) -> dict:
+    latencies, hits, with_rows, errors = [], 0, 0, 0
+    counter = iter(range(n_requests))
+
+    async def worker():
+        nonlocal hits, with_rows, errors
+        for i in counter:
+            start = time.perf_counter()
+            response = await client.post("/api/query", data={"query": QUERIES[i % len(QUERIES)]})
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+                continue
+            body = response.json()
+            hits += bool(body["performance_metrics"].get("cache_hit"))
+            # Only workers that know about the connected database return rows from it
+            with_rows += "results" in body or body["query_type"] == "document"
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    summary = summarize(latencies, errors, time.perf_counter() - start)
+    summary["hit_rate"] = hits / n_requests
+    summary["answered_from_database"] = with_rows / n_requests
+    return summary
+
+
+async def job_visibility(client: httpx.AsyncClient, document: str, polls: int) -> float:
+    """Fraction of status reads (spread over the workers) that find a freshly created job"""
+    with open(document, "rb") as file:
+        files = [("files", (os.path.basename(document), file.read(), "application/octet-stream"))]
+    job_id = (await client.post("/api/ingest/documents", files=files)).json()["job_id"]
+    found = 0
+    for _ in range(polls):
+        found += (await client.get(f"/api/ingest/status/{job_id}")).status_code == 200
+    return found / polls
+
+
+async def run(workers: int, state_backend: str, connection_string: str, document: str, args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="nlq_workers_")
+    port = free_port()
+    server = start_server(workers, state_backend, workdir, port)
+    # A fresh connection per request lets the kernel spread requests over the workers
+    limits = httpx.Limits(max_keepalive_connections=0)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60.0, limits=limits) as client:
+            await wait_ready(client)
+            (await client.post("/api/ingest/database", data={"connection_string": connection_string})).raise_for_status()
+            summary = await measure(client, args.requests, args.concurrency)
+            summary["job_visibility"] = await job_visibility(client, document, args.polls)
+            return summary
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--polls", type=int, default=40, help="job status reads after one upload")
+    args = parser.parse_args()
+
+    datadir = tempfile.mkdtemp(prefix="nlq_workers_data_")
+    connection_string = create_employee_database(os.path.join(datadir, "employees.sqlite3"), args.rows)
+    document = create_document_corpus(os.path.join(datadir, "corpus"), 1)[0]
+
+    print(f"Worker state: {args.requests} queries over {len(QUERIES)} questions, concurrency {args.concurrency}")
+    print("=" * 40)
+    print(f"{'configuration':<18} {'hit rate':>9} {'db answers':>11} {'jobs seen':>10} {'p50 ms':>8} {'p95 ms':>8} {'req/s':>8}")
+    for workers, state_backend in ((1, "memory"), (args.workers, "memory"), (args.workers, "sqlite")):
+        summary = asyncio.run(run(workers, state_backend, connection_string, document, args))
+        print(f"{f'{workers} x {state_backend}':<18} {summary['hit_rate']:9.1%} {summary['answered_from_database']:11.1%} "
+              f"{summary['job_visibility']:10.1%} {summary['p50_ms']:8.2f} {summary['p95_ms']:8.2f} "
+              f"{summary['throughput_rps']:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Synthetic datasets shared by the benchmark scripts
+"""
+
+import os
+import sqlite3
+
+
+def create_wide_sqlite_schema(path: str, n_tables: int = 500, n_columns: int = 12) -> str:
+    """
+    Create a SQLite file with n_tables tables, each with a primary key,
+    a foreign key to the previous table and n_columns payload columns.
+    Returns an SQLAlchemy connection string for the file.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+
+    connection = sqlite3.connect(path)
+    try:
+        for i in range(n_tables):
+            columns = ["id INTEGER PRIMARY KEY"]
+            if i > 0:
+                columns.append(f"parent_id INTEGER REFERENCES table_{i - 1:04d}(id)")
+            for j in range(n_columns):
+                column_type = ("TEXT", "INTEGER", "NUMERIC", "DATE")[j % 4]
+                columns.append(f"col_{j:03d} {column_type}")
+            connection.execute(f"CREATE TABLE table_{i:04d} ({', '.join(columns)})")
+        connection.commit()
+    finally:
+        connection.close()
+
+    return f"sqlite:///{path}"
+
+
+SKILLS = ["Python", "SQL", "leadership", "Kubernetes", "negotiation", "React", "data analysis", "mentoring"]
+DEPARTMENTS = ["Engineering", "Sales", "Marketing", "Finance", "HR", "Operations"]
+
+
+def generate_document_text(i: int, paragraphs: int = 20) -> str:
+    """Resume-like synthetic text for document i"""
+    lines = [f"Employee {i} Resume", "", "SUMMARY"]
+    for p in range(paragraphs):
+        skill = SKILLS[(i + p) % len(SKILLS)]
+        department = DEPARTMENTS[(i * 7 + p) % len(DEPARTMENTS)]
+        lines.append(
+            f"Worked in {department} on project {p} applying {skill}. "
+            f"Delivered measurable results and collaborated across teams for {p + 1} quarters."
+        )
+        lines.append("")
+    return "\n".join(lines)
+
+
+def create_document_corpus(directory: str, n_files: int, paragraphs: int = 20) -> list:
+    """Write a mix of TXT, CSV and (when python-docx is installed) DOCX files; returns their paths"""
+    try:
+        import docx
+    except ImportError:
+        docx = None
+
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(n_files):
+        text = generate_document_text(i, paragraphs)
+        kind = i % 3
+        if kind == 0 or (kind == 2 and docx is None):
+            path = os.path.join(directory, f"doc_{i:05d}.txt")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(text)
+        elif kind == 1:
+            path = os.path.join(directory, f"doc_{i:05d}.csv")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write("id,name,department,skill\n")
+                for row in range(paragraphs * 10):
+                    file.write(f"{row},Employee {row},{DEPARTMENTS[row % 6]},{SKILLS[row % 8]}\n")
+        else:
+            path = os.path.join(directory, f"doc_{i:05d}.docx")
+            document = docx.Document()
+            for line in text.split("\n"):
+                document.add_paragraph(line)
+            document.save(path)
+        paths.append(path)
+    return paths
+
+
+FIRST_NAMES = ["John", "Priya", "Wei", "Maria", "Ahmed", "Olga", "Kenji", "Fatima", "Lucas", "Amara"]
+LAST_NAMES = ["Smith", "Patel", "Chen", "Garcia", "Hassan", "Ivanova", "Tanaka", "Khan", "Silva", "Okafor"]
+POSITIONS = ["Engineer", "Senior Engineer", "Manager", "Analyst", "Director", "Specialist"]
+
+
+def create_employee_database(path: str, n_rows: int = 100000, batch_size: int = 50000) -> str:
+    """
+    Create a SQLite employee database (departments + employees) with n_rows employees.
+    Rows are generated and inserted in batches, so millions of rows fit in constant memory.
+    Returns an SQLAlchemy connection string for the file.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+
+    connection = sqlite3.connect(path)
+    try:
+        connection.execute("PRAGMA journal_mode=OFF")
+        connection.execute("PRAGMA synchronous=OFF")
+        connection.execute("CREATE TABLE departments (id INTEGER PRIMARY KEY, name TEXT NOT NULL, budget NUMERIC)")
+        connection.execute(
+            "CREATE TABLE employees ("
+            " id INTEGER PRIMARY KEY,"
+            " name TEXT NOT NULL,"
+            " department_id INTEGER REFERENCES departments(id),"
+            " department TEXT,"
+            " position TEXT,"
+            " salary NUMERIC,"
+            " hire_date DATE,"
+            " email TEXT)"
+        )
+        connection.executemany(
+            "INSERT INTO departments (id, name, budget) VALUES (?, ?, ?)",
+            [(i + 1, name, 1000000 + 250000 * i) for i, name in enumerate(DEPARTMENTS)]
+        )
+
+        def rows(start, stop):
+            for i in range(start, stop):
+                department = i % len(DEPARTMENTS)
+                first = FIRST_NAMES[i % len(FIRST_NAMES)]
+                last = LAST_NAMES[(i // len(FIRST_NAMES)) % len(LAST_NAMES)]
+                yield (
+                    i + 1,
+                    f"{first} {last} {i}",
+                    department + 1,
+                    DEPARTMENTS[department],
+                    POSITIONS[(i * 7) % len(POSITIONS)],
+                    40000 + (i * 7919) % 160000,
+                    f"{2010 + i % 15}-{1 + i % 12:02d}-{1 + i % 28:02d}",
+                    f"{first.lower()}.{last.lower()}{i}@example.com"
+                )
+
+        for start in range(0, n_rows, batch_size):
+            connection.executemany(
+                "INSERT INTO employees VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows(start, min(n_rows, start + batch_size))
+            )
+            connection.commit()
+        connection.execute("CREATE INDEX idx_employees_department ON employees (department_id)")
+        connection.commit()
+    finally:
+        connection.close()
+
+    return f"sqlite:///{path}"
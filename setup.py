@@ -77,16 +77,19 @@ def run_frontend():
     except Exception as e:
         print(f"Error running frontend server: {e}")
 
-def run_tests():
-    """Run API tests"""
-    print("Running API tests...")
+def run_tests(quick=True):
+    """Run the in-process API benchmark (a small smoke run unless quick is False)"""
+    print("Running API benchmark...")
     
+    command = [sys.executable, "-m", "benchmarks.bench_api"]
+    if quick:
+        command.append("--quick")
     try:
-        subprocess.run([sys.executable, "test_api.py"], check=True)
+        subprocess.run(command + sys.argv[2:], check=True)
     except subprocess.CalledProcessError as e:
-        print(f"Tests failed: {e}")
+        print(f"Benchmark failed: {e}")
     except Exception as e:
-        print(f"Error running tests: {e}")
+        print(f"Error running benchmark: {e}")
 
 def show_help():
     """Show help information"""
@@ -100,12 +103,14 @@ Commands:
   setup-frontend    Install frontend dependencies
   run-backend       Start the backend server
   run-frontend      Start the frontend development server
-  test             Run API tests
+  test             Quick in-process API smoke benchmark
+  benchmark        Full API load and latency benchmark (extra args are passed through)
   help             Show this help message
 
 Examples:
   python setup.py setup-backend
   python setup.py run-frontend
+  python setup.py benchmark --rows 1000000 --output results.json
     """)
 
 if __name__ == "__main__":
@@ -125,6 +130,8 @@ if __name__ == "__main__":
         run_frontend()
     elif command == "test":
         run_tests()
+    elif command == "benchmark":
+        run_tests(quick=False)
     elif command == "help":
         show_help()
     else:
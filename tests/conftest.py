@@ -0,0 +1,13 @@
+import os
+import tempfile
+
+# Offline stand-ins for the embedding model and the LLM, and throwaway storage;
+# set before backend.config is imported anywhere
+_DATA_DIR = tempfile.mkdtemp(prefix="nlq_tests_")
+os.environ.setdefault("EMBEDDINGS_ENCODER", "hashing")
+os.environ.setdefault("LLM_BACKEND", "none")
+os.environ.setdefault("STATE_BACKEND", "memory")
+os.environ.setdefault("HISTORY_DB_PATH", os.path.join(_DATA_DIR, "query_history.sqlite3"))
+os.environ.setdefault("VECTOR_STORE_DIR", os.path.join(_DATA_DIR, "vector_store"))
+os.environ.setdefault("UPLOAD_SPOOL_DIR", os.path.join(_DATA_DIR, "uploads"))
+os.environ.setdefault("TABLES_DATABASE_URL", "sqlite:///" + os.path.join(_DATA_DIR, "tables.sqlite3"))
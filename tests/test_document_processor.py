@@ -0,0 +1,20 @@
+from backend.services.document_processor import CHUNK_PROFILES, DocumentProcessor, _iter_lines
+
+
+def test_lines_are_joined_across_pieces():
+    assert list(_iter_lines(iter(["a\nb", "c", "d\ne\n", "f"]))) == ["a", "bcd", "e", "f"]
+
+
+def test_text_without_newlines_is_passed_on_at_word_breaks():
+    pieces = ["word " * 1000] * 200
+    lines = list(_iter_lines(iter(pieces)))
+    assert len(lines) > 1
+    assert "".join(lines) == "".join(pieces)
+    assert all(line.endswith(" ") for line in lines)
+
+
+def test_chunks_fit_the_encoder_input():
+    processor = DocumentProcessor()
+    for doc_type, profile in CHUNK_PROFILES.items():
+        chunks = list(processor.dynamic_chunking("lorem ipsum dolor " * 2000, doc_type))
+        assert max(len(chunk.split()) for chunk in chunks) == profile["max_words"] <= 160
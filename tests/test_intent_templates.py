@@ -0,0 +1,110 @@
+import time
+
+import pytest
+
+from backend.services.intent_templates import IntentTemplates
+from backend.services.query_engine import normalize_query
+
+SCHEMA = {
+    "database_type": "SQLite",
+    "tables": [
+        {
+            "name": "employees",
+            "columns": [
+                {"name": "id", "type": "integer", "primary_key": True},
+                {"name": "name", "type": "string"},
+                {"name": "department", "type": "string"},
+                {"name": "salary", "type": "decimal"},
+                {"name": "hire_date", "type": "date"}
+            ]
+        }
+    ],
+    "relationships": [],
+    "version": "test"
+}
+
+
+def translate(question, schema=SCHEMA):
+    return IntentTemplates().translate(normalize_query(question), schema, schema["version"])
+
+
+def with_departments(*names, profiled_at=None):
+    """SCHEMA with complete top values for the department column"""
+    top_values = [{"value": name, "fraction": round(1 / len(names), 4)} for name in names]
+    statistics = {"employees": {
+        "profiled_at": time.time() if profiled_at is None else profiled_at,
+        "columns": {"department": {"top_values": top_values, "top_values_complete": True}}
+    }}
+    return dict(SCHEMA, statistics=statistics)
+
+
+@pytest.mark.parametrize("question", [
+    "employees hired after 2019-02-30",
+    "employees hired in 2019-13",
+    "employees hired between 2019-01-01 and 2019-02-31",
+])
+def test_impossible_dates_are_not_matched(question):
+    assert translate(question) is None
+
+
+def test_valid_date_range():
+    intent, sql = translate("employees hired in 2019-02")
+    assert intent == "hires_in_range"
+    assert "hire_date >= '2019-02-01' AND hire_date < '2019-03-01'" in sql
+
+
+@pytest.mark.parametrize("question, direction, limit", [
+    ("top 5 highest paid employees", "DESC", 5),
+    ("top 5 paid employees", "DESC", 5),
+    ("bottom 3 lowest paid employees", "ASC", 3),
+    ("top 5 lowest paid employees", "ASC", 5),
+    ("5 highest paid employees", "DESC", 5),
+    ("highest paid employees", "DESC", 10),
+    ("top paid employees", "DESC", 10),
+    ("top 5 employees by salary", "DESC", 5),
+    ("top 3 employees with the lowest salary", "ASC", 3),
+    ("top 5 highest salaries", "DESC", 5),
+])
+def test_top_by_salary_phrasings(question, direction, limit):
+    intent, sql = translate(question)
+    assert intent == "top_by_salary"
+    assert sql.endswith(f"ORDER BY salary {direction} LIMIT {limit}")
+
+
+@pytest.mark.parametrize("question", [
+    "employees in the last year",
+    "employees in the past month",
+    "employees from this quarter",
+    "employees in march",
+])
+def test_time_phrases_are_not_departments(question):
+    assert translate(question) is None
+
+
+def test_department_filter_without_statistics():
+    intent, sql = translate("employees in engineering")
+    assert intent == "department_filter"
+    assert sql.endswith("WHERE LOWER(department) = 'engineering'")
+
+
+def test_department_filter_uses_stored_spelling():
+    intent, sql = translate("employees in engineering", with_departments("Engineering", "Sales"))
+    assert sql.endswith("WHERE department = 'Engineering'")
+
+
+def test_complete_statistics_reject_unknown_department():
+    assert translate("employees in legal", with_departments("Engineering", "Sales")) is None
+
+
+def test_stale_statistics_do_not_reject_unknown_department():
+    schema = with_departments("Engineering", "Sales", profiled_at=time.time() - 10 ** 6)
+    intent, sql = translate("employees in legal", schema)
+    assert sql.endswith("WHERE LOWER(department) = 'legal'")
+
+
+def test_reprofiled_statistics_reach_compiled_templates():
+    templates = IntentTemplates()
+    question = normalize_query("employees in legal")
+    assert templates.translate(question, with_departments("Engineering", "Legal"), "test") is not None
+    reprofiled = with_departments("Engineering", "Sales", profiled_at=time.time() + 1)
+    assert templates.translate(question, reprofiled, "test") is None
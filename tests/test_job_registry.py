@@ -0,0 +1,33 @@
+from backend.services.job_registry import JobRegistry
+
+
+class RecordingStore:
+    """Keeps the (status, version) of every job record written to it"""
+
+    def __init__(self):
+        self.writes = []
+
+    def put(self, job, version, finished):
+        self.writes.append((job["status"], version))
+
+
+def test_progress_write_through_is_throttled():
+    store = RecordingStore()
+    registry = JobRegistry(store=store, write_interval=60.0)
+    job_id = registry.create("documents", files=[{"status": "queued"} for _ in range(100)])
+    registry.update(job_id, status="processing")
+    for index in range(100):
+        registry.update_file(job_id, index, status="processed")
+        registry.update(job_id, progress=index + 1)
+    registry.update(job_id, status="completed")
+
+    assert store.writes == [("queued", 0), ("processing", 1), ("completed", 202)]
+    assert registry.get(job_id)["files"][-1]["status"] == "processed"
+
+
+def test_progress_is_written_once_the_interval_has_passed():
+    store = RecordingStore()
+    registry = JobRegistry(store=store, write_interval=0.0)
+    job_id = registry.create("documents", files=[{"status": "queued"}])
+    registry.update_file(job_id, 0, status="processed")
+    assert store.writes == [("queued", 0), ("queued", 1)]
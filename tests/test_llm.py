@@ -0,0 +1,157 @@
+import threading
+import time
+
+import pytest
+
+from backend.services.llm import FakeLLM, LLMClient, LLMError, TokenBucket, compact_schema_context, extract_sql
+
+
+class FlakyBackend:
+    """Fails with the given errors in turn, then answers"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def generate(self, prompt):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "SELECT 1"
+
+
+def client_for(backend, **kwargs):
+    options = dict(max_concurrency=4, rate=1000.0, burst=1000.0, max_retries=3,
+                   backoff_base=0.0, backoff_max=0.0, timeout=5.0)
+    options.update(kwargs)
+    return LLMClient(backend, **options)
+
+
+def test_identical_concurrent_prompts_share_one_backend_call():
+    backend = FakeLLM(latency=0.2)
+    client = client_for(backend)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client.complete("same prompt"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [backend.response] * 8
+    assert backend.calls == 1
+    stats = client.stats()
+    assert stats["requests"] == 8
+    assert stats["backend_calls"] == 1
+    assert stats["coalesced"] == 7
+
+
+def test_different_prompts_are_not_coalesced():
+    backend = FakeLLM(latency=0.0)
+    client = client_for(backend)
+    client.complete("first")
+    client.complete("second")
+    assert backend.calls == 2
+    assert client.stats()["coalesced"] == 0
+
+
+def test_token_bucket_allows_burst_then_refills_at_rate():
+    bucket = TokenBucket(rate=20.0, capacity=3)
+    assert all(bucket.acquire(timeout=0) for _ in range(3))
+    assert not bucket.acquire(timeout=0)
+
+    start = time.monotonic()
+    assert bucket.acquire(timeout=1.0)
+    assert time.monotonic() - start >= 0.03
+
+
+def test_token_bucket_gives_up_at_timeout():
+    bucket = TokenBucket(rate=0.1, capacity=1)
+    assert bucket.acquire(timeout=0)
+    start = time.monotonic()
+    assert not bucket.acquire(timeout=0.05)
+    assert time.monotonic() - start < 1.0
+
+
+def test_rate_limit_wait_past_deadline_fails():
+    backend = FakeLLM(latency=0.0)
+    client = client_for(backend, rate=0.01, burst=1, timeout=0.1)
+    client.complete("first")
+    with pytest.raises(LLMError):
+        client.complete("second")
+    assert backend.calls == 1
+    assert client.stats()["failures"] == 1
+
+
+def test_retryable_errors_are_retried():
+    backend = FlakyBackend(LLMError("throttled", retryable=True), LLMError("unavailable", retryable=True))
+    client = client_for(backend)
+    assert client.complete("prompt") == "SELECT 1"
+    assert backend.calls == 3
+    assert client.stats()["retries"] == 2
+
+
+def test_non_retryable_error_fails_at_once():
+    backend = FlakyBackend(LLMError("bad request"))
+    client = client_for(backend)
+    with pytest.raises(LLMError):
+        client.complete("prompt")
+    assert backend.calls == 1
+    assert client.stats()["retries"] == 0
+
+
+def test_retries_stop_after_max_retries():
+    backend = FakeLLM(latency=0.0, failure_rate=1.0, seed=1)
+    client = client_for(backend, max_retries=2)
+    with pytest.raises(LLMError):
+        client.complete("prompt")
+    assert backend.calls == 3
+    assert client.stats() == {"requests": 1, "coalesced": 0, "backend_calls": 3, "retries": 2, "failures": 1}
+
+
+def test_extract_sql_takes_fenced_select():
+    completion = "Here you go:\n```sql\nSELECT name FROM employees WHERE note = 'a;b';\n```"
+    assert extract_sql(completion, "SQLite") == "SELECT name FROM employees WHERE note = 'a;b'"
+
+
+def test_extract_sql_accepts_cte_and_set_operations():
+    sql = "WITH t AS (SELECT 1 AS x) SELECT x FROM t UNION ALL SELECT 2"
+    assert extract_sql(sql, "PostgreSQL") == sql
+
+
+@pytest.mark.parametrize("completion, dialect", [
+    ("WITH gone AS (DELETE FROM employees RETURNING *) SELECT * FROM gone", "PostgreSQL"),
+    ("SELECT 1; DROP TABLE employees", "SQLite"),
+    ("SELECT * INTO backup FROM employees", "PostgreSQL"),
+    ("SELECT * FROM employees FOR UPDATE", "MySQL"),
+    ("UPDATE employees SET salary = 0", None),
+    ("Sorry, I cannot answer that.", None),
+])
+def test_extract_sql_rejects_anything_but_one_read_only_query(completion, dialect):
+    with pytest.raises(LLMError):
+        extract_sql(completion, dialect)
+
+
+def test_schema_context_carries_counts_but_no_values():
+    schema = {
+        "tables": [{"name": "employees", "columns": [
+            {"name": "id", "type": "integer", "primary_key": True},
+            {"name": "email", "type": "string"},
+            {"name": "department", "type": "string"},
+            {"name": "manager_note", "type": "string"}
+        ]}],
+        "statistics": {"employees": {"row_count": 5000, "columns": {
+            "id": {"distinct_count": 5000, "null_fraction": 0.0},
+            "email": {"distinct_count": 4990, "null_fraction": 0.0},
+            "department": {"distinct_count": 6, "null_fraction": 0.0, "top_values": [{"value": "Sales", "fraction": 0.3}]},
+            "manager_note": {"distinct_count": 40, "null_fraction": 0.9}
+        }}}
+    }
+    context = compact_schema_context(schema)
+    assert context.splitlines()[1] == (
+        "employees(id integer pk, email string ~4990 distinct, department string ~6 distinct, "
+        "manager_note string ~40 distinct mostly null) ~5000 rows"
+    )
+    assert "Sales" not in context
+    assert compact_schema_context(dict(schema, statistics={})) == (
+        "employees(id integer pk, email string, department string, manager_note string)"
+    )
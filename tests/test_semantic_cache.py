@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from backend.services.cache import SemanticCache
+from backend.services.metrics import StageTimer
+from backend.services.query_engine import QueryEngine, mask_literals
+
+
+class FixedEncoder:
+    """Deterministic encoder that maps known texts to given unit vectors"""
+
+    def __init__(self, vectors):
+        self.vectors = {text: np.asarray(vector, dtype=np.float32) for text, vector in vectors.items()}
+
+    def encode(self, texts):
+        return np.stack([self.vectors[text] for text in texts])
+
+
+def unit_at(similarity):
+    """Unit vector whose dot product with [1, 0] is similarity"""
+    return [similarity, float(np.sqrt(1.0 - similarity ** 2))]
+
+
+@pytest.fixture
+def cache():
+    encoder = FixedEncoder({"stored": [1.0, 0.0], "at": unit_at(0.5), "below": unit_at(0.49)})
+    cache = SemanticCache(encoder, capacity=4, threshold=0.5)
+    cache.add(cache.embed("stored"), "SELECT 1")
+    return cache
+
+
+def test_hit_at_threshold(cache):
+    value, similarity = cache.lookup(cache.embed("at"))
+    assert value == "SELECT 1"
+    assert similarity == 0.5
+    assert cache.stats()["hits"] == 1
+
+
+def test_miss_below_threshold(cache):
+    assert cache.lookup(cache.embed("below")) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_lookup_requires_same_key(cache):
+    cache.add(cache.embed("stored"), "SELECT 2", key=("2019",))
+    assert cache.lookup(cache.embed("stored"), key=("2021",)) is None
+    assert cache.lookup(cache.embed("stored"), key=("2019",))[0] == "SELECT 2"
+    assert cache.lookup(cache.embed("stored"))[0] == "SELECT 1"
+
+
+def test_ring_buffer_overwrites_oldest():
+    encoder = FixedEncoder({str(i): np.eye(4)[i] for i in range(4)})
+    cache = SemanticCache(encoder, capacity=2, threshold=0.99)
+    for i in range(3):
+        cache.add(cache.embed(str(i)), i)
+    assert len(cache) == 2
+    assert cache.lookup(cache.embed("0")) is None
+    assert cache.lookup(cache.embed("2"))[0] == 2
+
+
+def test_mask_literals():
+    masked, literals = mask_literals("Show employees hired after 2019 in the Engineering department")
+    assert masked == "show employees hired after <number> in the <name> department"
+    assert literals == ("2019", "engineering")
+    assert mask_literals("employees named 'Ann Lee'")[1] == ("ann lee",)
+
+
+def test_translations_with_different_literals_are_not_reused():
+    engine = QueryEngine(llm=None)
+    timer = StageTimer()
+    question = "Show employees hired after {} in the Engineering department"
+
+    _, similarity, translator = engine._translate_with_semantic_cache(question.format(2019), None, timer)
+    assert similarity is None and translator == "rules"
+
+    _, _, translator = engine._translate_with_semantic_cache(question.format(2021), None, timer)
+    assert translator == "rules"
+
+    _, similarity, translator = engine._translate_with_semantic_cache(question.format(2019) + "?", None, timer)
+    assert translator == "semantic_cache"
+    assert similarity == pytest.approx(1.0, abs=1e-5)
@@ -0,0 +1,95 @@
+import pytest
+from sqlalchemy import create_engine
+
+from backend.services.sql_fingerprint import StatementCache, parameterize
+
+
+def test_literals_are_lifted_into_parameters():
+    statement = parameterize("SELECT * FROM employees WHERE department = 'Sales' AND salary > 50000;")
+    assert statement.sql == "SELECT * FROM employees WHERE department = :p0 AND salary > :p1"
+    assert statement.bind_params == {"p0": "Sales", "p1": 50000}
+
+
+def test_same_shape_shares_a_fingerprint():
+    first = parameterize("SELECT * FROM employees WHERE salary > 50000")
+    second = parameterize("select *  from employees where salary > 90000.5")
+    assert first.fingerprint == second.fingerprint
+    assert first.params != second.params
+    assert parameterize("SELECT * FROM employees WHERE salary < 50000").fingerprint != first.fingerprint
+
+
+def test_parameterize_is_cached_per_statement():
+    sql = "SELECT * FROM employees WHERE id = 12345 AND name = 'cache check'"
+    assert parameterize(sql) is parameterize(sql)
+    before = parameterize.cache_info().hits
+    parameterize(sql)
+    assert parameterize.cache_info().hits == before + 1
+
+
+def test_repeated_expression_binds_the_same_parameter():
+    statement = parameterize(
+        "SELECT date_trunc('month', hire_date) AS month, COUNT(*) FROM employees "
+        "GROUP BY date_trunc('month', hire_date) ORDER BY 1"
+    )
+    assert statement.sql == (
+        "SELECT date_trunc(:p0, hire_date) AS month, COUNT(*) FROM employees "
+        "GROUP BY date_trunc(:p0, hire_date) ORDER BY 1"
+    )
+    assert statement.bind_params == {"p0": "month"}
+
+
+def test_repeated_case_expression():
+    case = "CASE WHEN salary > 100000 THEN 'high' ELSE 'low' END"
+    statement = parameterize(f"SELECT {case} AS band, COUNT(*) FROM employees GROUP BY {case}")
+    select, group = statement.sql.split(" GROUP BY ")
+    assert group in select
+    assert statement.bind_params == {"p0": 100000, "p1": "high", "p2": "low"}
+
+
+def test_order_by_expression_matches_select_list():
+    statement = parameterize("SELECT substr(name, 1, 3) FROM employees ORDER BY substr(name, 1, 3), 2")
+    assert statement.sql == "SELECT substr(name, :p0, :p1) FROM employees ORDER BY substr(name, :p0, :p1), 2"
+
+
+def test_positional_references_and_type_arguments_stay_inline():
+    statement = parameterize("SELECT CAST(name AS VARCHAR(20)), salary FROM employees GROUP BY 1, 2 ORDER BY 2 DESC")
+    assert statement.sql == "SELECT CAST(name AS VARCHAR(20)), salary FROM employees GROUP BY 1, 2 ORDER BY 2 DESC"
+    assert statement.params == ()
+
+
+def test_shared_parameter_is_part_of_the_shape():
+    assert (parameterize("SELECT * FROM t WHERE a = 1 AND b = 1").fingerprint
+            != parameterize("SELECT * FROM t WHERE a = 1 AND b = 2").fingerprint)
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM notes WHERE note = 'it\\'s' AND id = 3",
+    "SELECT * FROM notes WHERE note = 'unterminated AND id = 3",
+])
+def test_ambiguous_quoting_is_left_unparameterized(sql):
+    statement = parameterize(sql)
+    assert statement.sql == sql
+    assert statement.params == ()
+    assert statement.fingerprint != parameterize(sql.replace("3", "4")).fingerprint
+
+
+def test_repeated_parameters_execute():
+    engine = create_engine("sqlite://")
+    cache = StatementCache()
+    statement = parameterize(
+        "SELECT substr('abcdef', 1, 3) AS prefix, COUNT(*) AS n FROM (SELECT 1 AS x UNION ALL SELECT 2) "
+        "GROUP BY substr('abcdef', 1, 3) ORDER BY substr('abcdef', 1, 3)"
+    )
+    with engine.connect() as connection:
+        rows = connection.execute(cache.statement(statement.sql), statement.bind_params).fetchall()
+    assert [tuple(row) for row in rows] == [("abc", 2)]
+
+
+def test_statement_cache_reuses_and_evicts():
+    cache = StatementCache(max_size=2)
+    first = cache.statement("SELECT :p0")
+    assert cache.statement("SELECT :p0") is first
+    cache.statement("SELECT :p0 + 1")
+    cache.statement("SELECT :p0 + 2")
+    assert cache.statement("SELECT :p0") is not first
+    assert cache.stats() == {"size": 2, "max_size": 2, "hits": 1, "misses": 4}
@@ -0,0 +1,142 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from backend.services.document_processor import DocumentProcessor
+from backend.services.embeddings import EmbeddingPipeline, HashingEncoder
+from backend.services.lexical_index import BM25Index
+from backend.services.retrieval import DocumentRetriever
+from backend.services.vector_store import VectorStore
+
+
+def random_vectors(n, dimension=8, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((n, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def metadata(n, file_path="a.txt"):
+    return [{"file_path": file_path, "chunk_index": i, "doc_type": "default", "text": f"chunk {i}"} for i in range(n)]
+
+
+def test_append_assigns_consecutive_ids(tmp_path):
+    store = VectorStore(str(tmp_path))
+    assert store.append(random_vectors(3), metadata(3)) == [0, 1, 2]
+    assert store.append(random_vectors(2, seed=1), metadata(2, "b.txt")) == [3, 4]
+    assert len(store) == 5
+    assert [chunk["file_path"] for chunk in store.get_chunks([4, 0])] == ["b.txt", "a.txt"]
+
+
+def test_append_rejects_mismatched_rows(tmp_path):
+    store = VectorStore(str(tmp_path))
+    store.append(random_vectors(2), metadata(2))
+    with pytest.raises(ValueError):
+        store.append(random_vectors(2, dimension=4), metadata(2))
+    with pytest.raises(ValueError):
+        store.append(random_vectors(3), metadata(2))
+
+
+def test_reopen_maps_stored_vectors(tmp_path):
+    vectors = random_vectors(4)
+    VectorStore(str(tmp_path)).append(vectors, metadata(4))
+
+    reopened = VectorStore(str(tmp_path))
+    assert reopened.dimension == 8
+    assert len(reopened) == 4
+    assert isinstance(reopened.vectors(), np.memmap)
+    np.testing.assert_array_equal(reopened.vectors(), vectors)
+    with pytest.raises(ValueError):
+        VectorStore(str(tmp_path), dimension=16)
+
+
+def test_reopen_trims_rows_without_metadata(tmp_path):
+    store = VectorStore(str(tmp_path))
+    store.append(random_vectors(3), metadata(3))
+    # An append that crashed after writing vectors but before committing their metadata
+    with open(store.vectors_path, "ab") as file:
+        file.write(random_vectors(2, seed=1).tobytes())
+    assert len(store) == 5
+
+    recovered = VectorStore(str(tmp_path))
+    assert len(recovered) == 3
+    assert recovered.append(random_vectors(1, seed=2), metadata(1, "b.txt")) == [3]
+
+
+def test_append_drops_torn_partial_row(tmp_path):
+    store = VectorStore(str(tmp_path))
+    store.append(random_vectors(2), metadata(2))
+    with open(store.vectors_path, "ab") as file:
+        file.write(b"\x00" * 5)
+    assert store.append(random_vectors(1, seed=1), metadata(1)) == [2]
+    assert store.vectors().shape == (3, 8)
+
+
+def _append_from_process(directory, worker):
+    store = VectorStore(directory)
+    for batch in range(20):
+        vectors = np.full((3, 8), worker * 100 + batch, dtype=np.float32)
+        store.append(vectors, metadata(3, f"{worker}-{batch}"))
+
+
+def test_appends_from_several_processes_stay_aligned(tmp_path):
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_append_from_process, args=(str(tmp_path), worker)) for worker in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert [worker.exitcode for worker in workers] == [0] * 4
+
+    store = VectorStore(str(tmp_path))
+    vectors = store.vectors()
+    assert vectors.shape == (240, 8)
+    for chunk in store.get_chunks(list(range(240))):
+        worker, batch = chunk["file_path"].split("-")
+        assert (vectors[chunk["id"]] == int(worker) * 100 + int(batch)).all()
+
+
+def test_replaced_chunks_are_tombstoned(tmp_path):
+    store = VectorStore(str(tmp_path))
+    ids = store.append(random_vectors(3), metadata(3))
+    store.replace_document("a.txt", "hash-1", [(ids[0], 0)])
+    np.testing.assert_array_equal(store.tombstones(), [1, 2])
+    assert [chunk["id"] for chunk in store.get_chunks(ids)] == [0]
+    assert VectorStore(str(tmp_path)).document_hashes(["a.txt"]) == {"a.txt": "hash-1"}
+
+
+def test_pipeline_indexes_and_retrieves_with_hashing_encoder(tmp_path):
+    store = VectorStore(str(tmp_path))
+    encoder = HashingEncoder(dimension=64)
+    pipeline = EmbeddingPipeline(DocumentProcessor(max_workers=1), encoder=encoder, store=store, batch_size=2)
+    documents = [
+        {"file_path": "kubernetes.txt", "status": "processed", "type": ".txt", "content_hash": "k",
+         "content": "Led the Kubernetes migration and on-call rotation for the platform team."},
+        {"file_path": "payroll.txt", "status": "processed", "type": ".txt", "content_hash": "p",
+         "content": "Reconciled payroll ledgers and quarterly tax filings for the finance team."},
+    ]
+    stats = pipeline.ingest_documents(documents)
+    assert stats["new"] == 2 and stats["chunks_indexed"] == len(store)
+
+    retriever = DocumentRetriever(store=VectorStore(str(tmp_path)), encoder=encoder, lexical_enabled=False)
+    assert retriever.search("kubernetes migration", k=1)[0]["file_path"] == "kubernetes.txt"
+
+
+def test_hybrid_search_keeps_cosine_score_and_reports_fused_score(tmp_path):
+    store = VectorStore(str(tmp_path))
+    encoder = HashingEncoder(dimension=64)
+    texts = ["Led the Kubernetes migration for the platform team.",
+             "Reconciled payroll ledgers for the finance team.",
+             "Organised the quarterly offsite and travel bookings."]
+    store.append(encoder.encode(texts), [
+        {"file_path": f"doc{i}.txt", "chunk_index": 0, "text": text} for i, text in enumerate(texts)
+    ])
+
+    retriever = DocumentRetriever(store=store, encoder=encoder, lexical=BM25Index())
+    results = retriever.search("kubernetes migration", k=3)
+    query = encoder.encode(["kubernetes migration"])[0]
+    assert results[0]["file_path"] == "doc0.txt"
+    for result in results:
+        index = int(result["file_path"][3])
+        assert result["score"] == pytest.approx(float(encoder.encode([texts[index]])[0] @ query), abs=1e-5)
+        assert 0.0 < result["fused_score"] <= 1.0
+    assert [result["fused_score"] for result in results] == sorted((r["fused_score"] for r in results), reverse=True)